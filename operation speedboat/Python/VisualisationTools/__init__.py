@@ -1,5 +1,10 @@
+from .frame_index import FrameIndex
+from .interpolation import INTERPOLATION_METHODS, interpolate_tracking
 from .soccer_animation import SoccerAnimation
 
 __all__ = [
+    "FrameIndex",
+    "INTERPOLATION_METHODS",
     "SoccerAnimation",
+    "interpolate_tracking",
 ]
\ No newline at end of file
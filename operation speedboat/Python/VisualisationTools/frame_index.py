@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+
+def _team_positions(df_team, frame_ids):
+    """
+    Scatter a team's rows into a (n_frames, n_players, 2) float32 array.
+
+    Frames a player is missing from stay NaN, which matplotlib simply doesn't draw.
+    """
+    if df_team is None or df_team.empty or len(frame_ids) == 0:
+        return np.full((len(frame_ids), 0, 2), np.nan, dtype=np.float32), np.array([], dtype=object)
+
+    # Column per player, row per frame, found with one factorize and one searchsorted
+    player_cols, player_ids = pd.factorize(df_team['player_id'], sort=True)
+    team_frames = df_team['frame_id'].to_numpy()
+    rows = np.searchsorted(frame_ids, team_frames)
+    rows_clipped = np.minimum(rows, len(frame_ids) - 1)
+    matched = (rows < len(frame_ids)) & (frame_ids[rows_clipped] == team_frames)
+
+    positions = np.full((len(frame_ids), len(player_ids), 2), np.nan, dtype=np.float32)
+    positions[rows[matched], player_cols[matched]] = df_team[['x', 'y']].to_numpy(dtype=np.float32)[matched]
+    return positions, np.asarray(player_ids, dtype=object)
+
+
+class FrameIndex:
+    """
+    Frame-indexed positions for an animation clip.
+
+    The ball DataFrame drives the animation: rendered frame ``i`` is ball row ``i``.
+    Home and away positions live in contiguous ``(n_frames, n_players, 2)`` float32
+    arrays, one row per unique ball frame_id, so drawing a frame is pure indexing.
+    """
+    def __init__(self, frame_ids, frame_pos, ball_xy, time_labels, period_labels,
+                 home_xy, away_xy, home_player_ids, away_player_ids):
+        """
+        Initialize the FrameIndex class. Use ``from_dataframes`` to build one.
+
+        Parameters:
+        ----------
+        frame_ids : np.ndarray
+            Sorted unique frame_ids, one per row of the team arrays.
+        frame_pos : np.ndarray
+            For every ball row, the row of its frame_id in ``frame_ids``.
+        ball_xy : np.ndarray
+            (n_ball_rows, 2) float32 ball positions.
+        time_labels, period_labels : np.ndarray
+            Pre-formatted time and period text for every ball row.
+        home_xy, away_xy : np.ndarray
+            (n_frames, n_players, 2) float32 player positions.
+        home_player_ids, away_player_ids : np.ndarray
+            The player_id of every column of the team arrays.
+        """
+        self.frame_ids = frame_ids
+        self.frame_pos = frame_pos
+        self.ball_xy = ball_xy
+        self.time_labels = time_labels
+        self.period_labels = period_labels
+        self.home_xy = home_xy
+        self.away_xy = away_xy
+        self.home_player_ids = home_player_ids
+        self.away_player_ids = away_player_ids
+        self.frame_offsets = dict(zip(frame_ids.tolist(), range(len(frame_ids))))
+
+    @classmethod
+    def from_dataframes(cls, df_ball, df_home, df_away):
+        """
+        Build the index from ball, home and away tracking DataFrames.
+
+        Parameters:
+        ----------
+        df_ball : pd.DataFrame
+            The ball tracking data, in the order the frames should be rendered.
+        df_home : pd.DataFrame
+            The home team tracking data.
+        df_away : pd.DataFrame
+            The away team tracking data.
+
+        Returns:
+        -------
+        FrameIndex
+            The frame-indexed clip.
+        """
+        ball_frames = df_ball['frame_id'].to_numpy()
+        frame_ids, frame_pos = np.unique(ball_frames, return_inverse=True)
+        ball_xy = df_ball[['x', 'y']].to_numpy(dtype=np.float32)
+
+        # Text is formatted once here instead of on every rendered frame
+        time_labels = ('Time: ' + df_ball.get('timestamp', pd.Series('N/A', index=df_ball.index)).astype(str)).to_numpy()
+        period_labels = ('Period: ' + df_ball.get('period_id', pd.Series('N/A', index=df_ball.index)).astype(str)).to_numpy()
+
+        home_xy, home_player_ids = _team_positions(df_home, frame_ids)
+        away_xy, away_player_ids = _team_positions(df_away, frame_ids)
+
+        return cls(frame_ids, frame_pos, ball_xy, time_labels, period_labels,
+                   home_xy, away_xy, home_player_ids, away_player_ids)
+
+    def __len__(self):
+        return len(self.frame_pos)
+
+    def row_of(self, frame_id):
+        """Return the team-array row for a frame_id, or None if the clip doesn't have it."""
+        return self.frame_offsets.get(frame_id)
+
+    def frame(self, i):
+        """
+        Return everything needed to draw rendered frame ``i``.
+
+        Returns:
+        -------
+        tuple
+            (ball_xy, home_xy, away_xy, time_label, period_label)
+        """
+        row = self.frame_pos[i]
+        return self.ball_xy[i], self.home_xy[row], self.away_xy[row], self.time_labels[i], self.period_labels[i]
+
+    def subset(self, start, stop):
+        """
+        Return a FrameIndex holding only rendered frames ``start`` to ``stop``.
+
+        The team arrays are cut down to the frames the subset actually uses, which
+        keeps the copy small when it is sent to a render worker.
+        """
+        frame_pos = self.frame_pos[start:stop]
+        if len(frame_pos) == 0:
+            first, last = 0, 0
+        else:
+            first, last = frame_pos.min(), frame_pos.max() + 1
+        return FrameIndex(
+            self.frame_ids[first:last], frame_pos - first,
+            self.ball_xy[start:stop], self.time_labels[start:stop], self.period_labels[start:stop],
+            self.home_xy[first:last], self.away_xy[first:last],
+            self.home_player_ids, self.away_player_ids,
+        )
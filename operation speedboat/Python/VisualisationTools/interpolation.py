@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+
+def _linear(points, frame_ids, starts, alpha, group_first, group_last):
+    """Straight line between the two real frames around every generated row."""
+    p1 = points[starts]
+    p2 = points[starts + 1]
+    return p1 + alpha[:, None] * (p2 - p1)
+
+
+def _catmull_rom(points, frame_ids, starts, alpha, group_first, group_last):
+    """Uniform Catmull-Rom spline through the real frames of each object."""
+    # Neighbouring control points, clamped to the object's own rows so one
+    # player's curve never bends towards the next player in the array
+    i0 = np.maximum(starts - 1, group_first[starts])
+    i3 = np.minimum(starts + 2, group_last[starts])
+
+    p0 = points[i0]
+    p1 = points[starts]
+    p2 = points[starts + 1]
+    p3 = points[i3]
+
+    t = alpha[:, None]
+    t2 = t * t
+    t3 = t2 * t
+    return 0.5 * (
+        2 * p1
+        + (p2 - p0) * t
+        + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2
+        + (3 * p1 - p0 - 3 * p2 + p3) * t3
+    )
+
+
+def _cubic(points, frame_ids, starts, alpha, group_first, group_last):
+    """Cubic spline through each object's real frames, spaced by frame_id."""
+    from scipy.interpolate import CubicSpline
+
+    # Start from the linear result; objects whose frames can't carry a spline
+    # (duplicate frame_ids, missing coordinates) simply keep it
+    result = _linear(points, frame_ids, starts, alpha, group_first, group_last)
+    targets = frame_ids[starts] + alpha * (frame_ids[starts + 1] - frame_ids[starts])
+
+    # One spline per object, evaluated for all of its generated rows at once
+    segment_groups = group_first[starts]
+    for first in np.unique(segment_groups):
+        last = group_last[first]
+        knots = frame_ids[first:last + 1]
+        values = points[first:last + 1]
+        if len(knots) < 3 or np.any(np.diff(knots) <= 0) or np.isnan(values).any():
+            continue
+        mask = segment_groups == first
+        result[mask] = CubicSpline(knots, values, axis=0)(targets[mask])
+    return result
+
+
+INTERPOLATION_METHODS = {
+    "linear": _linear,
+    "cubic": _cubic,
+    "catmull-rom": _catmull_rom,
+}
+
+
+def _interpolate_timestamps(timestamps, starts, alpha, generated):
+    """
+    Interpolate '%H:%M:%S' string timestamps, copying anything that doesn't parse.
+    Returns None when there are no string timestamps to interpolate.
+    """
+    values = timestamps.to_numpy(dtype=object)
+    is_str = np.array([isinstance(v, str) for v in values], dtype=bool)
+    if not is_str.any():
+        return None
+
+    out = values[starts].copy()
+
+    parsed = pd.to_datetime(pd.Series(np.where(is_str, values, None)), format='%H:%M:%S', errors='coerce')
+    seconds = (parsed - parsed.dt.normalize()).dt.total_seconds().to_numpy()
+
+    current = seconds[starts]
+    following = seconds[np.minimum(starts + 1, len(values) - 1)]
+    valid = generated & is_str[starts] & ~np.isnan(current) & ~np.isnan(following)
+    if valid.any():
+        new_seconds = current[valid] + (following[valid] - current[valid]) * alpha[valid]
+        out[valid] = (pd.Timestamp(0) + pd.to_timedelta(new_seconds, unit='s')).strftime('%H:%M:%S')
+    return out
+
+
+def interpolate_tracking(df, num_interpolations=5, method='linear', group_col='player_id'):
+    """
+    Create artificial frames between existing ones for every tracked object at once.
+
+    Rows are grouped per ``group_col`` (the whole frame is treated as one object
+    when that column is missing or None) and sorted by frame_id. Each real row is followed
+    by ``num_interpolations`` generated rows that copy its other columns and get an
+    interpolated x, y, a fractional frame_id and, for '%H:%M:%S' string timestamps,
+    an interpolated timestamp. The last real row of each object is kept as-is.
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        DataFrame containing positional data.
+    num_interpolations : int
+        Number of artificial frames to create between each real frame.
+    method : str
+        The interpolation method, one of ``INTERPOLATION_METHODS``
+        ('linear', 'cubic' or 'catmull-rom').
+    group_col : str, optional
+        Column identifying each tracked object.
+
+    Returns:
+    -------
+    pd.DataFrame
+        DataFrame with interpolated frames.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method '{method}'. Choose from {sorted(INTERPOLATION_METHODS)}.")
+
+    if len(df) <= 1:
+        return df
+
+    # Sort once so every object's frames are contiguous and in order
+    if group_col in df.columns and df[group_col].nunique() > 1:
+        df = df.sort_values([group_col, 'frame_id'], kind='stable')
+        keys = df[group_col].to_numpy()
+        new_group = np.r_[True, keys[1:] != keys[:-1]]
+    else:
+        df = df.sort_values('frame_id', kind='stable')
+        new_group = np.zeros(len(df), dtype=bool)
+        new_group[0] = True
+    df = df.reset_index(drop=True)
+
+    n_rows = len(df)
+    first_rows = np.flatnonzero(new_group)
+    group_sizes = np.diff(np.r_[first_rows, n_rows])
+    group_first = np.repeat(first_rows, group_sizes)
+    group_last = np.repeat(first_rows + group_sizes - 1, group_sizes)
+
+    # Every row except an object's last one is followed by generated rows
+    repeats = np.where(np.arange(n_rows) == group_last, 1, num_interpolations + 1)
+    starts = np.repeat(np.arange(n_rows), repeats)
+    steps = np.arange(len(starts)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    alpha = steps / (num_interpolations + 1)
+    generated = steps > 0
+
+    result = df.take(starts).reset_index(drop=True)
+    if not generated.any():
+        return result
+
+    seg_starts = starts[generated]
+    seg_alpha = alpha[generated]
+
+    frame_ids = df['frame_id'].to_numpy(dtype=float)
+    frame_col = frame_ids[starts]
+    frame_col[generated] = frame_ids[seg_starts] + seg_alpha * (frame_ids[seg_starts + 1] - frame_ids[seg_starts])
+    result['frame_id'] = frame_col
+
+    coord_cols = [col for col in ['x', 'y'] if col in df.columns]
+    if coord_cols:
+        points = df[coord_cols].to_numpy(dtype=float)
+        coords = points[starts]
+        coords[generated] = INTERPOLATION_METHODS[method](
+            points, frame_ids, seg_starts, seg_alpha, group_first, group_last
+        )
+        for i, col in enumerate(coord_cols):
+            result[col] = coords[:, i]
+
+    if 'timestamp' in df.columns:
+        timestamps = _interpolate_timestamps(df['timestamp'], starts, alpha, generated)
+        if timestamps is not None:
+            result['timestamp'] = timestamps
+
+    return result
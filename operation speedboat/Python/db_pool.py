@@ -0,0 +1,256 @@
+import contextlib
+import hashlib
+import os
+import re
+import threading
+import time
+import warnings
+
+import dotenv
+import psycopg2
+import psycopg2.pool
+
+
+# Upper bound on open connections per pool, unless PG_POOL_MAX says otherwise
+DEFAULT_MAX_CONNECTIONS = 8
+# A connection that sat idle longer than this is pinged before it is handed out
+HEALTH_CHECK_AFTER = 30.0
+
+_settings = None
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connection_settings():
+    """
+    Connection parameters from the environment (and ``.env``), read only once.
+
+    Returns:
+        dict: Keyword arguments for ``psycopg2.connect``.
+    """
+    global _settings
+    if _settings is None:
+        dotenv.load_dotenv()
+        _settings = {
+            "host": os.getenv("PG_HOST"),
+            "database": os.getenv("PG_DB", os.getenv("PG_DATABASE")),
+            "user": os.getenv("PG_USER"),
+            "password": os.getenv("PG_PASSWORD"),
+            "port": os.getenv("PG_PORT"),
+            "sslmode": os.getenv("PG_SSLMODE", "require"),
+        }
+    return dict(_settings)
+
+
+class _ReusingPool(psycopg2.pool.ThreadedConnectionPool):
+    # psycopg2 closes every returned connection beyond minconn; keep up to maxconn
+    # open instead, so borrowing again doesn't pay for a new (SSL) connection
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.minconn = maxconn
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of database connections, opened on first use.
+
+    Wraps psycopg2's ``ThreadedConnectionPool``, keeping every connection it
+    opened for reuse (up to ``maxconn``). Borrowing blocks while all
+    ``maxconn`` connections are out instead of failing, so any number of
+    threads can share a pool without going over the server's connection limit.
+    Connections that were idle for a while are checked with ``SELECT 1`` and
+    replaced if the server dropped them; whatever transaction a borrower left
+    open is rolled back when the connection comes back.
+    """
+    def __init__(self, minconn=1, maxconn=None, **connect_kwargs):
+        """
+        Set up the pool; no connection is opened until one is borrowed.
+
+        Args:
+            minconn (int): Connections kept open once the pool exists.
+            maxconn (int, optional): Most connections open at once, PG_POOL_MAX
+                or DEFAULT_MAX_CONNECTIONS by default.
+            **connect_kwargs: Passed to ``psycopg2.connect`` (host, database, dsn, ...).
+        """
+        if maxconn is None:
+            maxconn = int(os.getenv("PG_POOL_MAX", DEFAULT_MAX_CONNECTIONS))
+        if maxconn < max(minconn, 1):
+            raise ValueError(f"maxconn must be at least max(minconn, 1), got {maxconn}.")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.connect_kwargs = connect_kwargs
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}  # id(connection) -> time it was last handed back
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = _ReusingPool(self.minconn, self.maxconn, **self.connect_kwargs)
+            return self._pool
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Borrow a working connection, waiting for one to come back if all are out."""
+        self._slots.acquire()
+        try:
+            pool = self._get_pool()
+            # Idle connections the server dropped (a restart drops them all) are
+            # thrown away until a live one turns up, or a new one is opened
+            for _ in range(self.maxconn):
+                conn = pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                warnings.warn("Replacing a dropped database connection", RuntimeWarning, stacklevel=2)
+                self._last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+            return pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """Hand a connection back; open transactions are rolled back, broken connections closed."""
+        try:
+            self._last_used[id(conn)] = time.monotonic()
+            self._get_pool().putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a ``with`` block.
+
+        Example:
+            >>> with get_pool().connection() as conn:
+            ...     matches = pd.read_sql_query("SELECT * FROM matches", conn)
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close every connection; the pool opens new ones if it is used again."""
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+
+
+def get_pool(**connect_kwargs):
+    """
+    The shared pool for a set of connection parameters, created on first call.
+
+    Without arguments this is the app's pool, configured from the environment
+    (see ``connection_settings``). When SPEEDBOAT_LOCAL_DB points at a SQL dump,
+    a folder of Parquet snapshots or a DuckDB file, it is a
+    ``local_backend.LocalBackend`` on that instead, and no server is needed.
+    """
+    if not connect_kwargs:
+        local_db = os.getenv("SPEEDBOAT_LOCAL_DB")
+        if local_db:
+            return _local_backend(local_db)
+        connect_kwargs = connection_settings()
+    key = tuple(sorted(connect_kwargs.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**connect_kwargs)
+        return _pools[key]
+
+
+def _local_module():
+    # Imported here so DuckDB is only needed when the local backend is used
+    try:
+        from Python import local_backend
+    except ImportError:
+        import local_backend
+    return local_backend
+
+
+def _local_backend(path):
+    key = ("local", path)
+    with _pools_lock:
+        if key not in _pools:
+            print(f"Using the local database at {path}")
+            _pools[key] = _local_module().LocalBackend.open(path)
+        return _pools[key]
+
+
+def source_id(conn=None):
+    """
+    Short name of the database behind ``conn``, or of the shared pool's when omitted.
+
+    Results fetched from different databases must never be mixed up, e.g. by
+    the on-disk match cache, so this names PostgreSQL by host, port and
+    database and a local database by its path (see ``local_backend.source_name``).
+    Naming the shared pool's database doesn't connect or load anything.
+
+    Args:
+        conn (psycopg2.extensions.connection, optional): A connection, or a
+            cursor borrowed from a ``LocalBackend``.
+
+    Returns:
+        str | None: e.g. "pg-postgres-1a2b3c4d5e" or "local-data-1a2b3c4d5e";
+            None for a connection that can't be traced to a database (an
+            in-memory DuckDB built by hand).
+    """
+    if conn is None:
+        local_db = os.getenv("SPEEDBOAT_LOCAL_DB")
+        if local_db:
+            return _local_module().source_name(local_db)
+        params = connection_settings()
+    elif isinstance(conn, psycopg2.extensions.connection):
+        params = conn.get_dsn_parameters()
+    else:
+        backend = _local_module().backend_of(conn)
+        return backend.source_id() if backend is not None else None
+
+    params = {key: value for key, value in params.items() if value}
+    if "dsn" in params:
+        params = {**psycopg2.extensions.parse_dsn(params.pop("dsn")), **params}
+    # libpq's defaults, so the pool's settings and a live connection's parameters name the same server
+    host = params.get("host") or "localhost"
+    port = params.get("port") or "5432"
+    database = params.get("dbname") or params.get("database") or ""
+    digest = hashlib.sha1(f"{host}:{port}/{database}".encode()).hexdigest()[:10]
+    return f"pg-{re.sub(r'[^A-Za-z0-9_-]', '_', database)}-{digest}"
+
+
+@contextlib.contextmanager
+def borrow(conn=None):
+    """
+    Use ``conn`` if the caller passed one, otherwise borrow from the shared pool.
+
+    Lets every fetch function keep its ``conn`` argument while making it optional.
+    """
+    if conn is not None:
+        yield conn
+        return
+    with get_pool().connection() as pooled:
+        yield pooled
+
+
+def close_pools():
+    """Close the connections of every pool, e.g. when the app exits."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
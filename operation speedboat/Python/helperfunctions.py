@@ -1,132 +1,158 @@
+import numpy as np
 import pandas as pd
 import psycopg2
-import dotenv
-import os
 import matplotlib.pyplot as plt
 from mplsoccer import Pitch
 import matplotlib as mpl
 from IPython.display import clear_output
 
+try:
+    from Python.db_pool import borrow, connection_settings
+    from Python.match_cache import cached_frame
+    from Python import queries
+    from Python.transitions import detect_transitions, team_transitions
+    from Python.moments import match_counter_attacks
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from db_pool import borrow, connection_settings
+    from match_cache import cached_frame
+    import queries
+    from transitions import detect_transitions, team_transitions
+    from moments import match_counter_attacks
+
 
 def get_database_connection():
     """
-    Establish and return a connection to the PostgreSQL database.
+    Establish and return a new, dedicated connection to the PostgreSQL database.
+
+    Most code should borrow from the shared pool instead (``db_pool.get_pool()``,
+    or pass ``conn=None`` to the fetch functions), which reuses open connections.
 
     Returns:
         psycopg2.extensions.connection: A connection object to the database.
     """
-    dotenv.load_dotenv()
-
-    PG_PASSWORD = os.getenv("PG_PASSWORD")
-    PG_USER = os.getenv("PG_USER")
-    PG_HOST = os.getenv("PG_HOST")
-    PG_PORT = os.getenv("PG_PORT")
-    PG_DATABASE = os.getenv("PG_DB")
-
-    # Establish and return the database connection
-    return psycopg2.connect(
-        host=PG_HOST,
-        database=PG_DATABASE,
-        user=PG_USER,
-        password=PG_PASSWORD,
-        port=PG_PORT,
-        sslmode="require",
-    )
-
-def fetch_tracking_data(game_id, conn):
+    # The .env file is read once per process, see db_pool.connection_settings
+    return psycopg2.connect(**connection_settings())
+
+def fetch_tracking_data(game_id, conn=None, use_cache=True):
     """
     Fetch tracking data for a specific game from the database.
 
     Args:
         game_id (str): The ID of the game to fetch tracking data for.
-        conn (psycopg2.extensions.connection): The database connection object.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a connection is borrowed from the shared pool if omitted.
+        use_cache (bool): Read and fill the on-disk match cache (see match_cache).
 
     Returns:
         pd.DataFrame: A DataFrame containing the tracking data.
     """
-    # Ensure the connection is passed as a parameter
-    if conn is None:
-        raise ValueError("Database connection 'conn' must be provided.")
-
     try:
-        # Query to fetch tracking data
-        query = f"""
-        SELECT pt.frame_id, pt.timestamp, pt.player_id, pt.x, pt.y, p.jersey_number, p.player_name, p.team_id
-        FROM player_tracking pt
-        JOIN players p ON pt.player_id = p.player_id
-        JOIN teams t ON p.team_id = t.team_id
-        WHERE pt.game_id = '{game_id}';
-        """
-        # Execute query and load data into a DataFrame
-        tracking_df = pd.read_sql_query(query, conn)
+        # Query to fetch tracking data, bound to an exact game_id (see queries.TRACKING)
+        def load():
+            with borrow(conn) as c:
+                return queries.TRACKING.copy(c, (game_id,))
+
+        # Execute query and bulk-load the result into a DataFrame through COPY,
+        # unless this match is already in the on-disk cache (no connection needed then)
+        if use_cache:
+            tracking_df = cached_frame("tracking", game_id, load, conn)
+        else:
+            tracking_df = load()
         return tracking_df
     finally:
         # Close the connection
         # Ensure the caller handles connection closure
         pass
 
-def fetch_match_events(match_id, conn):
+def stream_tracking_data(game_id, conn=None, chunk_size=100_000, as_records=False):
+    """
+    Stream tracking data for a specific game in frame-aligned chunks.
+
+    Rows are read in batches ordered by frame_id (see ``PreparedQuery.iter_chunks``), so only one
+    chunk is ever held in memory. A frame_id is never split across two chunks:
+    the rows of the last, possibly incomplete frame of a batch are held back and
+    yielded with the next one.
+
+    Args:
+        game_id (str): The ID of the game to fetch tracking data for.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a pooled connection is held while the stream is read if omitted.
+        chunk_size (int): Approximate number of rows per chunk. A chunk is smaller
+            when rows are held back, and larger only if one frame has more rows.
+        as_records (bool): Yield NumPy record arrays instead of DataFrames.
+
+    Yields:
+        pd.DataFrame | np.recarray: Tracking rows with the same columns as
+        ``fetch_tracking_data``, complete frames only.
+    """
+    def to_chunk(chunk):
+        chunk = chunk.reset_index(drop=True)
+        return chunk.to_records(index=False) if as_records else chunk
+
+    with borrow(conn) as conn:
+        # A server-side cursor on PostgreSQL, DuckDB's streaming result on the local backend
+        pending = None
+        for batch in queries.TRACKING_STREAM.iter_chunks(conn, (game_id,), chunk_size):
+            rows = batch if pending is None else pd.concat([pending, batch], ignore_index=True)
+            # Hold back the last frame, it may continue in the next batch
+            frame_ids = rows['frame_id'].to_numpy()
+            in_last_frame = frame_ids == frame_ids[-1]
+            split = 0 if in_last_frame.all() else len(rows) - int(np.argmin(in_last_frame[::-1]))
+            if split == 0:
+                # The whole batch is one frame; keep reading until it ends
+                pending = rows
+                continue
+
+            pending = rows.iloc[split:]
+            yield to_chunk(rows.iloc[:split])
+
+        if pending is not None and len(pending):
+            yield to_chunk(pending)
+
+def fetch_match_events(match_id, conn=None, use_cache=True):
     """
     Fetch match events for a specific match from the database.
 
     Args:
         match_id (str): The ID of the match to fetch events for.
-        conn (psycopg2.extensions.connection): The database connection object.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a connection is borrowed from the shared pool if omitted.
+        use_cache (bool): Read and fill the on-disk match cache (see match_cache).
 
     Returns:
         pd.DataFrame: A DataFrame containing the match events.
     """
-    # Ensure the connection is passed as a parameter
-    if conn is None:
-        raise ValueError("Database connection 'conn' must be provided.")
-
-    # Query to fetch match events
-    query = f"""
-    SELECT me.match_id, me.event_id, me.eventtype_id, et.name AS eventtype_name, me.result, me.success, me.period_id, 
-            me.timestamp, me.end_timestamp, me.ball_state, me.ball_owning_team, 
-            me.team_id, me.player_id, me.x, me.y, me.end_coordinates_x, 
-            me.end_coordinates_y, me.receiver_player_id, rp.team_id AS receiver_team_id
-    FROM matchevents me
-    LEFT JOIN players rp ON me.receiver_player_id = rp.player_id
-    LEFT JOIN eventtypes et ON me.eventtype_id = et.eventtype_id
-    WHERE me.match_id = '{match_id}'
-    ORDER BY me.period_id ASC, me.timestamp ASC;
-    """
-    # Execute query and load data into a DataFrame
-    events_df = pd.read_sql_query(query, conn)
+    # Query to fetch match events, bound to an exact match_id (see queries.MATCH_EVENTS)
+    def load():
+        with borrow(conn) as c:
+            return queries.MATCH_EVENTS.copy(c, (match_id,))
+
+    # Execute query and bulk-load the result into a DataFrame through COPY,
+    # unless this match is already in the on-disk cache
+    if use_cache:
+        events_df = cached_frame("events", match_id, load, conn)
+    else:
+        events_df = load()
     return events_df
 
-def fetch_team_matches(team_name, conn):
+def fetch_team_matches(team_name, conn=None):
     """
     Fetch all matches for a team where the team name contains the specified string.
     The result includes a 'home' column indicating whether the team is the home team (1 for home, 0 otherwise).
 
     Args:
         team_name (str): The substring to search for in team names.
-        conn (psycopg2.extensions.connection): The database connection object.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a connection is borrowed from the shared pool if omitted.
 
     Returns:
         pd.DataFrame: A DataFrame containing the matches for the team, including a 'home' column.
     """
-    if conn is None:
-        raise ValueError("Database connection 'conn' must be provided.")
-
     try:
-        # Query to fetch matches for the team
-        query = f"""
-        SELECT m.match_id, m.match_date, m.home_team_id, ht.team_name AS home_team_name, 
-                m.away_team_id, at.team_name AS away_team_name,
-                CASE 
-                    WHEN ht.team_name ILIKE '%{team_name}%' THEN 1
-                    ELSE 0
-                END AS home
-        FROM matches m
-        JOIN teams ht ON m.home_team_id = ht.team_id
-        JOIN teams at ON m.away_team_id = at.team_id
-        WHERE ht.team_name ILIKE '%{team_name}%' OR at.team_name ILIKE '%{team_name}%';
-        """
-        # Execute query and load data into a DataFrame
-        matches_df = pd.read_sql_query(query, conn)
+        # Query to fetch matches for the team, prepared once per connection
+        with borrow(conn) as c:
+            matches_df = queries.TEAM_MATCHES.read(c, (team_name, team_name, team_name))
         return matches_df
     finally:
         # Ensure the caller handles connection closure
@@ -162,57 +188,80 @@ def calculate_ball_possession(match_id, conn, team_id):
     # Fetch match events for the given match_id
     match_events = fetch_match_events(match_id, conn)
 
-    
-    # Initialize an empty list to store changes
-    changes_list = []
-
-    # Start with the first row
-    previous_team = match_events.iloc[0]['ball_owning_team']
-    previous_match_id = match_events.iloc[0]['match_id']
-    previous_timestamp = match_events.iloc[0]['timestamp']
-
-    # Add the first row as the starting point
-    changes_list.append({
-        'match_id': previous_match_id,
-        'team_id': previous_team,
-        'timestamp': previous_timestamp
-    })
-
-    # Iterate over the rows of match_events
-    for _, row in match_events.iterrows():
-        current_team = row['ball_owning_team']
-        # Unused variable removed
-        current_timestamp = row['timestamp']
-
-        # Check if the ball_owning_team has changed
-        if current_team != previous_team:
-            # Append the change to the list
-            changes_list.append({
-                'match_id': previous_match_id,
-                'team_id': current_team,
-                'timestamp': current_timestamp
-            })
-            # Update the previous team
-            previous_team = current_team
-
-    # Create the changes dataframe
-    changes = pd.DataFrame(changes_list)
+    return possession_spells(match_events, team_id)
+
+def possession_spells(match_events, team_id):
+    """
+    Split match events into possession spells with run-length encoding.
+
+    A new spell starts wherever ``ball_owning_team`` differs from the previous
+    event (or a new match starts), found with one shift-and-compare over the
+    whole column instead of a row-by-row loop. Events of several matches can be
+    passed at once; spells never run across two matches.
+
+    Args:
+        match_events (pd.DataFrame): Events with `match_id`, `ball_owning_team` and
+            `timestamp` columns, sorted by timestamp within each match.
+        team_id (str): The team whose possession is flagged in `ball_possession`.
+
+    Returns:
+        pandas.DataFrame: One row per spell with the columns of `calculate_ball_possession`:
+            match_id, team_id, timestamp (start), ball_possession, end_time and
+            time_difference (duration). The last spell of a match has no end_time.
+    """
+    # Keep each match's events together, without reordering them within the match
+    events = match_events.sort_values('match_id', kind='stable')
+
+    match_codes = pd.factorize(events['match_id'])[0]
+    # Missing owners get a code of their own, so a run of them is a single spell
+    team_codes = pd.factorize(events['ball_owning_team'], use_na_sentinel=False)[0]
+
+    spell_starts = np.ones(len(events), dtype=bool)
+    spell_starts[1:] = (team_codes[1:] != team_codes[:-1]) | (match_codes[1:] != match_codes[:-1])
+
+    changes = events.loc[spell_starts, ['match_id', 'ball_owning_team', 'timestamp']]
+    changes = changes.rename(columns={'ball_owning_team': 'team_id'}).reset_index(drop=True)
 
     # Add ball_possession column
     changes['ball_possession'] = (changes['team_id'] == team_id).astype(int)
 
-    # Add end_time column as the timestamp of the next row
-    changes['end_time'] = changes['timestamp'].shift(-1)
-
-    # Ensure timestamp and end_time are in datetime format, coercing errors to NaT
+    # A spell ends where the next one in the same match starts
     changes['timestamp'] = pd.to_timedelta(changes['timestamp'])
-    changes['end_time'] = pd.to_timedelta(changes['end_time'])
+    changes['end_time'] = changes.groupby('match_id', sort=False)['timestamp'].shift(-1)
 
     # Calculate the time difference between timestamp and end_time
     changes['time_difference'] = changes['end_time'] - changes['timestamp']
 
     return changes
 
+def calculate_ball_possession_batch(match_ids=None, conn=None, team_id=None, match_events=None):
+    """
+    Calculate possession spells for many matches in one go.
+
+    Either pass `match_ids` (and optionally `conn`) to fetch every match's events (through the
+    on-disk cache), or pass an already loaded multi-match `match_events` frame.
+
+    Args:
+        match_ids (list, optional): The matches to fetch events for.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a connection is borrowed from the shared pool if omitted.
+        team_id (str): The team whose possession is flagged in `ball_possession`.
+        match_events (pd.DataFrame, optional): Preloaded events of one or more matches.
+
+    Returns:
+        pandas.DataFrame: The spells of all matches, as returned by `possession_spells`.
+
+    Example:
+        >>> spells = calculate_ball_possession_batch(match_ids, conn, team_id=456)
+        >>> spells.groupby('match_id')['time_difference'].sum()
+    """
+    if match_events is None:
+        if match_ids is None:
+            raise ValueError("Pass either match_ids, or a preloaded match_events frame.")
+        match_events = pd.concat([fetch_match_events(match_id, conn) for match_id in match_ids], ignore_index=True)
+
+    return possession_spells(match_events, team_id)
+
 # def get_spadl_data(match_id, conn):
 #     Query_spadl_data = f""" 
 #     SELECT spa.game_id, period_id, seconds, spa.player_id, p.player_name, spa.team_id, t.team_name, start_x, end_x, start_y, end_y, action_type, result FROM spadl_actions spa
@@ -234,12 +283,9 @@ def calculate_ball_possession(match_id, conn, team_id):
 
 #     return spadl_data_df
 
-def fetch_player_teams(team_id, conn):
-    query = f'''
-    SELECT p.player_id FROM players p
-    WHERE p.team_id = '{team_id}' AND p.player_name != 'ball';
-    '''
-    home_players = pd.read_sql_query(query, conn)
+def fetch_player_teams(team_id, conn=None):
+    with borrow(conn) as c:
+        home_players = queries.TEAM_PLAYERS.read(c, (team_id,))
     return home_players
 
 def seconds_to_hms(seconds):
@@ -252,155 +298,88 @@ def seconds_to_hms(seconds):
     except (TypeError, ValueError):
         return "00:00:00"
     
-def fetch_transitions(match_id, team_id, conn):
-    query = f"""
-    WITH action_changes AS (
-        SELECT
-            a.*,
-            LAG(a.team_id) OVER (ORDER BY a.period_id, a.seconds, a.id) AS prev_team_id,
-            LEAD(a.team_id) OVER (ORDER BY a.period_id, a.seconds, a.id) AS next_team_id
-        FROM
-            spadl_actions a
-        WHERE
-            a.game_id = '{match_id}'
-    ),
-    possession_markers AS (
-        SELECT
-            *,
-            CASE WHEN prev_team_id IS NULL OR team_id != prev_team_id THEN 1 ELSE 0 END AS is_new_possession
-        FROM
-            action_changes
-    ),
-    possession_sequences AS (
-        SELECT
-            *,
-            SUM(is_new_possession) OVER (ORDER BY period_id, seconds, id) AS possession_group
-        FROM
-            possession_markers
-    ),
-    possession_stats AS (
-        SELECT
-            possession_group,
-            team_id,
-            COUNT(*) AS action_count,
-            MAX(id) AS last_action_id,
-            MIN(id) AS first_action_id
-        FROM
-            possession_sequences
-        GROUP BY
-            possession_group, team_id
-    )
-    SELECT
-        a.id AS action_id,
-        a.game_id,
-        a.period_id,
-        a.seconds AS time_seconds,
-        a.team_id AS team_losing_possession,
-        a.next_team_id AS team_gaining_possession,
-        a.action_type AS type_name,
-        a.result AS result_name,
-        ps.action_count AS consecutive_team_actions,
-        a.start_x,
-        a.start_y,
-        a.end_x,
-        a.end_y,
-        a.id AS original_event_id,
-        start_a.period_id AS start_period_id,
-        start_a.seconds AS start_seconds
-    FROM
-        possession_sequences a
-    JOIN
-        possession_stats ps ON a.possession_group = ps.possession_group 
-        AND a.team_id = ps.team_id
-        AND a.id = ps.last_action_id
-    JOIN
-        spadl_actions start_a ON start_a.id = ps.first_action_id
-    WHERE
-        ps.action_count >= 3
-        AND a.team_id != a.next_team_id
-        AND a.next_team_id IS NOT NULL
-        AND a.start_x < 50
-        AND a.end_x > 50
-        AND a.next_team_id = '{team_id}'
-    ORDER BY
-        a.period_id,
-        a.seconds,
-        a.id;
+def fetch_spadl_actions(match_id, conn=None, use_cache=True):
     """
-    df = pd.read_sql_query(query, conn)
-
-    transitions = []
-
-    for index, row in df.iterrows():
-        period = row['period_id']
-        timestamp1 = seconds_to_hms(row['time_seconds'])
-        timestamp2 = seconds_to_hms(row['start_seconds'])
-
-        transitions.append(period)
-    return transitions
-        
-
-
-def visualise_important_moments(match_id, conn):
-    query = f'''
-        SELECT spa.* , m.home_team_id, m.away_team_id, me.ball_owning_team, t.team_name, p.player_name
-        FROM spadl_actions spa
-        JOIN matches m on spa.game_id = m.match_id
-        JOIN matchevents me on m.match_id = me.match_id
-        JOIN players p on spa.player_id = p.player_id
-        JOIN teams t on p.team_id = t.team_id
-        WHERE game_id = '{match_id}' AND start_x < 45 AND spa.period_id = 1
-        ORDER BY seconds ASC
-    '''
-    
-    important_moments_df= pd.read_sql_query(query, conn)
-    important_moments_df = important_moments_df.drop_duplicates()
-        
-    correct_types = important_moments_df[important_moments_df["action_type"].isin(["0","1","21","11"])]
-    correct_team = correct_types[correct_types["away_team_id"] == correct_types["team_id"]]
-    fail = correct_team[correct_team["result"] == "0"]
+    Fetch the SPADL actions of a match in match order (period_id, seconds, id).
 
-    times_array = fail["seconds"]
+    Args:
+        match_id (str): The ID of the match.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+        use_cache (bool): Reuse the on-disk cache of earlier fetches.
 
-    df_time = pd.DataFrame(times_array)
+    Returns:
+        pd.DataFrame: The match's spadl_actions rows.
+    """
+    def load():
+        with borrow(conn) as c:
+            return queries.SPADL_ACTIONS.read(c, (match_id,))
 
-    df_time = df_time.sort_values('seconds', ascending=True)
+    if use_cache:
+        return cached_frame("spadl_actions", match_id, load, conn)
+    return load()
 
-    query_tracking = f"""
-    SELECT pt.* , p.player_name, p.team_id, p.jersey_number, m.match_id FROM player_tracking pt
-    JOIN players p on pt.player_id = p.player_id
-    JOIN matches m on pt.game_id = m.match_id
-    WHERE pt.game_id ILIKE '%{match_id}%' AND pt.period_id = 1
-    ORDER BY timestamp ASC
+def fetch_match_transitions(match_id, conn=None, use_cache=True, actions=None):
     """
+    Detect the transitions of both teams of a match (see ``transitions.detect_transitions``).
 
-    df_tracking = pd.read_sql_query(query_tracking, conn)
-    df_tracking['timestamp'] = pd.to_timedelta(df_tracking['timestamp']).dt.total_seconds()
-    df_tracking['timestamp'] = df_tracking['timestamp'].astype('float64')
+    Args:
+        match_id (str): The ID of the match.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+        use_cache (bool): Reuse the cached SPADL actions of the match.
+        actions (pd.DataFrame, optional): The match's SPADL actions, if already loaded.
 
+    Returns:
+        pd.DataFrame: One row per transition, with time, location and sequence length.
+    """
+    if actions is None:
+        actions = fetch_spadl_actions(match_id, conn, use_cache)
+    return detect_transitions(actions)
 
-    ball_df = df_tracking[df_tracking['player_name'] == 'Ball']
+def fetch_transitions(match_id, team_id, conn=None, use_cache=True):
+    """
+    Return the period of every transition won by ``team_id``, as ``plot_team_transitions`` counts them.
 
-    valid_times = []
+    Use ``fetch_match_transitions`` for the full table of both teams.
+    """
+    transitions = team_transitions(fetch_match_transitions(match_id, conn, use_cache), team_id)
+    return transitions['period_id'].tolist()
 
-    # Loop through important times (when opponent loses ball)
-    for time in df_time['seconds']:
-        initial_ball_pos = ball_df[ball_df['timestamp'] == time]
 
-        if not initial_ball_pos.empty and initial_ball_pos.iloc[0]['x'] <= 50:
-            ball_movement = ball_df[(ball_df['timestamp'] > time) & (ball_df['timestamp'] <= time + 10)]
+def visualise_important_moments(match_id, conn=None, plot=True):
+    """
+    Find the counter-attacks of a match and plot the first one frame by frame.
 
-            # Check if the ball ever crosses x = 50
-            if not ball_movement[ball_movement['x'] > 50].empty:
-                valid_times.append(time)
+    Candidates are balls the away team lost in the home team's half; a moment
+    qualifies when the ball is over midfield within 10 seconds. Both periods
+    are searched, each against its own part of the tracking data (see
+    ``moments.match_counter_attacks``, which tests all candidates at once).
 
-    # Create a filtered DataFrame with only the valid times
-    filtered_df_time = df_time[df_time['seconds'].isin(valid_times)]
-    filtered_df_time = filtered_df_time.drop_duplicates()
+    Args:
+        match_id (str): The ID of the match.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; borrowed from the shared pool if omitted.
+        plot (bool): Plot the tracking frames around the first moment.
 
-    time = filtered_df_time.iloc[0]['seconds']
-    subset = df_tracking[((df_tracking['timestamp'] >= time -5) & (df_tracking['timestamp'] < time + 18))]
-    subset
+    Returns:
+        pd.DataFrame: Every qualifying moment, with its clip's start and end on the tracking clock.
+    """
+    with borrow(conn) as c:
+        teams = queries.MATCH_TEAMS.read(c, (match_id,))
+        actions = fetch_spadl_actions(match_id, c)
+        df_tracking = fetch_tracking_data(match_id, c)
+    if teams.empty:
+        raise ValueError(f"Match '{match_id}' not found.")
+
+    moments = match_counter_attacks(actions, df_tracking, losing_team_id=teams['away_team_id'].iloc[0])
+    if not plot or moments.empty:
+        return moments
+
+    df_tracking = df_tracking.copy()
+    df_tracking['timestamp'] = pd.to_timedelta(df_tracking['timestamp']).dt.total_seconds()
+    first = moments.iloc[0]
+    subset = df_tracking[(df_tracking['timestamp'] >= first['clip_start']) & (df_tracking['timestamp'] < first['clip_end'])]
 
     colors = ["orange", "blue"]
 
@@ -431,3 +410,5 @@ def visualise_important_moments(match_id, conn):
     for frame_id in unique_frame_ids:
         filtered_tracking_df = subset[subset['frame_id'] == frame_id]
         plot_tracking_data(filtered_tracking_df)
+
+    return moments
@@ -0,0 +1,209 @@
+import contextlib
+import glob
+import hashlib
+import os
+import re
+import threading
+import weakref
+
+try:
+    from Python.bulk_fetch import read_sql_copy
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from bulk_fetch import read_sql_copy
+
+
+# Tables the fetch functions and the app read
+TABLES = ["teams", "players", "matches", "matchevents", "eventtypes", "player_tracking", "spadl_actions"]
+
+# cursor -> the LocalBackend that lent it out, so a bare conn can be traced to its database
+_lent = weakref.WeakKeyDictionary()
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("The local backend needs DuckDB: pip install duckdb") from None
+    return duckdb
+
+
+def _translate_sql_dump(script):
+    """
+    Make a SQLite-style dump such as ``not_needed/data.sql`` run on DuckDB.
+
+    SQLite fills an ``id INTEGER PRIMARY KEY`` column by itself when an INSERT
+    leaves it out; DuckDB needs a sequence default for that.
+    """
+    statements = []
+    for table, body in re.findall(r"CREATE TABLE (\w+) \((.*?)\);", script, flags=re.S):
+        key = re.search(r"\b(\w+)\s+INTEGER\s+PRIMARY\s+KEY\b", body)
+        if key is None:
+            continue
+        sequence = f"{table}_{key.group(1)}_seq"
+        statements.append(f"CREATE SEQUENCE IF NOT EXISTS {sequence};")
+        new_body = body[:key.end()] + f" DEFAULT nextval('{sequence}')" + body[key.end():]
+        script = script.replace(f"CREATE TABLE {table} ({body});", f"CREATE TABLE {table} ({new_body});")
+    return "\n".join(statements + [script])
+
+
+class LocalBackend:
+    """
+    An embedded DuckDB database that serves the same fetch API as PostgreSQL.
+
+    It behaves like a ``db_pool.ConnectionPool``: ``connection()`` lends out a
+    cursor (DuckDB's per-thread handle on the same database), so it can be
+    passed wherever a pool or ``conn`` is expected, and ``db_pool.get_pool()``
+    returns one when SPEEDBOAT_LOCAL_DB is set. The fetch functions and
+    ``PreparedQuery`` run their SQL on it unchanged.
+
+    Example:
+        >>> backend = LocalBackend.open("not_needed/data.sql")
+        >>> with backend.connection() as conn:
+        ...     events = fetch_match_events(9001, conn, use_cache=False)
+    """
+    def __init__(self, database=":memory:", read_only=False):
+        """
+        Args:
+            database (str): DuckDB file to open (created if missing), or ":memory:".
+            read_only (bool): Open the file read-only, so several processes can share it.
+        """
+        self.database = database
+        # What the data was loaded from; ``open`` sets it for dumps and Parquet folders
+        self.source = None if database == ":memory:" else os.path.abspath(database)
+        self._conn = _duckdb().connect(database, read_only=read_only)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open a local database from whatever ``path`` points to.
+
+        Args:
+            path (str): A ``.sql`` dump (loaded into memory), a folder of
+                ``<table>.parquet`` files (see ``export_parquet``), or a DuckDB file.
+                An existing DuckDB file is opened read-only: DuckDB lets only one
+                process write to a file, and the worker processes of
+                ``clip_export`` and ``batch_metrics`` each open it.
+
+        Returns:
+            LocalBackend: The loaded backend.
+        """
+        if os.path.isdir(path):
+            backend = cls()
+            backend.load_parquet(path)
+        elif path.endswith(".sql"):
+            backend = cls()
+            backend.load_sql(path)
+        else:
+            backend = cls(path, read_only=os.path.exists(path))
+        backend.source = os.path.abspath(path)
+        return backend
+
+    def load_sql(self, path):
+        """Run a SQL dump (schema and inserts), e.g. ``not_needed/data.sql``."""
+        with open(path, encoding="utf-8") as f:
+            script = f.read()
+        with self._lock:
+            self._conn.execute(_translate_sql_dump(script))
+
+    def load_parquet(self, folder):
+        """Create (or replace) a table for every ``<table>.parquet`` file in ``folder``."""
+        paths = sorted(glob.glob(os.path.join(folder, "*.parquet")))
+        if not paths:
+            raise ValueError(f"No .parquet files found in '{folder}'.")
+        with self._lock:
+            for path in paths:
+                table = os.path.splitext(os.path.basename(path))[0]
+                if not re.fullmatch(r"\w+", table):
+                    raise ValueError(f"'{path}' is not named after a table.")
+                # DuckDB reads the Parquet file itself, no pandas round trip
+                self._conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_parquet(?)", [path])
+
+    def tables(self):
+        """Names of the tables in the database."""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute("SHOW TABLES").fetchall()]
+
+    def source_id(self):
+        """
+        Short name of the database, e.g. for keeping cached results apart; None when
+        it was built in memory by hand and so has no name.
+        """
+        return None if self.source is None else source_name(self.source)
+
+    def getconn(self):
+        with self._lock:
+            conn = self._conn.cursor()
+        _lent[conn] = self
+        return conn
+
+    def putconn(self, conn):
+        conn.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a cursor on the database for the duration of a ``with`` block."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close the database; the backend can't be used afterwards."""
+        with self._lock:
+            self._conn.close()
+
+
+def source_name(path):
+    """Short name of the local database at ``path``: its file name and a hash of the full path."""
+    path = os.path.abspath(path)
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", os.path.splitext(os.path.basename(path))[0])
+    return f"local-{name}-{hashlib.sha1(path.encode()).hexdigest()[:10]}"
+
+
+def backend_of(conn):
+    """The LocalBackend a cursor was borrowed from, or None."""
+    try:
+        return _lent.get(conn)
+    except TypeError:
+        return None
+
+
+def export_parquet(conn, folder, tables=TABLES, match_ids=None):
+    """
+    Snapshot tables of the PostgreSQL database into ``<folder>/<table>.parquet``.
+
+    ``LocalBackend.open(folder)`` then serves them offline.
+
+    Args:
+        conn (psycopg2.extensions.connection): The database connection object.
+        folder (str): Where the Parquet files go.
+        tables (list): Tables to export.
+        match_ids (list, optional): Only export these matches' rows of the per-match tables.
+
+    Returns:
+        dict: Number of rows written per table.
+    """
+    # Per-match tables and the column that holds the match
+    match_columns = {"matches": "match_id", "matchevents": "match_id",
+                     "player_tracking": "game_id", "spadl_actions": "game_id"}
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for table in tables:
+        if not re.fullmatch(r"\w+", table):
+            raise ValueError(f"'{table}' is not a table name.")
+        query, params = f"SELECT * FROM {table}", None
+        if match_ids is not None and table in match_columns:
+            query += f" WHERE {match_columns[table]} = ANY(%s)"
+            params = (list(match_ids),)
+        df = read_sql_copy(query, conn, params=params)
+        # An all-NULL text column would be stored with Parquet's "null" type,
+        # which DuckDB then refuses to compare with text ids in joins
+        for column in df.columns[df.isna().all() & (df.dtypes == object)]:
+            df[column] = df[column].astype("string")
+        df.to_parquet(os.path.join(folder, f"{table}.parquet"), index=False)
+        written[table] = len(df)
+        print(f"Exported {len(df)} rows of {table}")
+    return written
@@ -0,0 +1,148 @@
+import os
+import re
+import shutil
+import uuid
+
+import pandas as pd
+
+try:
+    from Python.db_pool import source_id
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from db_pool import source_id
+
+
+# Bump a kind's version whenever its query or columns change; files written
+# under an older version are then simply never read again.
+CACHE_VERSIONS = {
+    "tracking": 2,
+    "events": 1,
+    "spadl_actions": 1,
+}
+
+
+def get_cache_dir():
+    """
+    Return the root folder of the on-disk match cache.
+
+    Set MATCH_CACHE_DIR (e.g. in .env) to move it; defaults to ~/.cache/speedboat.
+    """
+    return os.getenv("MATCH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "speedboat"))
+
+
+def cache_enabled():
+    """The cache is on unless MATCH_CACHE_DISABLED is set, and needs pyarrow for Parquet."""
+    if os.getenv("MATCH_CACHE_DISABLED"):
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def source_dir(conn=None):
+    """
+    Return the cache folder of one database, or None when it can't be named.
+
+    Every database gets a folder of its own (see ``db_pool.source_id``), so
+    results cached from the local backend are never served for PostgreSQL or
+    the other way round.
+
+    Args:
+        conn (psycopg2.extensions.connection, optional): The connection the
+            results are fetched on; the shared pool's database when omitted.
+    """
+    source = source_id(conn)
+    return None if source is None else os.path.join(get_cache_dir(), source)
+
+
+def cache_path(kind, key, conn=None):
+    """
+    Return the Parquet file for one cached query result.
+
+    Args:
+        kind (str): The query kind, one of ``CACHE_VERSIONS``.
+        key (str | tuple): What identifies the result, e.g. a match_id.
+        conn (psycopg2.extensions.connection, optional): The connection the
+            result is fetched on; the shared pool's database when omitted.
+
+    Returns:
+        str | None: Path to ``<cache dir>/<source>/<kind>/v<version>/<key>.parquet``,
+            None when the database can't be named.
+    """
+    if kind not in CACHE_VERSIONS:
+        raise ValueError(f"Unknown cache kind '{kind}'. Choose from {sorted(CACHE_VERSIONS)}.")
+    folder = source_dir(conn)
+    if folder is None:
+        return None
+    if isinstance(key, tuple):
+        key = "__".join(str(part) for part in key)
+    safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(key))
+    return os.path.join(folder, kind, f"v{CACHE_VERSIONS[kind]}", f"{safe_key}.parquet")
+
+
+def cached_frame(kind, key, loader, conn=None):
+    """
+    Return a query result from the cache, running ``loader`` only on a miss.
+
+    Args:
+        kind (str): The query kind, one of ``CACHE_VERSIONS``.
+        key (str | tuple): What identifies the result, e.g. a match_id.
+        loader (callable): Returns the DataFrame when it isn't cached yet.
+        conn (psycopg2.extensions.connection, optional): The connection ``loader``
+            fetches on; the shared pool's database when omitted.
+
+    Returns:
+        pd.DataFrame: The cached or freshly loaded result.
+    """
+    if not cache_enabled():
+        return loader()
+
+    path = cache_path(kind, key, conn)
+    if path is None:
+        # A database without a name can't be told apart from the next one
+        return loader()
+    if os.path.exists(path):
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"Ignoring unreadable cache file {path}: {e}")
+
+    df = loader()
+
+    # Write next to the target and rename, so readers never see half a file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not cache {kind} for {key}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+
+def invalidate(kind=None, key=None, conn=None):
+    """
+    Remove the cached results of one database.
+
+    Args:
+        kind (str, optional): Only this query kind; all kinds when None.
+        key (str | tuple, optional): Only this key of ``kind``; all keys when None.
+        conn (psycopg2.extensions.connection, optional): The database's
+            connection; the shared pool's database when omitted.
+    """
+    folder = source_dir(conn)
+    if folder is None:
+        return
+    if kind is not None and key is not None:
+        path = cache_path(kind, key, conn)
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    kinds = [kind] if kind is not None else list(CACHE_VERSIONS)
+    for k in kinds:
+        shutil.rmtree(os.path.join(folder, k), ignore_errors=True)
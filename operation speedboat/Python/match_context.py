@@ -0,0 +1,98 @@
+try:
+    from Python import queries
+    from Python.db_pool import borrow
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    import queries
+    from db_pool import borrow
+
+
+# (home, away) team colors of every view: red and black, as pitch_graph
+TEAM_COLORS = ((220, 40, 40), (20, 20, 20))
+
+
+class MatchContext:
+    """
+    Everything about the people in a match that the views look up, resolved once.
+
+    Holds the roster of both teams (player_id, name, jersey number, team) and
+    the team names and colors in memory, so drawing a frame, a chart or an
+    overlay is a dictionary lookup instead of a query. ``load`` fetches it all
+    with a single query when a match is opened.
+
+    Example:
+        >>> context = MatchContext.load(match_id, home_team_id, away_team_id)
+        >>> context.players(context.home_team_id)
+        >>> context.color(context.away_team_id)
+    """
+    def __init__(self, match_id, home_team_id, away_team_id, roster, colors=TEAM_COLORS):
+        """
+        Args:
+            match_id (str): The ID of the match.
+            home_team_id (str): The ID of the home team.
+            away_team_id (str): The ID of the away team.
+            roster (pd.DataFrame): player_id, player_name, jersey_number, team_id
+                and team_name of the players of both teams.
+            colors (tuple): (home, away) RGB colors.
+        """
+        self.match_id = match_id
+        self.home_team_id = home_team_id
+        self.away_team_id = away_team_id
+        self.roster = roster.reset_index(drop=True)
+
+        # Ids are compared as strings, the tracking store keeps them that way too
+        player_ids = [str(p) for p in self.roster['player_id']]
+        team_ids = [str(t) for t in self.roster['team_id']]
+        self.team_players = {str(home_team_id): [], str(away_team_id): []}
+        for player_id, team_id in zip(player_ids, team_ids):
+            self.team_players.setdefault(team_id, []).append(player_id)
+        self.player_team = dict(zip(player_ids, team_ids))
+        self.names = dict(zip(player_ids, self.roster['player_name']))
+        self.jerseys = {player_id: None if number is None or number != number else int(number)
+                        for player_id, number in zip(player_ids, self.roster['jersey_number'])}
+        self.team_names = dict(zip(team_ids, self.roster['team_name']))
+        self.colors = {str(home_team_id): colors[0], str(away_team_id): colors[1]}
+
+    @classmethod
+    def load(cls, match_id, home_team_id, away_team_id, conn=None):
+        """
+        Fetch the roster of both teams and build the context.
+
+        Args:
+            match_id (str): The ID of the match.
+            home_team_id (str): The ID of the home team.
+            away_team_id (str): The ID of the away team.
+            conn (psycopg2.extensions.connection, optional): The database connection
+                object; borrowed from the shared pool if omitted.
+
+        Returns:
+            MatchContext: The context of the match.
+        """
+        with borrow(conn) as c:
+            roster = queries.MATCH_ROSTER.read(c, (home_team_id, away_team_id))
+        return cls(match_id, home_team_id, away_team_id, roster)
+
+    @property
+    def home_players(self):
+        return self.team_players[str(self.home_team_id)]
+
+    @property
+    def away_players(self):
+        return self.team_players[str(self.away_team_id)]
+
+    def players(self, team_id):
+        """player_ids of a team, [] for a team that isn't playing."""
+        return self.team_players.get(str(team_id), [])
+
+    def team_of(self, player_id):
+        return self.player_team.get(str(player_id))
+
+    def name(self, player_id, default=None):
+        return self.names.get(str(player_id), default)
+
+    def jersey(self, player_id, default=None):
+        return self.jerseys.get(str(player_id), default)
+
+    def color(self, team_id, default=(128, 128, 128)):
+        """RGB color of a team; grey for anyone else."""
+        return self.colors.get(str(team_id), default)
@@ -0,0 +1,113 @@
+import numpy as np
+
+try:
+    from Python.helperfunctions import fetch_match_events, fetch_match_transitions
+    from Python.transitions import team_transitions
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from helperfunctions import fetch_match_events, fetch_match_transitions
+    from transitions import team_transitions
+
+
+# Define eventtype_ids based on provided mappings
+PASS_EVENTTYPE_ID = "e319ac55-ffaf-4e6d-87f7-7601d91bcd33"
+GOODSKILL_EVENTTYPE_ID = "92c60f97-4073-4955-ba08-ec20d7a3cf98"
+
+# Passes shorter than the first edge are short, shorter than the second medium, the rest long
+PASS_DISTANCE_EDGES = (10, 40)
+
+PASS_LABELS = ["Short Passes %", "Medium Passes %", "Long Passes %", "Pass success rate %", "Initiative and controll"]
+
+# Statistics already computed this session, keyed by (match_id, home_team_id, away_team_id)
+_match_statistics = {}
+
+
+def pass_statistics(events_df, home_team_id, away_team_id):
+    """
+    Compute the pass profile of both teams of a match in one vectorized pass.
+
+    Every pass is put in a distance bucket with one ``np.digitize``, and the
+    bucket, success and goodskill counts of both teams come out of a single
+    ``np.bincount`` over (team, bucket) pairs.
+
+    Args:
+        events_df (pd.DataFrame): Output of ``fetch_match_events``.
+        home_team_id (str): The ID of the home team.
+        away_team_id (str): The ID of the away team.
+
+    Returns:
+        tuple: (home_values, away_values), each the percentages for ``PASS_LABELS``:
+            short, medium and long share of passes, pass success rate and share
+            of the match's goodskill events.
+    """
+    team_ids = events_df['team_id'].to_numpy()
+    # Row 0 is the home team, row 1 the away team, row 2 anyone else
+    team_rows = np.where(team_ids == home_team_id, 0, np.where(team_ids == away_team_id, 1, 2))
+
+    eventtypes = events_df['eventtype_id'].to_numpy()
+    is_pass = eventtypes == PASS_EVENTTYPE_ID
+    is_goodskill = eventtypes == GOODSKILL_EVENTTYPE_ID
+
+    # Calculate Euclidean distance; a pass without coordinates counts as long
+    passes = events_df.loc[is_pass, ['x', 'y', 'end_coordinates_x', 'end_coordinates_y']].to_numpy(dtype=float)
+    distance = np.hypot(passes[:, 2] - passes[:, 0], passes[:, 3] - passes[:, 1])
+    buckets = np.where(np.isnan(distance), len(PASS_DISTANCE_EDGES), np.digitize(distance, PASS_DISTANCE_EDGES))
+
+    pass_rows = team_rows[is_pass]
+    bucket_counts = np.bincount(pass_rows * 3 + buckets, minlength=9).reshape(3, 3)[:2]
+    successful = np.bincount(pass_rows, weights=events_df['success'].to_numpy()[is_pass].astype(bool), minlength=3)[:2]
+    goodskill = np.bincount(team_rows[is_goodskill], minlength=3)[:2]
+
+    total_passes = np.maximum(bucket_counts.sum(axis=1), 1)
+    total_goodskill = max(goodskill.sum(), 1)
+
+    values = np.column_stack([
+        bucket_counts / total_passes[:, None] * 100,
+        successful / total_passes * 100,
+        goodskill / total_goodskill * 100,
+    ])
+    return values[0].tolist(), values[1].tolist()
+
+
+def get_match_statistics(match_id, conn, home_team_id, away_team_id, events_df=None):
+    """
+    Return everything the graph view draws for a match, computing it only once.
+
+    Args:
+        match_id (str): The ID of the match.
+        conn (psycopg2.extensions.connection): The database connection object,
+            or None to borrow from the shared pool.
+        home_team_id (str): The ID of the home team.
+        away_team_id (str): The ID of the away team.
+        events_df (pd.DataFrame, optional): The match events, if already loaded.
+
+    Returns:
+        dict: ``labels``, ``home_values`` and ``away_values`` for the pass spider
+            chart, ``transitions`` (the table of ``fetch_match_transitions``) and
+            ``home_transitions`` and ``away_transitions``, the periods of the
+            transitions each team won, as ``fetch_transitions`` returns them.
+    """
+    key = (match_id, home_team_id, away_team_id)
+    if key not in _match_statistics:
+        if events_df is None:
+            events_df = fetch_match_events(match_id, conn)
+        home_values, away_values = pass_statistics(events_df, home_team_id, away_team_id)
+        # Both teams' transitions from one pass over the cached SPADL actions
+        transitions = fetch_match_transitions(match_id, conn)
+
+        _match_statistics[key] = {
+            'labels': PASS_LABELS,
+            'home_values': home_values,
+            'away_values': away_values,
+            'transitions': transitions,
+            'home_transitions': team_transitions(transitions, home_team_id)['period_id'].tolist(),
+            'away_transitions': team_transitions(transitions, away_team_id)['period_id'].tolist(),
+        }
+    return _match_statistics[key]
+
+
+def clear_match_statistics(match_id=None):
+    """Forget the computed statistics of one match, or of all matches when None."""
+    for key in list(_match_statistics):
+        if match_id is None or key[0] == match_id:
+            del _match_statistics[key]
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from Python.transitions import clock_strings
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from transitions import clock_strings
+
+
+# SPADL action types of a lost ball that can start a counter-attack
+COUNTER_ATTACK_ACTION_TYPES = ["0", "1", "21", "11"]
+# The ball has to get over the halfway line within this many seconds of the loss
+COUNTER_ATTACK_WINDOW = 10.0
+MIDFIELD_X = 50
+# Only balls lost short of this x (in the attacking team's own half) are candidates
+MAX_START_X = 45
+# The ball's last sample may be at most this old to count as its position at the loss
+MAX_BALL_GAP = 0.5
+# Clip around a moment, in seconds before and after it
+CLIP_BEFORE = 5.0
+CLIP_AFTER = 18.0
+
+MOMENT_COLUMNS = [
+    'action_id', 'game_id', 'period_id', 'seconds', 'clock', 'match_seconds', 'team_id', 'player_id',
+    'action_type', 'start_x', 'start_y', 'ball_x', 'crossing_seconds', 'seconds_to_cross', 'clip_start', 'clip_end',
+]
+
+
+def _tracking_seconds(timestamps):
+    if not pd.api.types.is_numeric_dtype(timestamps):
+        timestamps = pd.to_timedelta(timestamps).dt.total_seconds()
+    return timestamps.to_numpy(dtype=float)
+
+
+def period_starts(tracking):
+    """
+    Where every period starts on the tracking clock.
+
+    SPADL ``seconds`` start again at 0 every period, while tracking timestamps
+    run on one clock for the whole match (the second half starts around
+    00:50:59); adding a period's start turns an action's seconds into tracking time.
+
+    Args:
+        tracking (TrackingStore | pd.DataFrame): A tracking store, or rows as
+            ``fetch_tracking_data`` returns them, with period_id.
+
+    Returns:
+        dict: period_id (int) -> timestamp in seconds of the period's first frame.
+    """
+    if isinstance(tracking, pd.DataFrame):
+        if 'period_id' not in tracking.columns:
+            raise ValueError("The tracking data has no period_id column.")
+        periods = tracking['period_id'].to_numpy()
+        times = _tracking_seconds(tracking['timestamp'])
+    else:
+        periods = np.asarray(tracking.period_ids)
+        times = np.asarray(tracking.timestamps, dtype=float)
+    known = ~pd.isna(periods) & (periods != -1) & np.isfinite(times)
+    starts = pd.Series(times[known]).groupby(periods[known].astype(int)).min()
+    return {int(period): float(start) for period, start in starts.items()}
+
+
+def ball_track(tracking, period_id=None):
+    """
+    The ball's timestamps (seconds) and x coordinates, sorted by time.
+
+    Args:
+        tracking (TrackingStore | pd.DataFrame): A tracking store, or rows as
+            ``fetch_tracking_data`` returns them (timestamps as seconds or as
+            'HH:MM:SS.fff' strings).
+        period_id (int, optional): Only this period's samples; the whole match when None.
+
+    Returns:
+        tuple: (timestamps, x) as float arrays on the tracking clock, samples
+            without a position left out.
+    """
+    if isinstance(tracking, pd.DataFrame):
+        ball = tracking[tracking['player_name'] == 'Ball']
+        if period_id is not None:
+            ball = ball[ball['period_id'].astype(int) == int(period_id)]
+        times = _tracking_seconds(ball['timestamp'])
+        x = ball['x'].to_numpy(dtype=float)
+    else:
+        column = np.flatnonzero(tracking.player_names == 'Ball')
+        if len(column) == 0:
+            return np.empty(0), np.empty(0)
+        frames = slice(None) if period_id is None else np.asarray(tracking.period_ids) == int(period_id)
+        times = np.asarray(tracking.timestamps, dtype=float)[frames]
+        x = np.asarray(tracking.positions[:, column[0], 0], dtype=float)[frames]
+
+    present = np.isfinite(times) & np.isfinite(x)
+    times, x = times[present], x[present]
+    order = np.argsort(times, kind='stable')
+    return times[order], x[order]
+
+
+def find_counter_attacks(actions, ball_times, ball_x, losing_team_id=None, period_start=0.0,
+                         window=COUNTER_ATTACK_WINDOW, midfield=MIDFIELD_X, max_start_x=MAX_START_X,
+                         max_ball_gap=MAX_BALL_GAP, clip_before=CLIP_BEFORE, clip_after=CLIP_AFTER):
+    """
+    Find the counter-attacks of one period: a lost ball the other team carries over midfield within ``window`` seconds.
+
+    A candidate is a failed pass, cross, dribble or take-on (see
+    COUNTER_ATTACK_ACTION_TYPES) by ``losing_team_id`` starting before
+    ``max_start_x``. It qualifies when the ball is at or behind the halfway
+    line at that moment and gets past it within ``window`` seconds.
+
+    All candidates are tested at once: ``np.searchsorted`` on the sorted ball
+    timestamps gives every candidate's ball sample and the end of its window,
+    and a second search in the sorted indexes of the samples past midfield
+    gives the first crossing inside each window.
+
+    SPADL seconds restart every period, so the actions and the ball track must
+    be of the same period, and ``period_start`` puts the actions on the
+    tracking clock; ``match_counter_attacks`` does this for every period.
+
+    Args:
+        actions (pd.DataFrame): spadl_actions rows of one period (see ``fetch_spadl_actions``).
+        ball_times (np.ndarray): Sorted ball timestamps of that period in seconds (see ``ball_track``).
+        ball_x (np.ndarray): Ball x (opta) at those timestamps.
+        losing_team_id (str, optional): Team whose lost balls are candidates; every team when None.
+        period_start (float): The period's first timestamp on the tracking clock (see ``period_starts``).
+        window (float): Seconds the ball has to get over midfield in.
+        midfield (float): x coordinate of the halfway line.
+        max_start_x (float): Candidates start before this x.
+        max_ball_gap (float): Most seconds between a candidate and the ball sample before it.
+        clip_before (float): Seconds before the moment its clip starts.
+        clip_after (float): Seconds after the moment its clip ends.
+
+    Returns:
+        pd.DataFrame: One row per counter-attack in match order, with the columns
+            of MOMENT_COLUMNS: the action that lost the ball (``seconds`` and
+            ``clock`` in the period, ``match_seconds`` on the tracking clock),
+            where the ball was (``ball_x``), when it crossed midfield
+            (``crossing_seconds``, ``seconds_to_cross``) and the clip around it
+            (``clip_start`` and ``clip_end`` on the tracking clock), ready for
+            ``PlaybackClock.seek`` or ``SoccerAnimation.animate_from_database``.
+    """
+    ball_times = np.asarray(ball_times, dtype=float)
+    ball_x = np.asarray(ball_x, dtype=float)
+
+    candidates = actions[
+        actions['action_type'].astype(str).isin(COUNTER_ATTACK_ACTION_TYPES)
+        & (actions['result'].astype(str) == "0")
+        & (actions['start_x'].astype(float) < max_start_x)
+    ]
+    if losing_team_id is not None:
+        candidates = candidates[candidates['team_id'].astype(str) == str(losing_team_id)]
+    # Several actions at the same moment are the same counter-attack
+    candidates = candidates.sort_values(['period_id', 'seconds', 'id'], kind='stable')
+    candidates = candidates.drop_duplicates(['period_id', 'seconds']).reset_index(drop=True)
+    if len(candidates) == 0 or len(ball_times) == 0:
+        return pd.DataFrame(columns=MOMENT_COLUMNS)
+
+    # The candidates' moments in the period, and on the tracking clock
+    period_seconds = candidates['seconds'].to_numpy(dtype=float)
+    seconds = period_seconds + period_start
+
+    # The ball's last sample at or before every candidate, if there is a recent one
+    at = np.searchsorted(ball_times, seconds, side='right') - 1
+    at_clipped = np.maximum(at, 0)
+    has_ball = (at >= 0) & (seconds - ball_times[at_clipped] <= max_ball_gap)
+    ball_at = ball_x[at_clipped]
+
+    # Window of samples after the candidate: [at + 1, end)
+    end = np.searchsorted(ball_times, seconds + window, side='right')
+    beyond = np.flatnonzero(ball_x > midfield)
+    k = np.searchsorted(beyond, at + 1, side='left')
+    crossing = beyond[np.minimum(k, len(beyond) - 1)] if len(beyond) else np.zeros(len(seconds), dtype=int)
+    crosses = (k < len(beyond)) & (crossing < end)
+
+    qualifies = has_ball & (ball_at <= midfield) & crosses
+    moments = candidates[qualifies]
+    period_seconds, seconds = period_seconds[qualifies], seconds[qualifies]
+    crossing_seconds = ball_times[crossing[qualifies]]
+
+    return pd.DataFrame({
+        'action_id': moments['id'].to_numpy(),
+        'game_id': moments['game_id'].to_numpy(),
+        'period_id': moments['period_id'].to_numpy(),
+        'seconds': period_seconds,
+        'clock': clock_strings(period_seconds),
+        'match_seconds': seconds,
+        'team_id': moments['team_id'].to_numpy(),
+        'player_id': moments['player_id'].to_numpy(),
+        'action_type': moments['action_type'].to_numpy(),
+        'start_x': moments['start_x'].to_numpy(),
+        'start_y': moments['start_y'].to_numpy(),
+        'ball_x': ball_at[qualifies],
+        'crossing_seconds': crossing_seconds,
+        'seconds_to_cross': crossing_seconds - seconds,
+        'clip_start': np.maximum(seconds - clip_before, period_start),
+        'clip_end': seconds + clip_after,
+    }, columns=MOMENT_COLUMNS)
+
+
+def match_counter_attacks(actions, tracking, losing_team_id=None, **kwargs):
+    """
+    Find the counter-attacks of a whole match, period by period.
+
+    Every period's actions are searched in that period's ball track only,
+    shifted onto the tracking clock by the period's start (see ``period_starts``).
+    Periods without tracking data have no counter-attacks.
+
+    Args:
+        actions (pd.DataFrame): spadl_actions rows of one match (see ``fetch_spadl_actions``).
+        tracking (TrackingStore | pd.DataFrame): The match's tracking data, with period_id.
+        losing_team_id (str, optional): Team whose lost balls are candidates; every team when None.
+        **kwargs: Passed to ``find_counter_attacks`` (window, midfield, clip_before, ...).
+
+    Returns:
+        pd.DataFrame: One row per counter-attack in match order, see ``find_counter_attacks``.
+    """
+    starts = period_starts(tracking)
+    found = []
+    for period_id, period_actions in actions.groupby(actions['period_id'].astype(int), sort=True):
+        if period_id not in starts:
+            continue
+        found.append(find_counter_attacks(period_actions, *ball_track(tracking, period_id), losing_team_id,
+                                          period_start=starts[period_id], **kwargs))
+    if not found:
+        return pd.DataFrame(columns=MOMENT_COLUMNS)
+    return pd.concat(found, ignore_index=True)
@@ -0,0 +1,209 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.spatial import Voronoi, cKDTree
+
+
+# Tracking coordinates are opta (0-100 on both axes); distances are worked out in metres
+PITCH_LENGTH = 105
+PITCH_WIDTH = 68
+
+HOME = 0
+AWAY = 1
+NO_TEAM = -1  # the ball, or anyone not on either team
+
+
+class PitchGrid:
+    """
+    Cell centres covering the pitch, shared by every frame (and every match) at one resolution.
+
+    Attributes:
+        nx, ny (int): Cells along the length and the width.
+        centers (np.ndarray): (ny * nx, 2) cell centres in metres, row-major from the bottom left.
+        cell_area (float): Area of one cell in square metres.
+    """
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.nx = int(np.ceil(PITCH_LENGTH / cell_size))
+        self.ny = int(np.ceil(PITCH_WIDTH / cell_size))
+        xs = (np.arange(self.nx) + 0.5) * PITCH_LENGTH / self.nx
+        ys = (np.arange(self.ny) + 0.5) * PITCH_WIDTH / self.ny
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        self.centers = np.column_stack([grid_x.ravel(), grid_y.ravel()])
+        self.cell_area = (PITCH_LENGTH / self.nx) * (PITCH_WIDTH / self.ny)
+
+
+@lru_cache(maxsize=None)
+def get_grid(cell_size=1.0):
+    """The PitchGrid for a cell size, built once."""
+    return PitchGrid(cell_size)
+
+
+def to_metres(positions):
+    """Opta coordinates (..., 2) to metres."""
+    return np.asarray(positions, dtype=np.float64) * np.array([PITCH_LENGTH / 100, PITCH_WIDTH / 100])
+
+
+def team_rows(team_ids, home_team_id, away_team_id):
+    """
+    HOME, AWAY or NO_TEAM for every object column, e.g. of ``TrackingStore.team_ids``.
+
+    Ids are compared as strings, as ``MatchContext`` does: the store keeps them
+    as text while the matches table can hand out integers (the local backend does).
+    """
+    team_ids = np.array([str(t) for t in team_ids], dtype=object)
+    home, away = str(home_team_id), str(away_team_id)
+    return np.where(team_ids == home, HOME, np.where(team_ids == away, AWAY, NO_TEAM)).astype(np.int8)
+
+
+def _frames(positions):
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        positions = positions[None]
+    return positions
+
+
+def voronoi_control(positions, teams, cell_size=1.0):
+    """
+    Voronoi ownership of the pitch for a range of frames.
+
+    Every grid cell belongs to the team of the nearest player, looked up with
+    a KD-tree over that frame's players. Players missing from a frame (NaN)
+    and objects without a team are left out.
+
+    Args:
+        positions (np.ndarray): (n_frames, n_objects, 2) or (n_objects, 2) opta coordinates.
+        teams (np.ndarray): HOME, AWAY or NO_TEAM per object, see ``team_rows``.
+        cell_size (float): Grid resolution in metres.
+
+    Returns:
+        tuple: (home_share, areas). ``home_share`` is (n_frames, ny, nx) float32,
+            1 where the home team owns the cell and 0 where the away team does;
+            ``areas`` is (n_frames, 2) square metres owned by home and away.
+    """
+    positions = _frames(positions)
+    grid = get_grid(cell_size)
+    teams = np.asarray(teams)
+    home_share = np.full((len(positions), grid.ny * grid.nx), np.nan, dtype=np.float32)
+
+    for f, frame in enumerate(to_metres(positions)):
+        players = (teams != NO_TEAM) & ~np.isnan(frame).any(axis=1)
+        if not players.any():
+            continue
+        _, nearest = cKDTree(frame[players]).query(grid.centers)
+        home_share[f] = teams[players][nearest] == HOME
+
+    home_share = home_share.reshape(len(positions), grid.ny, grid.nx)
+    return home_share, control_areas(home_share, cell_size)
+
+
+def time_to_intercept_control(positions, teams, cell_size=1.0, velocities=None,
+                              reaction_time=0.7, max_speed=5.0, sigma=0.45, chunk_size=16):
+    """
+    Grid-based pitch control from the time each player needs to reach each cell.
+
+    A player reaches a cell after ``reaction_time`` (moving on with their current
+    velocity meanwhile, if given) plus the straight run at ``max_speed``. The
+    home team's control of a cell is a logistic function of how much sooner its
+    fastest player gets there than the away team's. Frames are processed in
+    chunks as one (frames, cells, players) NumPy array each.
+
+    Args:
+        positions (np.ndarray): (n_frames, n_objects, 2) or (n_objects, 2) opta coordinates.
+        teams (np.ndarray): HOME, AWAY or NO_TEAM per object, see ``team_rows``.
+        cell_size (float): Grid resolution in metres.
+        velocities (np.ndarray, optional): Same shape as ``positions``, in opta units per second.
+        reaction_time (float): Seconds before a player changes direction.
+        max_speed (float): Running speed in metres per second.
+        sigma (float): Spread of the arrival times in seconds; smaller is more decisive.
+        chunk_size (int): Frames per NumPy batch, to bound memory.
+
+    Returns:
+        tuple: (home_share, areas) as ``voronoi_control``, with ``home_share`` the
+            home team's control probability of every cell.
+    """
+    positions = _frames(positions)
+    grid = get_grid(cell_size)
+    teams = np.asarray(teams)
+    home, away = teams == HOME, teams == AWAY
+    home_share = np.empty((len(positions), grid.ny * grid.nx), dtype=np.float32)
+
+    start_points = to_metres(positions)
+    if velocities is not None:
+        start_points = start_points + to_metres(_frames(velocities)) * reaction_time
+    start_points = start_points.astype(np.float32)
+    cells = grid.centers.astype(np.float32)
+
+    for start in range(0, len(positions), chunk_size):
+        points = start_points[start:start + chunk_size]
+        # (frames, cells, players) arrival times; missing players never arrive
+        distance = np.hypot(cells[None, :, None, 0] - points[:, None, :, 0],
+                            cells[None, :, None, 1] - points[:, None, :, 1])
+        arrival = reaction_time + distance / max_speed
+        arrival = np.where(np.isnan(arrival), np.inf, arrival)
+
+        home_time = arrival[:, :, home].min(axis=-1, initial=np.inf)
+        away_time = arrival[:, :, away].min(axis=-1, initial=np.inf)
+        with np.errstate(invalid='ignore', over='ignore'):
+            advantage = np.clip(away_time - home_time, -60, 60)
+            share = 1 / (1 + np.exp(-np.pi / np.sqrt(3) / sigma * advantage))
+        # Neither team on the pitch: nobody controls anything
+        share[np.isinf(home_time) & np.isinf(away_time)] = np.nan
+        home_share[start:start + chunk_size] = share
+
+    home_share = home_share.reshape(len(positions), grid.ny, grid.nx)
+    return home_share, control_areas(home_share, cell_size)
+
+
+def control_areas(home_share, cell_size=1.0):
+    """(n_frames, 2) square metres controlled by home and away, from a home share grid."""
+    grid = get_grid(cell_size)
+    home_area = np.nansum(home_share, axis=(1, 2)) * grid.cell_area
+    away_area = np.nansum(1 - home_share, axis=(1, 2)) * grid.cell_area
+    return np.column_stack([home_area, away_area])
+
+
+def voronoi_polygons(frame_positions, teams):
+    """
+    Voronoi cells of one frame's players, clipped to the pitch.
+
+    The players are mirrored across all four touchlines before SciPy's
+    Voronoi runs, which makes every original player's cell finite and
+    bounded exactly by the pitch.
+
+    Args:
+        frame_positions (np.ndarray): (n_objects, 2) opta coordinates.
+        teams (np.ndarray): HOME, AWAY or NO_TEAM per object.
+
+    Returns:
+        dict: HOME and AWAY each map to a list of (k, 2) polygons in opta coordinates.
+    """
+    polygons = {HOME: [], AWAY: []}
+    teams = np.asarray(teams)
+    players = (teams != NO_TEAM) & ~np.isnan(frame_positions).any(axis=1)
+    # Players off the pitch are treated as standing on the touchline
+    points = np.clip(np.asarray(frame_positions, dtype=np.float64)[players], 0, 100)
+    if len(points) == 0:
+        return polygons
+    if len(points) == 1:
+        polygons[teams[players][0]].append(np.array([[0, 0], [100, 0], [100, 100], [0, 100]], dtype=np.float64))
+        return polygons
+
+    # Work in metres so the cells are true Voronoi cells on the real pitch
+    points = to_metres(points)
+    mirrored = [points,
+                np.column_stack([-points[:, 0], points[:, 1]]),
+                np.column_stack([2 * PITCH_LENGTH - points[:, 0], points[:, 1]]),
+                np.column_stack([points[:, 0], -points[:, 1]]),
+                np.column_stack([points[:, 0], 2 * PITCH_WIDTH - points[:, 1]])]
+    vor = Voronoi(np.concatenate(mirrored))
+
+    to_opta = np.array([100 / PITCH_LENGTH, 100 / PITCH_WIDTH])
+    for team, region_index in zip(teams[players], vor.point_region[:len(points)]):
+        region = vor.regions[region_index]
+        if not region or -1 in region:
+            # A player standing exactly on a teammate shares their cell
+            continue
+        polygon = np.clip(vor.vertices[region], [0, 0], [PITCH_LENGTH, PITCH_WIDTH]) * to_opta
+        polygons[team].append(polygon)
+    return polygons
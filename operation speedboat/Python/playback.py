@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+
+# Speeds the playback controls step through
+PLAYBACK_SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+
+class PlaybackClock:
+    """
+    Map wall-clock time onto tracking frames, independent of the render frame rate.
+
+    The clock keeps a position in match seconds that advances with real time
+    times the playback speed. Every tick looks up the frame showing that moment
+    with a binary search in the sorted frame timestamps, so a slow render simply
+    skips frames instead of slowing the replay down.
+    """
+    def __init__(self, timestamps, speed=1.0, playing=True, time_source=time.perf_counter):
+        """
+        Start a clock at the first frame.
+
+        Args:
+            timestamps (np.ndarray): Match-clock seconds of every frame, sorted
+                ascending (e.g. ``TrackingStore.timestamps``).
+            speed (float): Match seconds played per real second.
+            playing (bool): Whether playback starts right away.
+            time_source (callable): Returns the current wall-clock time in seconds.
+        """
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(self.timestamps) == 0:
+            raise ValueError("A playback clock needs at least one frame.")
+        if np.any(np.diff(self.timestamps) < 0):
+            raise ValueError("Frame timestamps must be sorted ascending.")
+
+        self.start = float(self.timestamps[0])
+        self.end = float(self.timestamps[-1])
+        self.position = self.start
+        self.speed = speed
+        self.playing = playing
+        self.time_source = time_source
+        self._last_tick = time_source()
+
+        self.frame_index = 0
+        self.frames_skipped = 0  # frames stepped over because rendering fell behind
+
+    def tick(self):
+        """
+        Advance by the real time since the previous tick and return the frame to draw.
+
+        Playback pauses by itself at the last frame.
+        """
+        now = self.time_source()
+        if self.playing:
+            self.position = min(self.position + (now - self._last_tick) * self.speed, self.end)
+            if self.position >= self.end:
+                self.playing = False
+        self._last_tick = now
+
+        frame_index = self.frame_at(self.position)
+        if frame_index > self.frame_index + 1:
+            self.frames_skipped += frame_index - self.frame_index - 1
+        self.frame_index = frame_index
+        return frame_index
+
+    def frame_at(self, seconds):
+        """Index of the last frame at or before ``seconds`` (clamped to the match)."""
+        i = np.searchsorted(self.timestamps, seconds, side='right') - 1
+        return int(np.clip(i, 0, len(self.timestamps) - 1))
+
+    def play(self):
+        # Playing again at the end starts over
+        if self.position >= self.end:
+            self.position = self.start
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def seek(self, seconds):
+        """Jump to a match time, clamped to the match."""
+        self.position = float(np.clip(seconds, self.start, self.end))
+        # A seek is not rendering falling behind
+        self.frame_index = self.frame_at(self.position)
+
+    def seek_by(self, delta):
+        self.seek(self.position + delta)
+
+    def seek_fraction(self, fraction):
+        """Jump to a point of the match, 0 being the first frame and 1 the last."""
+        self.seek(self.start + fraction * (self.end - self.start))
+
+    def set_speed(self, speed):
+        if speed <= 0:
+            raise ValueError(f"Playback speed must be positive, got {speed}.")
+        self.speed = speed
+
+    def faster(self):
+        """Step up to the next of ``PLAYBACK_SPEEDS``."""
+        faster = [s for s in PLAYBACK_SPEEDS if s > self.speed]
+        if faster:
+            self.speed = faster[0]
+
+    def slower(self):
+        """Step down to the previous of ``PLAYBACK_SPEEDS``."""
+        slower = [s for s in PLAYBACK_SPEEDS if s < self.speed]
+        if slower:
+            self.speed = slower[-1]
@@ -0,0 +1,133 @@
+import itertools
+import queue
+import threading
+
+
+# Queue priorities: something the user clicked always goes before a speculative prefetch
+PRIORITY_NOW = 0
+PRIORITY_PREFETCH = 1
+
+
+class MatchPrefetcher:
+    """
+    Load match data on background threads so the UI never waits on the database.
+
+    ``loader(match_id, *args, progress=callback)`` does the actual fetching and
+    calls ``progress(done, total, label)`` between its steps. Requests are
+    de-duplicated per match_id and served most urgent first; ``get`` never
+    blocks and simply returns None until the data is there.
+
+    Loaders that share one psycopg2 connection must run with a single worker:
+    a connection can't serve two queries (let alone two COPYs) at once.
+    """
+    def __init__(self, loader, workers=1):
+        """
+        Start the worker threads.
+
+        Args:
+            loader (callable): Fetches and returns the data of one match.
+            workers (int): Number of matches loaded at the same time.
+        """
+        self.loader = loader
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()  # keeps equal priorities first come, first served
+        self._lock = threading.Lock()
+
+        self._results = {}
+        self._errors = {}
+        self._progress = {}
+        self._queued = {}  # match_id -> best priority it is queued with
+        self._loading = set()
+
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def request(self, match_id, *args, priority=PRIORITY_NOW):
+        """
+        Ask for a match to be loaded; does nothing if it is loaded or on its way.
+
+        A match that is already queued as a prefetch is moved up when it is
+        requested again with a more urgent priority.
+        """
+        with self._lock:
+            if match_id in self._results or match_id in self._errors or match_id in self._loading:
+                return
+            if match_id in self._queued and self._queued[match_id] <= priority:
+                return
+            self._queued[match_id] = priority
+            self._progress.setdefault(match_id, (0, 1, "Waiting"))
+        self._queue.put((priority, next(self._order), match_id, args))
+
+    def prefetch(self, match_id, *args):
+        """Load a match in the background when there's nothing more urgent to do."""
+        self.request(match_id, *args, priority=PRIORITY_PREFETCH)
+
+    def get(self, match_id):
+        """Return the loaded data, or None if it isn't ready (yet)."""
+        with self._lock:
+            return self._results.get(match_id)
+
+    def status(self, match_id):
+        """One of "missing", "queued", "loading", "ready" or "failed"."""
+        with self._lock:
+            if match_id in self._results:
+                return "ready"
+            if match_id in self._errors:
+                return "failed"
+            if match_id in self._loading:
+                return "loading"
+            if match_id in self._queued:
+                return "queued"
+            return "missing"
+
+    def progress(self, match_id):
+        """(done, total, label) of the step the loader last reported."""
+        with self._lock:
+            return self._progress.get(match_id, (0, 1, ""))
+
+    def error(self, match_id):
+        """The exception a failed load raised, or None."""
+        with self._lock:
+            return self._errors.get(match_id)
+
+    def retry(self, match_id, *args):
+        """Forget a failed load and queue the match again."""
+        with self._lock:
+            self._errors.pop(match_id, None)
+        self.request(match_id, *args)
+
+    def shutdown(self):
+        """Let the workers finish their current match and stop."""
+        for _ in self._threads:
+            self._queue.put((PRIORITY_PREFETCH + 1, next(self._order), None, ()))
+
+    def _work(self):
+        while True:
+            priority, _, match_id, args = self._queue.get()
+            if match_id is None:
+                return
+
+            with self._lock:
+                # Skip stale entries: the match was moved up and already handled
+                if self._queued.get(match_id) != priority:
+                    continue
+                del self._queued[match_id]
+                self._loading.add(match_id)
+
+            def report(done, total, label, match_id=match_id):
+                with self._lock:
+                    self._progress[match_id] = (done, total, label)
+
+            try:
+                data = self.loader(match_id, *args, progress=report)
+            except Exception as e:
+                print(f"Loading match {match_id} failed: {e}")
+                with self._lock:
+                    self._errors[match_id] = e
+            else:
+                with self._lock:
+                    self._results[match_id] = data
+            finally:
+                with self._lock:
+                    self._loading.discard(match_id)
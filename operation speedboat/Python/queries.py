@@ -0,0 +1,364 @@
+import re
+import threading
+import uuid
+import weakref
+
+import pandas as pd
+import psycopg2
+import psycopg2.errors
+
+try:
+    from Python.bulk_fetch import read_sql_copy
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from bulk_fetch import read_sql_copy
+
+
+# Statement names prepared on each connection; a connection's set goes away with it
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+# Queries run per thread, so the render loop can check it ran none while the
+# prefetch workers keep querying (see queries_run)
+_counter = threading.local()
+
+
+def _numbered(sql):
+    """Turn psycopg2's %s placeholders into PostgreSQL's $1, $2, ... (and %% back into %)."""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group(0) == '%%':
+            return '%'
+        count += 1
+        return f'${count}'
+
+    return re.sub(r'%%|%s', number, sql), count
+
+
+def _count():
+    _counter.n = getattr(_counter, 'n', 0) + 1
+
+
+def queries_run():
+    """
+    Number of queries the calling thread has run so far.
+
+    Every fetch goes through a PreparedQuery, so comparing this before and
+    after a block of code tells whether that block touched the database.
+    """
+    return getattr(_counter, 'n', 0)
+
+
+def _is_duckdb(conn):
+    # A connection (or cursor) of the local backend, see local_backend.LocalBackend
+    return type(conn).__name__ == 'DuckDBPyConnection'
+
+
+class PreparedQuery:
+    """
+    A query with bound parameters that the server parses and plans once per connection.
+
+    The SQL uses psycopg2's ``%s`` placeholders. ``read`` PREPAREs it under
+    ``name`` the first time a connection runs it and EXECUTEs it from then on,
+    so pooled connections that run the same fetch for match after match skip
+    parsing and planning. ``copy`` runs it through ``read_sql_copy`` instead,
+    for results large enough that COPY's throughput matters more (COPY can't
+    run a prepared statement, but the parameters are still bound safely).
+    """
+    def __init__(self, name, sql):
+        """
+        Args:
+            name (str): Statement name, unique among the queries.
+            sql (str): The SELECT query with ``%s`` placeholders.
+        """
+        self.name = name
+        self.sql = sql.strip().rstrip(';')
+        self.server_sql, self.n_params = _numbered(self.sql)
+
+    def prepare(self, conn):
+        """PREPARE the statement on ``conn`` unless it already is."""
+        with _prepared_lock:
+            if self.name in _prepared.get(conn, ()):
+                return
+        with conn.cursor() as cursor:
+            cursor.execute(f"PREPARE {self.name} AS {self.server_sql}")
+        with _prepared_lock:
+            _prepared.setdefault(conn, set()).add(self.name)
+
+    def read(self, conn, params=()):
+        """
+        Run the prepared statement and return its result as a DataFrame.
+
+        Args:
+            conn (psycopg2.extensions.connection): The database connection object.
+                DuckDB connections (the local backend) run the same SQL directly,
+                other DB-API connections through ``pd.read_sql_query``.
+            params (tuple): One value per ``%s``.
+
+        Returns:
+            pd.DataFrame: The query result.
+        """
+        if len(params) != self.n_params:
+            raise ValueError(f"Query '{self.name}' takes {self.n_params} parameters, got {len(params)}.")
+        _count()
+        if _is_duckdb(conn):
+            # DuckDB caches the plan itself and understands the $n placeholders
+            return conn.execute(self.server_sql, list(params)).df()
+        if not isinstance(conn, psycopg2.extensions.connection):
+            return pd.read_sql_query(self.sql, conn, params=params)
+
+        self.prepare(conn)
+        execute = f"EXECUTE {self.name}" + (f" ({', '.join(['%s'] * self.n_params)})" if self.n_params else "")
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(execute, params)
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Dropped behind our back (DISCARD ALL, a pooler): prepare again once
+            conn.rollback()
+            with _prepared_lock:
+                _prepared.get(conn, set()).discard(self.name)
+            self.prepare(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(execute, params)
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    def copy(self, conn, params=()):
+        """Run the query through COPY (see ``read_sql_copy``) with bound parameters."""
+        if len(params) != self.n_params:
+            raise ValueError(f"Query '{self.name}' takes {self.n_params} parameters, got {len(params)}.")
+        _count()
+        if _is_duckdb(conn):
+            # No COPY on the local backend, and no need for it: results come back columnar
+            return conn.execute(self.server_sql, list(params)).df()
+        return read_sql_copy(self.sql, conn, params=params)
+
+    def iter_chunks(self, conn, params=(), chunk_size=100_000):
+        """
+        Run the query and yield its rows ``chunk_size`` at a time, without holding them all.
+
+        On PostgreSQL this uses a named (server-side) cursor, on the local
+        backend DuckDB's own streaming fetch.
+
+        Yields:
+            pd.DataFrame: ``chunk_size`` consecutive rows; the last chunk may be shorter.
+        """
+        if len(params) != self.n_params:
+            raise ValueError(f"Query '{self.name}' takes {self.n_params} parameters, got {len(params)}.")
+        _count()
+        if _is_duckdb(conn):
+            result = conn.execute(self.server_sql, list(params))
+            # DuckDB hands out fixed-size vectors (2048 rows); collect them until a
+            # chunk_size chunk is full, so both backends yield the same chunks
+            pending, pending_rows = [], 0
+            while True:
+                vector = result.fetch_df_chunk()
+                if not vector.empty:
+                    pending.append(vector)
+                    pending_rows += len(vector)
+                if pending and (pending_rows >= chunk_size or vector.empty):
+                    rows = pd.concat(pending, ignore_index=True)
+                    full = len(rows) - len(rows) % chunk_size if not vector.empty else len(rows)
+                    for start in range(0, full, chunk_size):
+                        yield rows.iloc[start:start + chunk_size].reset_index(drop=True)
+                    pending = [rows.iloc[full:]] if full < len(rows) else []
+                    pending_rows = len(rows) - full
+                if vector.empty:
+                    return
+        else:
+            # Named cursors live on the server per session; a fresh suffix per call keeps
+            # two streams open on one connection (or the same id reused) from colliding
+            with conn.cursor(name=f"{self.name}_{uuid.uuid4().hex[:8]}") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(self.sql, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if columns is None:
+                        columns = [col[0] for col in cursor.description]
+                    if not rows:
+                        return
+                    yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+# Every id below is matched exactly, so the (game_id / match_id / team_id) indexes can be used
+
+TRACKING = PreparedQuery("speedboat_tracking", """
+    SELECT pt.frame_id, pt.timestamp, pt.period_id, pt.player_id, pt.x, pt.y, p.jersey_number, p.player_name, p.team_id
+    FROM player_tracking pt
+    JOIN players p ON pt.player_id = p.player_id
+    JOIN teams t ON p.team_id = t.team_id
+    WHERE pt.game_id = %s
+""")
+
+TRACKING_STREAM = PreparedQuery("speedboat_tracking_stream", """
+    SELECT pt.frame_id, pt.timestamp, pt.period_id, pt.player_id, pt.x, pt.y, p.jersey_number, p.player_name, p.team_id
+    FROM player_tracking pt
+    JOIN players p ON pt.player_id = p.player_id
+    JOIN teams t ON p.team_id = t.team_id
+    WHERE pt.game_id = %s
+    ORDER BY pt.frame_id
+""")
+
+MATCH_EVENTS = PreparedQuery("speedboat_match_events", """
+    SELECT me.match_id, me.event_id, me.eventtype_id, et.name AS eventtype_name, me.result, me.success, me.period_id,
+            me.timestamp, me.end_timestamp, me.ball_state, me.ball_owning_team,
+            me.team_id, me.player_id, me.x, me.y, me.end_coordinates_x,
+            me.end_coordinates_y, me.receiver_player_id, rp.team_id AS receiver_team_id
+    FROM matchevents me
+    LEFT JOIN players rp ON me.receiver_player_id = rp.player_id
+    LEFT JOIN eventtypes et ON me.eventtype_id = et.eventtype_id
+    WHERE me.match_id = %s
+    ORDER BY me.period_id ASC, me.timestamp ASC
+""")
+
+# Every match with both team names, for the app's match list
+MATCHES = PreparedQuery("speedboat_matches", """
+    SELECT m.match_id, m.match_date, t_home.team_name AS home_team_name, t_away.team_name AS away_team_name,
+            m.home_team_id, m.away_team_id
+    FROM matches m
+    JOIN teams t_home ON m.home_team_id = t_home.team_id
+    JOIN teams t_away ON m.away_team_id = t_away.team_id
+""")
+
+# Team names are searched by substring on purpose (users type part of a name)
+TEAM_MATCHES = PreparedQuery("speedboat_team_matches", """
+    SELECT m.match_id, m.match_date, m.home_team_id, t_home.team_name AS home_team_name,
+            m.away_team_id, t_away.team_name AS away_team_name,
+            CASE
+                WHEN t_home.team_name ILIKE '%%' || %s || '%%' THEN 1
+                ELSE 0
+            END AS home
+    FROM matches m
+    JOIN teams t_home ON m.home_team_id = t_home.team_id
+    JOIN teams t_away ON m.away_team_id = t_away.team_id
+    WHERE t_home.team_name ILIKE '%%' || %s || '%%' OR t_away.team_name ILIKE '%%' || %s || '%%'
+""")
+
+# Everyone who can appear in a match, with their team's name; the ball isn't a player
+MATCH_ROSTER = PreparedQuery("speedboat_match_roster", """
+    SELECT p.player_id, p.player_name, p.jersey_number, p.team_id, t.team_name
+    FROM players p
+    JOIN teams t ON p.team_id = t.team_id
+    WHERE p.team_id IN (%s, %s) AND LOWER(p.player_name) != 'ball'
+    ORDER BY p.team_id, p.jersey_number
+""")
+
+TEAM_PLAYERS = PreparedQuery("speedboat_team_players", """
+    SELECT p.player_id FROM players p
+    WHERE p.team_id = %s AND p.player_name != 'ball'
+""")
+
+MATCH_TEAMS = PreparedQuery("speedboat_match_teams", """
+    SELECT m.home_team_id, m.away_team_id
+    FROM matches m
+    WHERE m.match_id = %s
+""")
+
+# One match's SPADL actions in match order, for transitions.detect_transitions
+SPADL_ACTIONS = PreparedQuery("speedboat_spadl_actions", """
+    SELECT a.*
+    FROM spadl_actions a
+    WHERE a.game_id = %s
+    ORDER BY a.period_id, a.seconds, a.id
+""")
+
+# The SQL version of transitions.detect_transitions, for one gaining team; kept for
+# the benchmarks and to cross-check the detector, the app no longer runs it
+TRANSITIONS = PreparedQuery("speedboat_transitions", """
+    WITH action_changes AS (
+        SELECT
+            a.*,
+            LAG(a.team_id) OVER (ORDER BY a.period_id, a.seconds, a.id) AS prev_team_id,
+            LEAD(a.team_id) OVER (ORDER BY a.period_id, a.seconds, a.id) AS next_team_id
+        FROM
+            spadl_actions a
+        WHERE
+            a.game_id = %s
+    ),
+    possession_markers AS (
+        SELECT
+            *,
+            CASE WHEN prev_team_id IS NULL OR team_id != prev_team_id THEN 1 ELSE 0 END AS is_new_possession
+        FROM
+            action_changes
+    ),
+    possession_sequences AS (
+        SELECT
+            *,
+            SUM(is_new_possession) OVER (ORDER BY period_id, seconds, id) AS possession_group
+        FROM
+            possession_markers
+    ),
+    possession_stats AS (
+        SELECT
+            possession_group,
+            team_id,
+            COUNT(*) AS action_count,
+            MAX(id) AS last_action_id,
+            MIN(id) AS first_action_id
+        FROM
+            possession_sequences
+        GROUP BY
+            possession_group, team_id
+    )
+    SELECT
+        a.id AS action_id,
+        a.game_id,
+        a.period_id,
+        a.seconds AS time_seconds,
+        a.team_id AS team_losing_possession,
+        a.next_team_id AS team_gaining_possession,
+        a.action_type AS type_name,
+        a.result AS result_name,
+        ps.action_count AS consecutive_team_actions,
+        a.start_x,
+        a.start_y,
+        a.end_x,
+        a.end_y,
+        a.id AS original_event_id,
+        start_a.period_id AS start_period_id,
+        start_a.seconds AS start_seconds
+    FROM
+        possession_sequences a
+    JOIN
+        possession_stats ps ON a.possession_group = ps.possession_group
+        AND a.team_id = ps.team_id
+        AND a.id = ps.last_action_id
+    JOIN
+        spadl_actions start_a ON start_a.id = ps.first_action_id
+    WHERE
+        ps.action_count >= 3
+        AND a.team_id != a.next_team_id
+        AND a.next_team_id IS NOT NULL
+        AND a.start_x < 50
+        AND a.end_x > 50
+        AND a.next_team_id = %s
+    ORDER BY
+        a.period_id,
+        a.seconds,
+        a.id
+""")
+
+CLIP_TRACKING = PreparedQuery("speedboat_clip_tracking", """
+    SELECT pt.*, p.team_id
+    FROM player_tracking pt
+    LEFT JOIN players p ON pt.player_id = p.player_id
+    WHERE pt.timestamp >= %s AND pt.timestamp < %s
+        AND pt.game_id = %s
+    ORDER BY pt.timestamp, pt.frame_id ASC
+""")
+
+CLIP_TRACKING_PERIOD = PreparedQuery("speedboat_clip_tracking_period", """
+    SELECT pt.*, p.team_id
+    FROM player_tracking pt
+    LEFT JOIN players p ON pt.player_id = p.player_id
+    WHERE pt.timestamp >= %s AND pt.timestamp < %s
+        AND pt.game_id = %s AND pt.period_id = %s
+    ORDER BY pt.timestamp, pt.frame_id ASC
+""")
@@ -0,0 +1,258 @@
+"""
+Versioned schema migrations for the match database.
+
+Every migration has a version number and is applied at most once; applied
+versions are recorded in the ``schema_migrations`` table. Run from the
+``operation speedboat`` folder:
+
+    python Python/schema.py --status
+    python Python/schema.py                  # apply every pending migration
+    python Python/schema.py --partition      # also list-partition player_tracking by game
+    python Python/schema.py --target 1       # migrate up or down to version 1
+"""
+import argparse
+import re
+import sys
+
+import psycopg2
+from psycopg2 import sql
+
+try:
+    from Python.db_pool import connection_settings
+except ImportError:
+    # Run as a script, or imported from inside the Python folder as the notebooks do
+    from db_pool import connection_settings
+
+
+class Migration:
+    """
+    One schema change with a way back.
+
+    ``up`` and ``down`` are lists of SQL statements, or callables taking a
+    cursor for changes that depend on the data (e.g. one partition per game).
+    Optional migrations are only applied when asked for explicitly.
+    """
+    def __init__(self, version, name, up, down, optional=False):
+        self.version = version
+        self.name = name
+        self.up = up
+        self.down = down
+        self.optional = optional
+
+    def run(self, cursor, steps):
+        for step in steps:
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+
+
+def _partition_name(game_id):
+    # A readable, valid table name per game; the id itself is only ever bound as a literal
+    return "player_tracking_" + re.sub(r"[^a-z0-9_]", "_", str(game_id).lower())
+
+
+def _hand_over_sequences(cursor, old_table, new_table):
+    # serial columns' sequences belong to the old table and would be dropped with it
+    cursor.execute("""
+        SELECT a.attname, pg_get_serial_sequence(%s, a.attname)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+    """, (old_table, old_table))
+    for column, sequence in cursor.fetchall():
+        if sequence is not None:
+            cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(
+                sql.SQL(sequence), sql.Identifier(new_table), sql.Identifier(column)))
+
+
+def _partition_player_tracking(cursor):
+    """Swap player_tracking for a copy LIST-partitioned by game_id, one partition per game."""
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'player_tracking' AND n.nspname = current_schema()
+    """)
+    if cursor.fetchone()[0] == 'p':
+        return  # already partitioned
+
+    # Same columns and defaults; the primary key must include the partition key
+    cursor.execute("CREATE TABLE player_tracking_partitioned (LIKE player_tracking INCLUDING DEFAULTS) PARTITION BY LIST (game_id)")
+    cursor.execute("SELECT DISTINCT game_id FROM player_tracking WHERE game_id IS NOT NULL")
+    for (game_id,) in cursor.fetchall():
+        cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF player_tracking_partitioned FOR VALUES IN ({})").format(
+            sql.Identifier(_partition_name(game_id)), sql.Literal(game_id)))
+    # Matches loaded later land here until ensure_tracking_partition gives them their own
+    cursor.execute("CREATE TABLE player_tracking_default PARTITION OF player_tracking_partitioned DEFAULT")
+
+    cursor.execute("INSERT INTO player_tracking_partitioned SELECT * FROM player_tracking")
+    cursor.execute("ALTER TABLE player_tracking_partitioned ADD PRIMARY KEY (game_id, id)")
+    cursor.execute("ALTER TABLE player_tracking RENAME TO player_tracking_unpartitioned")
+    cursor.execute("ALTER TABLE player_tracking_partitioned RENAME TO player_tracking")
+    _hand_over_sequences(cursor, "player_tracking_unpartitioned", "player_tracking")
+    cursor.execute("DROP TABLE player_tracking_unpartitioned")
+    # Indexes made on the parent are created on every partition
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_tracking_game_period_frame ON player_tracking (game_id, period_id, frame_id)")
+    cursor.execute("ANALYZE player_tracking")
+
+
+def _unpartition_player_tracking(cursor):
+    cursor.execute("CREATE TABLE player_tracking_unpartitioned (LIKE player_tracking INCLUDING DEFAULTS)")
+    cursor.execute("INSERT INTO player_tracking_unpartitioned SELECT * FROM player_tracking")
+    _hand_over_sequences(cursor, "player_tracking", "player_tracking_unpartitioned")
+    cursor.execute("DROP TABLE player_tracking")
+    cursor.execute("ALTER TABLE player_tracking_unpartitioned RENAME TO player_tracking")
+    cursor.execute("ALTER TABLE player_tracking ADD PRIMARY KEY (id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_tracking_game_period_frame ON player_tracking (game_id, period_id, frame_id)")
+    cursor.execute("ANALYZE player_tracking")
+
+
+MIGRATIONS = [
+    # Every tracking fetch filters on game_id, clips also on period_id; frame_id keeps a match's rows in order
+    Migration(1, "player_tracking (game_id, period_id, frame_id) index",
+              up=["CREATE INDEX IF NOT EXISTS idx_player_tracking_game_period_frame ON player_tracking (game_id, period_id, frame_id)",
+                  "ANALYZE player_tracking"],
+              down=["DROP INDEX IF EXISTS idx_player_tracking_game_period_frame"]),
+    # fetch_match_events filters on match_id and orders by period_id, timestamp: served straight from the index
+    Migration(2, "matchevents (match_id, period_id, timestamp) index",
+              up=["CREATE INDEX IF NOT EXISTS idx_matchevents_match_period_timestamp ON matchevents (match_id, period_id, timestamp)",
+                  "ANALYZE matchevents"],
+              down=["DROP INDEX IF EXISTS idx_matchevents_match_period_timestamp"]),
+    # The transitions and important moments queries read one game's SPADL actions in this order
+    Migration(3, "spadl_actions (game_id, period_id, seconds) index",
+              up=["CREATE INDEX IF NOT EXISTS idx_spadl_actions_game_period_seconds ON spadl_actions (game_id, period_id, seconds)",
+                  "ANALYZE spadl_actions"],
+              down=["DROP INDEX IF EXISTS idx_spadl_actions_game_period_seconds"]),
+    Migration(4, "list-partition player_tracking by game_id",
+              up=[_partition_player_tracking],
+              down=[_unpartition_player_tracking],
+              optional=True),
+]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def applied_versions(conn):
+    """The set of migration versions applied to the database."""
+    with conn.cursor() as cursor:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    return versions
+
+
+def pending_migrations(conn, include_optional=False):
+    """Migrations not applied yet, in version order."""
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS
+            if m.version not in applied and (include_optional or not m.optional)]
+
+
+def migrate(conn, target=None, partition=False):
+    """
+    Bring the database schema up (or down) to a version.
+
+    Each migration runs in its own transaction together with its row in
+    ``schema_migrations``, so a failing migration leaves nothing half done.
+
+    Args:
+        conn (psycopg2.extensions.connection): The database connection object.
+        target (int, optional): Version to end at. Migrations above it are
+            rolled back, those up to it applied. Defaults to the latest.
+        partition (bool): Also apply the optional partitioning migration.
+
+    Returns:
+        list: (version, name, "up" | "down") of every migration that ran.
+    """
+    if target is None:
+        target = max(m.version for m in MIGRATIONS)
+    if target < 0:
+        raise ValueError(f"target must be a version number, got {target}.")
+
+    applied = applied_versions(conn)
+    ran = []
+
+    # Down first, newest first
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version, reverse=True):
+        if migration.version > target and migration.version in applied:
+            _run(conn, migration, "down")
+            ran.append((migration.version, migration.name, "down"))
+
+    for migration in MIGRATIONS:
+        if migration.version <= target and migration.version not in applied:
+            if migration.optional and not partition:
+                continue
+            _run(conn, migration, "up")
+            ran.append((migration.version, migration.name, "up"))
+    return ran
+
+
+def _run(conn, migration, direction):
+    print(f"Migrating {direction}: {migration.version} {migration.name}")
+    try:
+        with conn.cursor() as cursor:
+            migration.run(cursor, migration.up if direction == "up" else migration.down)
+            if direction == "up":
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                               (migration.version, migration.name))
+            else:
+                cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def ensure_tracking_partition(conn, game_id):
+    """
+    Give a match its own partition of a partitioned player_tracking table.
+
+    Rows of the match already in the default partition are moved over. Does
+    nothing when the table isn't partitioned or the partition exists.
+    """
+    name = _partition_name(game_id)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('player_tracking_default'), to_regclass(%s)", (name,))
+        default, existing = cursor.fetchone()
+        if default is None or existing is not None:
+            return
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE player_tracking INCLUDING DEFAULTS)").format(sql.Identifier(name)))
+        cursor.execute(sql.SQL("WITH moved AS (DELETE FROM player_tracking_default WHERE game_id = %s RETURNING *) "
+                               "INSERT INTO {} SELECT * FROM moved").format(sql.Identifier(name)), (game_id,))
+        cursor.execute(sql.SQL("ALTER TABLE player_tracking ATTACH PARTITION {} FOR VALUES IN ({})").format(
+            sql.Identifier(name), sql.Literal(game_id)))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="connection string; defaults to the PG_* settings in .env")
+    parser.add_argument("--target", type=int, help="version to migrate to (default: latest)")
+    parser.add_argument("--partition", action="store_true", help="also partition player_tracking by game")
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**connection_settings())
+    try:
+        if args.status:
+            applied = applied_versions(conn)
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in applied else ("optional" if migration.optional else "pending")
+                print(f"{migration.version:>3}  {state:<8}  {migration.name}")
+            return
+        ran = migrate(conn, args.target, args.partition)
+        print(f"{len(ran)} migration(s) ran" if ran else "Schema is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
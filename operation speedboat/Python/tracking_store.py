@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Python.match_cache import source_dir
+except ImportError:
+    # Imported from inside the Python folder, as the notebooks do
+    from match_cache import source_dir
+
+
+STORE_VERSION = 2
+
+HEADER_FILE = "header.json"
+FRAMES_FILE = "frames.npy"
+POSITIONS_FILE = "positions.f32"
+
+
+def _timestamps_to_seconds(timestamps):
+    """Tracking timestamps as float seconds, whether they arrive as text, timedelta or numbers."""
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return timestamps.to_numpy(dtype=np.float64)
+    return pd.to_timedelta(timestamps).dt.total_seconds().to_numpy(dtype=np.float64)
+
+
+def build_tracking_store(tracking_df, path):
+    """
+    Write tracking data as a memory-mappable store.
+
+    The store is a folder with a fixed-stride float32 position tensor of shape
+    (n_frames, n_objects, 2) in ``positions.f32``, the frame_ids, timestamps
+    and period_ids (-1 when the data has none) in ``frames.npy``, and a small ``header.json`` with the shape and the
+    player_id, team_id, player_name and jersey_number of every object column.
+    Objects missing from a frame are stored as NaN.
+
+    Args:
+        tracking_df (pd.DataFrame): Output of ``fetch_tracking_data``.
+        path (str): Folder to write the store to; replaced if it exists.
+
+    Returns:
+        TrackingStore: The newly written store, opened.
+    """
+    # One row per frame, one column per object, filled in a single scatter
+    frame_ids, frame_rows = np.unique(tracking_df['frame_id'].to_numpy(), return_inverse=True)
+    object_cols, player_ids = pd.factorize(tracking_df['player_id'], sort=True)
+
+    seconds = np.full(len(frame_ids), np.nan)
+    seconds[frame_rows] = _timestamps_to_seconds(tracking_df['timestamp'])
+    periods = np.full(len(frame_ids), -1, dtype=np.int16)
+    if 'period_id' in tracking_df.columns:
+        periods[frame_rows] = tracking_df['period_id'].fillna(-1).to_numpy(dtype=np.int16)
+
+    # Per-object attributes, taken from each object's first row
+    _, first_pos = np.unique(object_cols, return_index=True)
+    objects = tracking_df.iloc[first_pos]
+
+    def attribute(column, cast):
+        if column not in objects.columns:
+            return [None] * len(objects)
+        return [None if pd.isna(value) else cast(value) for value in objects[column]]
+
+    header = {
+        "version": STORE_VERSION,
+        "n_frames": int(len(frame_ids)),
+        "n_objects": int(len(player_ids)),
+        "player_ids": [str(p) for p in player_ids],
+        "team_ids": attribute('team_id', str),
+        "player_names": attribute('player_name', str),
+        "jersey_numbers": attribute('jersey_number', int),
+    }
+
+    # Build in a scratch folder next to the target and swap it in at the end
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        positions = np.memmap(os.path.join(tmp_path, POSITIONS_FILE), dtype=np.float32, mode='w+',
+                              shape=(len(frame_ids), len(player_ids), 2))
+        positions[:] = np.nan
+        positions[frame_rows, object_cols] = tracking_df[['x', 'y']].to_numpy(dtype=np.float32)
+        positions.flush()
+        del positions
+
+        frames = np.empty(len(frame_ids), dtype=[('frame_id', np.int64), ('timestamp', np.float64),
+                                                 ('period_id', np.int16)])
+        frames['frame_id'] = frame_ids
+        frames['timestamp'] = seconds
+        frames['period_id'] = periods
+        np.save(os.path.join(tmp_path, FRAMES_FILE), frames)
+
+        with open(os.path.join(tmp_path, HEADER_FILE), 'w') as f:
+            json.dump(header, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return TrackingStore(path)
+
+
+def open_tracking_store(game_id, conn=None):
+    """
+    Open the tracking store for a match, building it from
+    ``fetch_tracking_data`` on first use.
+
+    Stores live under ``<match cache dir>/<source>/tracking_store/v<version>/<game_id>``,
+    next to the cached queries of the same database (see ``match_cache.source_dir``).
+    A database that can't be named gets a throwaway store in a temporary folder.
+
+    Args:
+        game_id (str): The ID of the game.
+        conn (psycopg2.extensions.connection, optional): The database connection
+            object; a connection is borrowed from the shared pool if omitted.
+
+    Returns:
+        TrackingStore: The opened store.
+    """
+    folder = source_dir(conn)
+    if folder is None:
+        folder = tempfile.mkdtemp(prefix="speedboat_store_")
+    path = os.path.join(folder, "tracking_store", f"v{STORE_VERSION}", str(game_id))
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+        return TrackingStore(path)
+
+    # Imported here because helperfunctions itself builds on the cache modules
+    try:
+        from Python.helperfunctions import fetch_tracking_data
+    except ImportError:
+        from helperfunctions import fetch_tracking_data
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return build_tracking_store(fetch_tracking_data(game_id, conn), path)
+
+
+class TrackingStore:
+    """
+    Zero-copy, random access to one match's tracking data.
+
+    Positions are an ``np.memmap``: reading a frame or a time window touches
+    only those bytes on disk, so a whole match never has to sit in RAM.
+    Frames are in frame_id order, and timestamps are match-clock seconds that
+    increase with it, which the time lookups rely on.
+    """
+    def __init__(self, path):
+        """
+        Open a store written by ``build_tracking_store``.
+
+        Args:
+            path (str): The store folder.
+        """
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            self.header = json.load(f)
+        if self.header["version"] != STORE_VERSION:
+            raise ValueError(f"Tracking store {path} has version {self.header['version']}, expected {STORE_VERSION}.")
+
+        frames = np.load(os.path.join(path, FRAMES_FILE))
+        self.frame_ids = frames['frame_id']
+        self.timestamps = frames['timestamp']
+        self.period_ids = frames['period_id']
+        self.player_ids = np.array(self.header["player_ids"], dtype=object)
+        self.team_ids = np.array(self.header["team_ids"], dtype=object)
+        self.player_names = np.array(self.header["player_names"], dtype=object)
+        self.jersey_numbers = np.array(self.header["jersey_numbers"], dtype=object)
+
+        shape = (self.header["n_frames"], self.header["n_objects"], 2)
+        if shape[0] * shape[1] == 0:
+            self.positions = np.empty(shape, dtype=np.float32)
+        else:
+            self.positions = np.memmap(os.path.join(path, POSITIONS_FILE), dtype=np.float32, mode='r', shape=shape)
+
+    def __len__(self):
+        return len(self.frame_ids)
+
+    def frame(self, i):
+        """(n_objects, 2) positions of frame number ``i``, as a view into the file."""
+        return self.positions[i]
+
+    def frame_at(self, seconds):
+        """Index of the last frame at or before ``seconds`` (clamped to the match)."""
+        i = np.searchsorted(self.timestamps, seconds, side='right') - 1
+        return int(np.clip(i, 0, len(self) - 1))
+
+    def window(self, start_seconds, end_seconds):
+        """
+        Positions for every frame with ``start_seconds <= timestamp < end_seconds``.
+
+        Returns:
+            tuple: (timestamps, positions) views of shape (n,) and (n, n_objects, 2).
+        """
+        start = np.searchsorted(self.timestamps, start_seconds, side='left')
+        stop = np.searchsorted(self.timestamps, end_seconds, side='left')
+        return self.timestamps[start:stop], self.positions[start:stop]
+
+    def frame_as_dataframe(self, i):
+        """
+        Frame ``i`` in the row layout of ``fetch_tracking_data``, for the chart code.
+
+        Objects that aren't on the pitch in that frame are left out.
+        """
+        positions = self.positions[i]
+        present = ~np.isnan(positions[:, 0])
+        return pd.DataFrame({
+            'frame_id': self.frame_ids[i],
+            'timestamp': self.timestamps[i],
+            'period_id': self.period_ids[i],
+            'player_id': self.player_ids[present],
+            'x': positions[present, 0],
+            'y': positions[present, 1],
+            'jersey_number': self.jersey_numbers[present],
+            'player_name': self.player_names[present],
+            'team_id': self.team_ids[present],
+        })
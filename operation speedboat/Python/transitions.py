@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+
+# A possession has to last this many actions before losing it counts as a transition
+MIN_SEQUENCE_ACTIONS = 3
+# opta x of the halfway line; the losing team's last action crosses it going forward
+MIDFIELD_X = 50
+
+TRANSITION_COLUMNS = [
+    'action_id', 'game_id', 'period_id', 'time_seconds', 'clock',
+    'team_losing_possession', 'team_gaining_possession', 'type_name', 'result_name',
+    'consecutive_team_actions', 'start_period_id', 'start_seconds', 'sequence_seconds',
+    'start_x', 'start_y', 'end_x', 'end_y', 'sequence_start_x', 'sequence_start_y', 'original_event_id',
+]
+
+
+def clock_strings(seconds):
+    """helperfunctions.seconds_to_hms for a whole column at once."""
+    total = np.nan_to_num(np.asarray(seconds, dtype=float)).astype(np.int64)
+    return [f"{h:02}:{m:02}:{s:02}" for h, m, s in zip(total // 3600, total % 3600 // 60, total % 60)]
+
+
+def detect_transitions(actions, min_actions=MIN_SEQUENCE_ACTIONS, midfield=MIDFIELD_X):
+    """
+    Find the turnovers of a match for both teams in one vectorized pass over its SPADL actions.
+
+    Actions are ordered by (period_id, seconds, id) and split into possession
+    sequences wherever the acting team changes. A transition is the last action
+    of a sequence of at least ``min_actions`` actions that went from the team's
+    own half over the halfway line (start_x < midfield < end_x), after which the
+    other team has the ball. This is what the ``queries.TRANSITIONS`` SQL
+    finds for one team; here both teams come out of the same pass.
+
+    Args:
+        actions (pd.DataFrame): spadl_actions rows of one match (see ``fetch_spadl_actions``),
+            with at least id, game_id, period_id, seconds, team_id, start_x, start_y,
+            end_x, end_y, action_type and result.
+        min_actions (int): Shortest possession sequence that counts.
+        midfield (float): x coordinate of the halfway line.
+
+    Returns:
+        pd.DataFrame: One row per transition in match order, with the columns of
+            TRANSITION_COLUMNS: where and when the ball was lost (``time_seconds``,
+            ``clock``, start/end coordinates of the last action), who lost and
+            who won it, the length of the sequence in actions
+            (``consecutive_team_actions``) and seconds (``sequence_seconds``),
+            and where and when the sequence started.
+    """
+    if len(actions) == 0:
+        return pd.DataFrame(columns=TRANSITION_COLUMNS)
+
+    ordered = actions.sort_values(['period_id', 'seconds', 'id'], kind='stable').reset_index(drop=True)
+    teams = ordered['team_id'].to_numpy(dtype=object)
+    team_known = ordered['team_id'].notna().to_numpy()
+
+    # A new sequence starts at the first action and wherever the team changes;
+    # an action without a team continues the sequence it is in, as the SQL does
+    prev_team = np.empty_like(teams)
+    prev_team[0], prev_team[1:] = None, teams[:-1]
+    prev_known = np.concatenate([[False], team_known[:-1]])
+    new_sequence = ~prev_known | (team_known & (teams != prev_team))
+    sequence = np.cumsum(new_sequence)
+
+    next_team = np.empty_like(teams)
+    next_team[-1], next_team[:-1] = None, teams[1:]
+    next_known = np.concatenate([team_known[1:], [False]])
+
+    # Per (sequence, team): number of actions and the rows of its first and last action by id
+    ids = ordered['id'].to_numpy()
+    team_codes, _ = pd.factorize(ordered['team_id'])
+    groups = pd.DataFrame({'sequence': sequence, 'team': team_codes, 'id': ids})[team_known]
+    grouped = groups.groupby(['sequence', 'team'], sort=False)['id']
+    size = grouped.transform('size').to_numpy()
+    is_last = groups['id'].to_numpy() == grouped.transform('max').to_numpy()
+    first_id = grouped.transform('min').to_numpy()
+
+    rows = np.flatnonzero(team_known)
+    start_x = ordered['start_x'].to_numpy(dtype=float)[rows]
+    end_x = ordered['end_x'].to_numpy(dtype=float)[rows]
+    lost = (
+        is_last
+        & (size >= min_actions)
+        & next_known[rows]
+        & (teams[rows] != next_team[rows])
+        & (start_x < midfield)
+        & (end_x > midfield)
+    )
+    rows, size, first_id = rows[lost], size[lost], first_id[lost]
+
+    last = ordered.iloc[rows]
+    # The sequence's first action, looked up by id (ids are unique)
+    first = ordered.set_index('id').loc[first_id]
+
+    transitions = pd.DataFrame({
+        'action_id': last['id'].to_numpy(),
+        'game_id': last['game_id'].to_numpy(),
+        'period_id': last['period_id'].to_numpy(),
+        'time_seconds': last['seconds'].to_numpy(),
+        'clock': clock_strings(last['seconds']),
+        'team_losing_possession': last['team_id'].to_numpy(),
+        'team_gaining_possession': next_team[rows],
+        'type_name': last['action_type'].to_numpy(),
+        'result_name': last['result'].to_numpy(),
+        'consecutive_team_actions': size,
+        'start_period_id': first['period_id'].to_numpy(),
+        'start_seconds': first['seconds'].to_numpy(),
+        'sequence_seconds': last['seconds'].to_numpy(dtype=float) - first['seconds'].to_numpy(dtype=float),
+        'start_x': last['start_x'].to_numpy(),
+        'start_y': last['start_y'].to_numpy(),
+        'end_x': last['end_x'].to_numpy(),
+        'end_y': last['end_y'].to_numpy(),
+        'sequence_start_x': first['start_x'].to_numpy(),
+        'sequence_start_y': first['start_y'].to_numpy(),
+        'original_event_id': last['id'].to_numpy(),
+    })
+    return transitions
+
+
+def team_transitions(transitions, team_id):
+    """The transitions in which ``team_id`` won the ball."""
+    return transitions[transitions['team_gaining_possession'].astype(str) == str(team_id)].reset_index(drop=True)
@@ -0,0 +1,160 @@
+"""
+Compare ``pd.read_sql`` with the COPY-based ``read_sql_copy`` for a tracking query.
+
+With ``--dsn`` both paths run against a real PostgreSQL database: a stored
+match with ``--game-id``, or else a synthetic match of ``--minutes`` loaded
+into temporary tables that shadow the real ones for this connection only
+(nothing is written to the database). This is the number that matters.
+
+Without ``--dsn`` a fake cursor serves the synthetic match from memory. Its
+rows are prebuilt tuples, so psycopg2's per-row decoding, which is what COPY
+saves, isn't part of either timing; only the DataFrame construction is
+compared, and read_sql_copy is about as fast or slightly slower there. Use
+this mode to check both paths return the same frame, not for the speedup.
+
+Usage (from the ``operation speedboat`` folder):
+    python benchmarks/bench_copy_fetch.py --dsn postgresql://localhost/international_week --minutes 10
+    python benchmarks/bench_copy_fetch.py --dsn postgresql://localhost/international_week --game-id <id>
+    python benchmarks/bench_copy_fetch.py --minutes 10
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Python.bulk_fetch import read_sql_copy
+from synthetic import make_tracking
+
+TRACKING_QUERY = """
+SELECT pt.frame_id, pt.timestamp, pt.player_id, pt.x, pt.y, p.jersey_number, p.player_name, p.team_id
+FROM player_tracking pt
+JOIN players p ON pt.player_id = p.player_id
+JOIN teams t ON p.team_id = t.team_id
+WHERE pt.game_id = %s;
+"""
+
+# PostgreSQL type OIDs for the fake cursor's description
+OIDS = {'frame_id': 20, 'timestamp': 25, 'player_id': 25, 'x': 701, 'y': 701,
+        'jersey_number': 23, 'player_name': 25, 'team_id': 25}
+
+
+class FakeCursor:
+    """Just enough of a psycopg2 cursor for pd.read_sql and read_sql_copy."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.description = [(col, OIDS[col], None, None, None, None, None) for col in self.connection.columns]
+        # Only the LIMIT 0 probe wants no rows back
+        self.rows = [] if 'LIMIT 0' in query else self.connection.rows
+
+    def fetchall(self):
+        return self.rows
+
+    def mogrify(self, query, params):
+        return (query % tuple(f"'{p}'" for p in params)).encode()
+
+    def copy_expert(self, sql, file):
+        file.write(self.connection.csv)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, df):
+        # Rows and CSV are prepared up front so only the client-side parsing is timed
+        self.columns = list(df.columns)
+        self.rows = list(df.itertuples(index=False, name=None))
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, na_rep=r'\N')
+        self.csv = buffer.getvalue().encode()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def load_synthetic(conn, tracking):
+    """Serve the synthetic match from temporary tables on ``conn``, under the real tables' names."""
+    players = tracking.drop_duplicates('player_id')
+    with conn.cursor() as cursor:
+        # pg_temp comes first on the search path, so these shadow the real tables for this connection
+        cursor.execute("CREATE TEMP TABLE teams (team_id text)")
+        cursor.execute("CREATE TEMP TABLE players (player_id text, jersey_number integer, player_name text, team_id text)")
+        cursor.execute("CREATE TEMP TABLE player_tracking (game_id text, frame_id bigint, timestamp text, "
+                       "player_id text, x double precision, y double precision)")
+        for table, df in (("teams", players[['team_id']].drop_duplicates()),
+                          ("players", players[['player_id', 'jersey_number', 'player_name', 'team_id']]),
+                          ("player_tracking", tracking.assign(game_id='synthetic')[
+                              ['game_id', 'frame_id', 'timestamp', 'player_id', 'x', 'y']])):
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute("ANALYZE teams; ANALYZE players; ANALYZE player_tracking")
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    # Best of ``repeat`` runs, so one slow run (a cold cache, a GC pause) doesn't decide it
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="PostgreSQL connection string; omit to use the fake cursor")
+    parser.add_argument("--game-id", help="stored game to load when using --dsn; a synthetic one when omitted")
+    parser.add_argument("--minutes", type=float, default=10, help="synthetic match length")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path; the fastest counts")
+    args = parser.parse_args()
+
+    if not (args.dsn and args.game_id):
+        tracking = make_tracking(minutes=args.minutes)
+        tracking['jersey_number'] = 1
+        tracking['player_name'] = tracking['player_id']
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+        game_id = args.game_id
+        if game_id is None:
+            load_synthetic(conn, tracking)
+            game_id = 'synthetic'
+    else:
+        conn = FakeConnection(tracking[list(OIDS)])
+        game_id = 'synthetic'
+
+    with warnings.catch_warnings():
+        # pandas warns about plain DBAPI connections that aren't SQLAlchemy
+        warnings.simplefilter('ignore', UserWarning)
+        via_read_sql, read_sql_time = timed(pd.read_sql_query, TRACKING_QUERY, conn, params=(game_id,),
+                                            repeat=args.repeat)
+    via_copy, copy_time = timed(read_sql_copy, TRACKING_QUERY, conn, (game_id,), repeat=args.repeat)
+
+    pd.testing.assert_frame_equal(via_read_sql, via_copy, check_dtype=False)
+    print(f"{len(via_copy)} rows ({'database' if args.dsn else 'fake cursor, client-side parsing only'}), "
+          f"best of {args.repeat}")
+    print(f"  pd.read_sql  : {read_sql_time:7.3f} s")
+    print(f"  read_sql_copy: {copy_time:7.3f} s ({read_sql_time / copy_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
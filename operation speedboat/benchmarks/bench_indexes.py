@@ -0,0 +1,113 @@
+"""
+Time the app's hot queries before and after the schema migrations (Python/schema.py).
+
+Runs against a real database: every migration is rolled back for the
+"before" timings, applied for the "after" ones (plus partitioning with
+``--partition``), and the schema is left the way it was found. Each query is
+timed on the server (EXPLAIN ANALYZE execution time) and end to end
+(execute plus fetching every row), as the median of ``--repeat`` runs.
+
+Usage (from the ``operation speedboat`` folder):
+    python benchmarks/bench_indexes.py --dsn postgresql://localhost/international_week
+    python benchmarks/bench_indexes.py --dsn ... --game-id <id> --partition
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Python import queries
+from Python.schema import MIGRATIONS, applied_versions, migrate
+
+
+def hot_queries(conn, game_id):
+    """(label, query, params) of the queries the app runs per match."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT home_team_id FROM matches WHERE match_id = %s", (game_id,))
+        row = cursor.fetchone()
+    home_team_id = row[0] if row else None
+    return [
+        ("tracking (whole match)", queries.TRACKING, (game_id,)),
+        ("clip (10 s, period 1)", queries.CLIP_TRACKING_PERIOD, ("00:00:10", "00:00:20", game_id, 1)),
+        ("match events", queries.MATCH_EVENTS, (game_id,)),
+        ("transitions", queries.TRANSITIONS, (game_id, home_team_id)),
+    ]
+
+
+def time_query(conn, query, params, repeat):
+    server, wall = [], []
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query.sql, params)
+            server.append(cursor.fetchone()[0][0]["Execution Time"])
+
+            start = time.perf_counter()
+            cursor.execute(query.sql, params)
+            cursor.fetchall()
+            wall.append((time.perf_counter() - start) * 1e3)
+    conn.rollback()
+    return statistics.median(server), statistics.median(wall)
+
+
+def time_all(conn, game_id, repeat):
+    return {label: time_query(conn, query, params, repeat) for label, query, params in hot_queries(conn, game_id)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="connection string of a local database")
+    parser.add_argument("--game-id", help="match to query (default: the first one)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--partition", action="store_true", help="also time with player_tracking partitioned")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    game_id = args.game_id
+    if game_id is None:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT match_id FROM matches ORDER BY match_id LIMIT 1")
+            game_id = cursor.fetchone()[0]
+        conn.rollback()
+
+    original = applied_versions(conn)
+    try:
+        migrate(conn, target=0)
+        before = time_all(conn, game_id, args.repeat)
+
+        migrate(conn, target=max(m.version for m in MIGRATIONS if not m.optional))
+        after = time_all(conn, game_id, args.repeat)
+
+        partitioned = None
+        if args.partition:
+            migrate(conn, partition=True)
+            partitioned = time_all(conn, game_id, args.repeat)
+    finally:
+        # Back to the versions the database had
+        migrate(conn, target=0)
+        if original:
+            migrate(conn, target=max(original), partition=any(m.optional and m.version in original for m in MIGRATIONS))
+        conn.close()
+
+    print(f"\nmatch {game_id}, median of {args.repeat} runs, ms (server execution / end to end)")
+    header = f"{'query':<24}{'before':>18}{'indexed':>18}"
+    if partitioned:
+        header += f"{'partitioned':>18}"
+    print(header)
+    for label, (server_before, wall_before) in before.items():
+        line = f"{label:<24}{server_before:>8.2f} /{wall_before:>8.2f}"
+        server_after, wall_after = after[label]
+        line += f"{server_after:>9.2f} /{wall_after:>8.2f}"
+        if partitioned:
+            server_part, wall_part = partitioned[label]
+            line += f"{server_part:>9.2f} /{wall_part:>8.2f}"
+        line += f"   x{server_before / max(server_after, 1e-6):.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
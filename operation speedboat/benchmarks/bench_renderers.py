@@ -0,0 +1,51 @@
+"""
+Compare rendering speed of the SoccerAnimation renderers.
+
+'savefig' is matplotlib's FuncAnimation + ffmpeg writer, which redraws the whole
+figure for every frame; 'blit-pipe' blits onto a cached pitch and pipes raw
+frames into ffmpeg.
+
+Usage (from the ``operation speedboat`` folder, with ffmpeg on the PATH):
+    python benchmarks/bench_renderers.py --seconds 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Python.VisualisationTools import FrameIndex
+from Python.VisualisationTools.rendering import RENDERERS
+from synthetic import make_tracking
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20, help="length of the synthetic clip")
+    parser.add_argument("--fps", type=int, default=25)
+    args = parser.parse_args()
+
+    tracking = make_tracking(minutes=args.seconds / 60, fps=args.fps)
+    frames = FrameIndex.from_dataframes(
+        tracking[tracking['player_id'] == 'ball'],
+        tracking[tracking['team_id'] == 'home'],
+        tracking[tracking['team_id'] == 'away'],
+    )
+    print(f"clip: {len(frames)} frames")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, render in RENDERERS.items():
+            output_file = os.path.join(tmp_dir, f"{name}.mp4")
+            start = time.perf_counter()
+            render(frames, output_file, args.fps, "Renderer benchmark")
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<10}: {elapsed:7.2f} s, {len(frames) / elapsed:6.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
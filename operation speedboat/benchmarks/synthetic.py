@@ -0,0 +1,47 @@
+"""Synthetic tracking data shared by the benchmark scripts."""
+import numpy as np
+import pandas as pd
+
+
+def make_tracking(minutes=90, players_per_team=11, fps=25, seed=0):
+    """
+    Build a tracking DataFrame shaped like ``fetch_tracking_data`` output.
+
+    Every player and the ball follow a smooth random walk on the 105x68 pitch,
+    sampled at ``fps`` frames per second for ``minutes`` of play.
+
+    Args:
+        minutes (float): Length of the synthetic match.
+        players_per_team (int): Number of players per team.
+        fps (int): Tracking frequency in Hz.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        pd.DataFrame: Rows ordered by frame_id, then player.
+    """
+    rng = np.random.default_rng(seed)
+    n_frames = int(minutes * 60 * fps)
+    player_ids = ["ball"] + [f"home_{i}" for i in range(players_per_team)] + [f"away_{i}" for i in range(players_per_team)]
+    team_ids = ["ball"] + ["home"] * players_per_team + ["away"] * players_per_team
+    n_objects = len(player_ids)
+
+    steps = rng.normal(0, 0.15, size=(n_frames, n_objects, 2))
+    steps[:, 0] *= 4  # the ball moves faster than the players
+    start = rng.uniform([0, 0], [105, 68], size=(n_objects, 2))
+    positions = start + np.cumsum(steps, axis=0)
+    positions[..., 0] = np.abs((positions[..., 0] + 105) % 210 - 105)
+    positions[..., 1] = np.abs((positions[..., 1] + 68) % 136 - 68)
+
+    frame_ids = np.arange(n_frames)
+    seconds = frame_ids / fps
+    timestamps = pd.to_timedelta(seconds, unit="s").astype(str).str.replace("0 days ", "", regex=False)
+
+    return pd.DataFrame({
+        "frame_id": np.repeat(frame_ids, n_objects),
+        "timestamp": np.repeat(np.asarray(timestamps), n_objects),
+        "period_id": np.where(np.repeat(seconds, n_objects) < minutes * 30, 1, 2),
+        "player_id": np.tile(player_ids, n_frames),
+        "team_id": np.tile(team_ids, n_frames),
+        "x": positions[..., 0].ravel(),
+        "y": positions[..., 1].ravel(),
+    })
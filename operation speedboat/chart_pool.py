@@ -0,0 +1,141 @@
+import numpy as np
+import pygame
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+def figure_to_surface(canvas):
+    """
+    Draw an Agg canvas and wrap its pixels in a pygame surface without copying.
+
+    The surface shares memory with the canvas' RGBA buffer (pygame keeps the
+    buffer alive), so redrawing the same figure at the same size updates the
+    surface in place. Take ``.copy()`` of it to keep a snapshot.
+    """
+    canvas.draw()
+    return pygame.image.frombuffer(canvas.buffer_rgba(), canvas.get_width_height(physical=True), 'RGBA')
+
+
+class PooledChart:
+    """
+    A figure that is built once and redrawn with new data.
+
+    Subclasses create their artists once in ``__init__`` and change only artist
+    data in ``update``; ``render`` redraws the figure into the same buffer the
+    returned surface is wrapped around.
+    """
+    def __init__(self, figsize):
+        self.fig = Figure(figsize=figsize, facecolor='none')
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.surface = None
+        self._buffer_owner = None
+
+    def render(self):
+        """Redraw and return the chart's surface (the same object as long as the size stays)."""
+        self.canvas.draw()
+        renderer = self.canvas.get_renderer()
+        if self.surface is None or renderer is not self._buffer_owner:
+            # First draw, or Agg had to allocate a new buffer
+            self.surface = pygame.image.frombuffer(self.canvas.buffer_rgba(), self.canvas.get_width_height(physical=True), 'RGBA')
+            self._buffer_owner = renderer
+        return self.surface
+
+
+class SpiderChart(PooledChart):
+    """Radar chart with one filled polygon per team, as SpiderChart_1T and SpiderChart_2T draw it."""
+    def __init__(self, labels, value_range, colors, text_color):
+        super().__init__(figsize=(6, 6))
+        ax = self.fig.add_subplot(polar=True)
+        ax.set_facecolor('none')
+        self.ax = ax
+
+        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False)
+        self.angles = np.append(angles, angles[:1])
+
+        # One outline and one fill per team, moved by update()
+        zeros = np.zeros_like(self.angles)
+        self.lines = []
+        self.fills = []
+        for color in colors:
+            line, = ax.plot(self.angles, zeros, color=color, linewidth=2, label=' ')
+            fill, = ax.fill(self.angles, zeros, color=color, alpha=0.25)
+            self.lines.append(line)
+            self.fills.append(fill)
+
+        ax.set_thetagrids(np.degrees(angles), labels)
+        ax.set_ylim(value_range[0], value_range[1])
+        ax.tick_params(labelcolor=text_color)
+
+        ax.grid(color=text_color, linestyle='--', linewidth=0.5, alpha=0.7)
+        for spine in ax.spines.values():
+            spine.set_color(text_color)
+
+        self.title = ax.set_title('', y=1.08, color=text_color)
+        self.legend = ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), frameon=False)
+        for text in self.legend.get_texts():
+            text.set_color(text_color)
+
+    def update(self, title, team_names, team_values):
+        """Set the title and, per team, its legend name and values (one per label)."""
+        self.title.set_text(title)
+        for line, fill, values in zip(self.lines, self.fills, team_values):
+            closed = np.append(values, values[:1])
+            line.set_ydata(closed)
+            fill.set_xy(np.column_stack([self.angles, closed]))
+        for line, text, name in zip(self.lines, self.legend.get_texts(), team_names):
+            line.set_label(name)
+            text.set_text(name)
+        return self
+
+
+class TransitionsChart(PooledChart):
+    """Attack transitions per period for two teams, as plot_team_transitions draws it."""
+    def __init__(self, categories=("Period 1", "Period 2")):
+        super().__init__(figsize=(6.4, 4.8))
+        ax = self.fig.add_subplot()
+        ax.set_facecolor('none')
+        self.ax = ax
+
+        # Bar positions
+        x = np.arange(len(categories))
+        width = 0.4  # Width of the bars
+        zeros = np.zeros(len(categories))
+        self.bars1 = ax.bar(x - width/2, zeros, width, label=' ', color="#8974FB")
+        self.bars2 = ax.bar(x + width/2, zeros, width, label=' ', color="#FB7489")
+
+        # Labels and title
+        ax.set_xticks(x)
+        ax.set_xticklabels(categories)
+        ax.set_ylabel("No. Attack transitions / period")
+        self.legend = ax.legend()
+
+    def update(self, team_names, values1, values2):
+        """Set both teams' names and their bar heights."""
+        for bars, values in ((self.bars1, values1), (self.bars2, values2)):
+            for rect, value in zip(bars, values):
+                rect.set_height(value)
+        for text, name in zip(self.legend.get_texts(), team_names):
+            text.set_text(name)
+
+        # Same y range autoscaling would give a fresh figure
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return self
+
+
+class FigurePool:
+    """Keeps one live chart per chart type and configuration, created on first use."""
+    def __init__(self):
+        self._charts = {}
+
+    def get(self, key, factory):
+        if key not in self._charts:
+            self._charts[key] = factory()
+        return self._charts[key]
+
+    def clear(self):
+        self._charts.clear()
+
+
+# Shared by the chart functions in graphs.py
+figure_pool = FigurePool()
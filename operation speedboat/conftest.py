@@ -0,0 +1 @@
+# Lets the tests import the app's modules as Python.<module>, as main.py does
@@ -1,18 +1,29 @@
 import math
-import pandas as pd
+import os
+import numpy as np
 from Python.VisualisationTools import soccer_animation
 import pygame
 
-from Python.helperfunctions import calculate_ball_possession, fetch_match_events, fetch_tracking_data, fetch_player_teams, visualise_important_moments, fetch_transitions
-
-from graphs import SpiderChart_1T, SpiderChart_2T, pitch_graph, voronoi_graph, plot_team_transitions
+from Python.helperfunctions import calculate_ball_possession, fetch_match_events, fetch_spadl_actions, visualise_important_moments, seconds_to_hms
+from Python.moments import match_counter_attacks
+from Python import queries
+from Python.match_context import MatchContext
+from Python.tracking_store import open_tracking_store
+from Python.match_stats import get_match_statistics
+from Python.prefetch import MatchPrefetcher
+from Python.playback import PlaybackClock
+from Python.pitch_control import team_rows, voronoi_control
+
+from graphs import SpiderChart_1T, SpiderChart_2T, voronoi_graph, plot_team_transitions
 from interpolateCustom import add_frames
+from pitch_renderer import PitchRenderer
 
 class PygameWindow:
-    def __init__(self, connect, title="speedboat", fullscreen=True):
+    def __init__(self, connect=None, title="speedboat", fullscreen=True):
         self.time = 20
         pygame.init()
         self.title = title
+        # None: every query borrows a connection from the shared pool (see db_pool)
         self.connection = connect
         
         info = pygame.display.Info()
@@ -30,11 +41,22 @@ class PygameWindow:
         # State variables for view and pagination
         self.view = "main"  # "main", "graph", or "match"
         self.selected_match = None  
-        self.cached_data = {}
+        self.graph_surfaces = {}
+        # Match data is loaded on background threads so the main loop never waits on the database.
+        # With pooled connections every worker gets its own, so two matches can load at once
+        self.prefetcher = MatchPrefetcher(self.load_match_data, workers=1 if connect is not None else 2)
         self.current_page = 0
         self.items_per_page = 6
         
-        self.frame = 0
+        # Playback clock of the match being shown, created once its tracking data is loaded
+        self.playback = None
+        self.pitch_renderer = None
+        # Space control overlay in the match view, toggled with V
+        self.show_control = False
+        # Database queries the last rendered frame ran (should stay 0); with
+        # SPEEDBOAT_DEBUG set, run warns about every frame that ran any
+        self.frame_queries = 0
+        self.debug_queries = bool(os.getenv("SPEEDBOAT_DEBUG"))
         
         # Load and scale the background ball image to cover the entire screen
         try:
@@ -95,110 +117,12 @@ class PygameWindow:
         self.draw_text(self.width // 2, self.height // 9 + 50, f"Home Team: {home_team}", font_size=28, bold=True, color=(77, 169, 77))
         self.draw_text(self.width // 2, self.height // 9 + 100, f"Away Team: {away_team}", font_size=28, bold=True, color=(169, 77, 77))
 
-        events_df = self.fetch_data_once(match_id).get('match_events')
-        
-        #print(events_df)
-
-        # Define eventtype_ids based on provided mappings
-        pass_eventtype_id = "e319ac55-ffaf-4e6d-87f7-7601d91bcd33"
-        goodskill_eventtype_id = "92c60f97-4073-4955-ba08-ec20d7a3cf98"
-
-        # Filter pass events
-        pass_events = events_df[events_df['eventtype_id'] == pass_eventtype_id]
-
-        # Filter good skill events
-        goodskill_events = events_df[events_df['eventtype_id'] == goodskill_eventtype_id]
-
-        # Count good skill events for each team
-        home_team_goodskill = goodskill_events[goodskill_events['team_id'] == home_team_id].shape[0]
-        away_team_goodskill = goodskill_events[goodskill_events['team_id'] == away_team_id].shape[0]
-
-        total_goodskill = home_team_goodskill + away_team_goodskill
-        if total_goodskill == 0:
-            total_goodskill = 1
-
-        # Initialize counters for pass statistics
-        home_short_passes = 0
-        home_medium_passes = 0
-        home_long_passes = 0
-        home_successful_passes = 0
-
-        away_short_passes = 0
-        away_medium_passes = 0
-        away_long_passes = 0
-        away_successful_passes = 0
-
-        # Process each pass event
-        for index, row in pass_events.iterrows():
-            # Calculate Euclidean distance
-            start_x = row['x']
-            start_y = row['y']
-            end_x = row['end_coordinates_x']
-            end_y = row['end_coordinates_y']
-            distance = ((end_x - start_x) ** 2 + (end_y - start_y) ** 2) ** 0.5
-
-            # Categorize pass based on distance
-            if distance < 10:
-                category = 'short'
-            elif distance < 40:
-                category = 'medium'
-            else:
-                category = 'long'
-
-            # Check if pass was successful
-            is_successful = row['success']
-
-            # Update counters based on team
-            team_id = row['team_id']
-            if team_id == home_team_id:
-                if category == 'short':
-                    home_short_passes += 1
-                elif category == 'medium':
-                    home_medium_passes += 1
-                elif category == 'long':
-                    home_long_passes += 1
-                if is_successful:
-                    home_successful_passes += 1
-            elif team_id == away_team_id:
-                if category == 'short':
-                    away_short_passes += 1
-                elif category == 'medium':
-                    away_medium_passes += 1
-                elif category == 'long':
-                    away_long_passes += 1
-                if is_successful:
-                    away_successful_passes += 1
-
-        # Results are now stored in the required variables:
-        # home_team_short_passes, home_team_medium_passes, home_team_long_passes,
-        # home_team_successful_passes, home_team_goodskill
-        # away_team_short_passes, away_team_medium_passes, away_team_long_passes,
-        # away_team_successful_passes, away_team_goodskill
-        home_team_total_passes = home_short_passes + home_medium_passes + home_long_passes
-        away_team_total_passes = away_short_passes + away_medium_passes + away_long_passes
-
-        if home_team_total_passes == 0:
-            home_team_total_passes = 1
-
-        if away_team_total_passes == 0:
-            away_team_total_passes = 1
-
-        labels = ["Short Passes %", "Medium Passes %", "Long Passes %", "Pass success rate %", "Initiative and controll"]
-        t1Values = [home_short_passes / home_team_total_passes * 100, home_medium_passes / home_team_total_passes * 100, home_long_passes / home_team_total_passes * 100, home_successful_passes / home_team_total_passes * 100, home_team_goodskill / total_goodskill * 100]
-        t2Values = [away_short_passes / away_team_total_passes * 100, away_medium_passes / away_team_total_passes * 100, away_long_passes / away_team_total_passes * 100, away_successful_passes / away_team_total_passes * 100, away_team_goodskill / total_goodskill * 100]
-
-        image1 = SpiderChart_2T("Passes comparison", [home_team, away_team], labels, t1Values, t2Values, [0, 100])
-        
-        #image2 = SpiderChart_1T("Passes", home_team, labels, t1Values, [0, 100], "#4CEF4C")
-        image2 = plot_team_transitions(fetch_transitions(match_id, home_team_id, self.connection), fetch_transitions(match_id, away_team_id, self.connection), home_team, away_team)
+        data = self.fetch_data_once(match_id, home_team_id, away_team_id)
+        if data is None:
+            self.draw_loading(match_id, home_team_id, away_team_id, events)
+            return
 
-        # Define maximum dimensions for each graph (e.g. half the screen width minus a margin, and half the screen height)
-        max_width = (self.width // 2 - 150) * 2
-        max_height = (self.height // 2 - 150) * 2
-
-        # Scale images if they exceed these dimensions
-        image1 = self.scale_image_to_fit(image1, max_width, max_height)
-        image2 = self.scale_image_to_fit(image2, max_width, max_height)
+        image1, image2 = self.graph_surfaces_once(match_id, home_team, away_team, home_team_id, away_team_id)
         image1_rect = image1.get_rect(center=(self.width // 4, self.height // 2))
         image2_rect = image2.get_rect(center=(self.width - self.width // 4, self.height // 2))
 
@@ -214,56 +138,225 @@ class PygameWindow:
         pygame.display.flip()
         
     def display_match(self, match_id, home_team_id, away_team_id, events):
-        data = self.fetch_data_once(match_id)
-        tracking_df = data.get('tracking_data')
+        data = self.fetch_data_once(match_id, home_team_id, away_team_id)
+        if data is None:
+            self.draw_loading(match_id, home_team_id, away_team_id, events)
+            return
+        tracking_store = data.get('tracking_store')
+        # Roster, names, jerseys and colors, resolved once when the match was loaded
+        context = data.get('context')
+        moments = data.get('moments')
 
-        home_players = self.fetch_player_from_team(home_team_id)['player_id'].tolist()
-        away_players = self.fetch_player_from_team(away_team_id)['player_id'].tolist()
-            
         # df_ball = tracking_df[tracking_df['player_id'] == 'ball']
-        # df_home = tracking_df[tracking_df['player_id'].isin(home_players)]
-        # df_away = tracking_df[tracking_df['player_id'].isin(away_players)]
-
-        if tracking_df["timestamp"].unique()[self.frame] < tracking_df["timestamp"].unique()[-1]:
-            plot = pitch_graph(tracking_df[tracking_df['timestamp'] == tracking_df["timestamp"].unique()[self.frame]])
-        
+        # df_home = tracking_df[tracking_df['player_id'].isin(context.home_players)]
+        # df_away = tracking_df[tracking_df['player_id'].isin(context.away_players)]
+
+        # Playback follows real time: the clock picks the frame for this moment, skipping
+        # frames when drawing falls behind. Frames come straight from the memory-mapped store
+        if self.playback is None:
+            self.playback = PlaybackClock(tracking_store.timestamps)
+            self.pitch_renderer = PitchRenderer.from_store(tracking_store, context)
+        self.handle_playback_keys(events, moments)
+        frame = self.playback.tick()
+
+        # Drawn natively with pygame onto a pitch surface cached per size, instead of a matplotlib figure per frame
         max_width = (self.width // 2 - 150) * 2
         max_height = (self.height // 2 - 150) * 2
-        image1 = self.scale_image_to_fit(plot, max_width, max_height)
-        image1_rect = image1.get_rect(center=(self.width // 2, self.height // 2))
-        
-        self.screen.blit(image1, image1_rect)
+        pitch_rect = pygame.Rect(0, 0, max_width, max_height)
+        pitch_rect.center = (self.width // 2, self.height // 2)
+        positions = tracking_store.frame(frame)
+        title = f"Player Positions at Event Timestamp: {tracking_store.timestamps[frame]:.2f}"
+        current = self.current_moment(moments)
+        if current is not None:
+            title += f"   Counter-attack {current + 1}/{len(moments)}"
+        control = None
+        control_colors = None
+        if self.show_control:
+            # Voronoi space control of this frame on the shared grid (a couple of ms)
+            home_share, areas = voronoi_control(positions, team_rows(tracking_store.team_ids, home_team_id, away_team_id))
+            control = home_share[0]
+            control_colors = (context.color(home_team_id), context.color(away_team_id))
+            total = max(areas[0].sum(), 1)
+            title += f"   Space control: home {areas[0, 0] / total * 100:.0f}% - away {areas[0, 1] / total * 100:.0f}%"
+        self.pitch_renderer.draw(self.screen, pitch_rect, positions, title=title, control=control, control_colors=control_colors)
         
         # Exit/back button
         button_width, button_height = 150, 60
         button_x = (self.width - button_width) // 2
         button_y = self.height - 100
+        # Controls first: Back drops the clock
+        self.draw_playback_controls(events)
         self.draw_button("Back", button_x, button_y, button_width, button_height, (200, 0, 0), (255, 0, 0), events, self.return_to_main)
 
         pygame.display.flip()
-        
-    def fetch_data_once(self, match_id):
-        if match_id not in self.cached_data:
-
-            # remove None and uncomment this please
-            match_events = fetch_match_events(match_id, self.connection)
-            tracking_data = fetch_tracking_data(match_id, self.connection)
-            tracking_data['timestamp'] = pd.to_timedelta(tracking_data['timestamp']).dt.total_seconds()
-            #tracking_data = tracking_data[((tracking_data['timestamp'] >= self.time -1) & (tracking_data['timestamp'] < self.time + 30))]
-            #tracking_data = add_frames(10, tracking_data)
-
-            self.cached_data[match_id] = {
-                'match_events': match_events,
-                'tracking_data': tracking_data,
-            }
-        return self.cached_data[match_id]
-
-    def fetch_player_from_team(self, team_id):
-        return fetch_player_teams(team_id, self.connection)
-        
+
+    def handle_playback_keys(self, events, moments=None):
+        # Space plays/pauses, left/right seek 5 seconds, up/down change the speed, V toggles space control,
+        # N and B jump to the next and previous counter-attack
+        for event in events:
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == pygame.K_SPACE:
+                self.playback.toggle()
+            elif event.key == pygame.K_LEFT:
+                self.playback.seek_by(-5)
+            elif event.key == pygame.K_RIGHT:
+                self.playback.seek_by(5)
+            elif event.key == pygame.K_UP:
+                self.playback.faster()
+            elif event.key == pygame.K_DOWN:
+                self.playback.slower()
+            elif event.key == pygame.K_v:
+                self.show_control = not self.show_control
+            elif event.key == pygame.K_n:
+                self.jump_to_moment(moments, 1)
+            elif event.key == pygame.K_b:
+                self.jump_to_moment(moments, -1)
+
+    def jump_to_moment(self, moments, direction):
+        # Clips are in match order on the tracking clock; seek to the start of the next (or previous) one from here
+        if moments is None or moments.empty:
+            return
+        starts = moments['clip_start'].to_numpy()
+        position = self.playback.position
+        if direction > 0:
+            i = np.searchsorted(starts, position + 1e-6, side='left')
+        else:
+            # Back to the start of the clip we're in first, the one before it on a second press
+            i = np.searchsorted(starts, position - 1, side='left') - 1
+        if 0 <= i < len(starts):
+            self.playback.seek(starts[i])
+
+    def current_moment(self, moments):
+        # Index of the counter-attack clip being played, None outside of them
+        if moments is None or moments.empty:
+            return None
+        i = np.searchsorted(moments['clip_start'].to_numpy(), self.playback.position, side='right') - 1
+        if i >= 0 and self.playback.position < moments['clip_end'].iat[i]:
+            return int(i)
+        return None
+
+    def draw_playback_controls(self, events):
+        playback = self.playback
+        button_width, button_height, spacing = 100, 40, 10
+        controls = [
+            ("-5s", lambda: playback.seek_by(-5)),
+            ("Pause" if playback.playing else "Play", playback.toggle),
+            ("+5s", lambda: playback.seek_by(5)),
+            ("Slower", playback.slower),
+            ("Faster", playback.faster),
+        ]
+        x = (self.width - len(controls) * (button_width + spacing) + spacing) // 2
+        for text, action in controls:
+            self.draw_button(text, x, 20, button_width, button_height, (200, 200, 200), (150, 150, 150), events, action)
+            x += button_width + spacing
+
+        # Seek bar: click anywhere on it to jump there
+        bar_width, bar_height = self.width // 2, 16
+        bar_x = (self.width - bar_width) // 2
+        bar_y = 75
+        bar_rect = pygame.Rect(bar_x, bar_y, bar_width, bar_height)
+        played = (playback.position - playback.start) / max(playback.end - playback.start, 1e-9)
+        pygame.draw.rect(self.screen, (255, 255, 255), bar_rect)
+        pygame.draw.rect(self.screen, (77, 169, 77), (bar_x, bar_y, int(bar_width * played), bar_height))
+        pygame.draw.rect(self.screen, (16, 16, 16), bar_rect, 2)
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONUP and bar_rect.collidepoint(event.pos):
+                playback.seek_fraction((event.pos[0] - bar_x) / bar_width)
+
+        self.draw_text(self.width // 2, bar_y + 35, f"{seconds_to_hms(playback.position)} / {seconds_to_hms(playback.end)}   speed {playback.speed:g}x", font_size=22, bold=False, color=(16, 16, 16))
+
+    def graph_surfaces_once(self, match_id, home_team, away_team, home_team_id, away_team_id):
+        # Charts are only drawn the first time a match's graphs are shown (or the window size changes)
+        key = (match_id, self.width, self.height)
+        if key not in self.graph_surfaces:
+            # Computed by the loader, so drawing the charts never queries
+            stats = self.fetch_data_once(match_id, home_team_id, away_team_id).get('stats')
+
+            image1 = SpiderChart_2T("Passes comparison", [home_team, away_team], stats['labels'], stats['home_values'], stats['away_values'], [0, 100])
+
+            #image2 = SpiderChart_1T("Passes", home_team, labels, t1Values, [0, 100], "#4CEF4C")
+            image2 = plot_team_transitions(stats['home_transitions'], stats['away_transitions'], home_team, away_team)
+
+            # Define maximum dimensions for each graph (e.g. half the screen width minus a margin, and half the screen height)
+            max_width = (self.width // 2 - 150) * 2
+            max_height = (self.height // 2 - 150) * 2
+
+            # Scale images if they exceed these dimensions
+            image1 = self.scale_image_to_fit(image1, max_width, max_height)
+            image2 = self.scale_image_to_fit(image2, max_width, max_height)
+
+            # The chart functions draw into pooled figures that the next match reuses, so keep copies
+            self.graph_surfaces[key] = (image1.copy(), image2.copy())
+        return self.graph_surfaces[key]
+
+    def load_match_data(self, match_id, home_team_id, away_team_id, progress):
+        # Runs on a prefetch worker thread: everything the match and graph views need from the database
+        progress(0, 5, "Fetching match events")
+        match_events = fetch_match_events(match_id, self.connection)
+
+        # Tracking is only downloaded the first time a match is opened; after that
+        # it is memory-mapped from disk (timestamps already in seconds)
+        progress(1, 5, "Fetching tracking data")
+        tracking_store = open_tracking_store(match_id, self.connection)
+        #tracking_data = tracking_data[((tracking_data['timestamp'] >= self.time -1) & (tracking_data['timestamp'] < self.time + 30))]
+        #tracking_data = add_frames(10, tracking_data)
+
+        # Both teams' rosters in one query; every view reads players from this from now on
+        progress(2, 5, "Fetching players")
+        context = MatchContext.load(match_id, home_team_id, away_team_id, self.connection)
+
+        # Pass statistics and transitions, ready for the graph view
+        progress(3, 5, "Calculating statistics")
+        stats = get_match_statistics(match_id, self.connection, home_team_id, away_team_id, match_events)
+
+        # Counter-attacks from balls the away team lost, found from the store's ball track
+        # period by period; their clips are on the tracking clock the playback seeks on
+        progress(4, 5, "Finding counter-attacks")
+        actions = fetch_spadl_actions(match_id, self.connection)
+        moments = match_counter_attacks(actions, tracking_store, losing_team_id=away_team_id)
+
+        progress(5, 5, "Done")
+        return {
+            'match_events': match_events,
+            'tracking_store': tracking_store,
+            'context': context,
+            'stats': stats,
+            'moments': moments,
+        }
+
+    def fetch_data_once(self, match_id, home_team_id, away_team_id):
+        # Never blocks: returns None (and makes sure the match is being loaded) until the data is there
+        self.prefetcher.request(match_id, home_team_id, away_team_id)
+        return self.prefetcher.get(match_id)
+
+    def draw_loading(self, match_id, home_team_id, away_team_id, events):
+        button_width, button_height = 150, 60
+        button_x = (self.width - button_width) // 2
+        button_y = self.height - 100
+
+        if self.prefetcher.status(match_id) == "failed":
+            self.draw_text(self.width // 2, self.height // 2, f"Loading match failed: {self.prefetcher.error(match_id)}", font_size=28, bold=True, color=(169, 77, 77))
+            self.draw_button("Retry", button_x, button_y - 80, button_width, button_height, (200, 200, 200), (150, 150, 150), events,
+                             lambda: self.prefetcher.retry(match_id, home_team_id, away_team_id))
+        else:
+            done, total, label = self.prefetcher.progress(match_id)
+            self.draw_text(self.width // 2, self.height // 2 - 50, f"{label}...", font_size=28, bold=True, color=(16, 16, 16))
+
+            # Progress bar
+            bar_width, bar_height = 400, 30
+            bar_x = (self.width - bar_width) // 2
+            bar_y = self.height // 2
+            pygame.draw.rect(self.screen, (255, 255, 255), (bar_x, bar_y, bar_width, bar_height))
+            pygame.draw.rect(self.screen, (77, 169, 77), (bar_x, bar_y, int(bar_width * done / total), bar_height))
+            pygame.draw.rect(self.screen, (16, 16, 16), (bar_x, bar_y, bar_width, bar_height), 2)
+
+        self.draw_button("Back", button_x, button_y, button_width, button_height, (200, 0, 0), (255, 0, 0), events, self.return_to_main)
+
     def return_to_main(self):
         self.view = "main"
         self.selected_match = None
+        self.playback = None
 
     def toggle_views(self, match_id=None, home_team=None, away_team=None, home_team_id=None, away_team_id=None, view_type="main"):
         if view_type == "main":
@@ -271,6 +364,7 @@ class PygameWindow:
         elif view_type == "match":
             self.view = "match"
             self.selected_match = (match_id, home_team, away_team, home_team_id, away_team_id)
+            self.playback = None
         elif view_type == "graph":
             self.view = "graph"
             self.selected_match = (match_id, home_team, away_team, home_team_id, away_team_id)
@@ -285,6 +379,8 @@ class PygameWindow:
         self.set_fullscreen()
 
         while self.running:
+            # Queries run on this thread so far; drawing a frame must not add any
+            queries_before = queries.queries_run()
             events = pygame.event.get()
             for event in events:
                 if event.type == pygame.QUIT:
@@ -303,7 +399,7 @@ class PygameWindow:
                     ball_rect = self.ball_img.get_rect(center=(0, self.height // 2))
                     self.screen.blit(self.ball_img, ball_rect)
                 
-                self.draw_text(self.width // 2 + 25, 100, "Please select a match to analyze! getting all the info takes a while", font_size=30, bold=False, color=(16, 16, 16))
+                self.draw_text(self.width // 2 + 25, 100, "Please select a match to analyze! matches on this page load in the background", font_size=30, bold=False, color=(16, 16, 16))
                 
                 total_matches = len(games["match_id"])
                 total_pages = math.ceil(total_matches / self.items_per_page)
@@ -323,6 +419,9 @@ class PygameWindow:
                     match_string = f"{home_team} vs {away_team}"
                     
                     match_pos_y = 200 + idx * vertical_spacing
+
+                    # Start loading the matches on screen before they are clicked
+                    self.prefetcher.prefetch(match_id, home_team_id, away_team_id)
                     
                     self.draw_button(
                         match_string, match_pos_x, match_pos_y, match_button_w, match_button_h, 
@@ -335,6 +434,13 @@ class PygameWindow:
                         (168, 177, 241), (156, 166, 235), events, 
                         lambda m_id=match_id, h=home_team, a=away_team, hi=home_team_id, ai=away_team_id: self.toggle_views(m_id, h, a, hi, ai, view_type="graph")
                     )
+
+                    # Loading state of the match next to its buttons
+                    status = self.prefetcher.status(match_id)
+                    if status == "loading":
+                        done, total, _ = self.prefetcher.progress(match_id)
+                        status = f"loading {done * 100 // total}%"
+                    self.draw_text(graph_pos_x + graph_button_w + 70, match_pos_y + match_button_h // 2, status, font_size=22, bold=False, color=(16, 16, 16))
                 
                 # Pagination buttons
                 pagination_y = self.height - 50
@@ -350,13 +456,17 @@ class PygameWindow:
                 self.display_graph(match_id, home_team, away_team, home_team_id, away_team_id, events)
             
             elif self.view == "match" and self.selected_match:
-                self.frame += 1
                 match_id, home_team, away_team, home_team_id, away_team_id = self.selected_match
                 self.display_match(match_id, home_team_id, away_team_id, events)
             
             pygame.display.flip()
+            self.frame_queries = queries.queries_run() - queries_before
+            if self.frame_queries and self.debug_queries:
+                print(f"Warning: rendering a frame ran {self.frame_queries} database queries")
             self.clock.tick(60)
 
+        self.prefetcher.shutdown()
+
     def change_page(self, delta):
         self.current_page += delta
         if self.current_page < 0:
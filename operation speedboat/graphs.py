@@ -1,96 +1,48 @@
 import matplotlib as mpl
-import pygame
 import matplotlib.pyplot as plt
-import numpy as np
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 import matplotlib.pyplot as plt
 from mplsoccer import Pitch
 from IPython.display import clear_output
 
+from chart_pool import SpiderChart, TransitionsChart, figure_pool, figure_to_surface
+from Python.pitch_control import AWAY, HOME, team_rows, voronoi_polygons
+
 #function to transform matplotlib to pygame comaptible stuff (basically magic)
+#wraps the Agg RGBA buffer directly, no tostring/fromstring copies; pygame keeps the buffer alive after the close
 def matplotlib_to_pygame_surface(fig):
     canvas = FigureCanvas(fig)
-    canvas.draw()
-    width, height = fig.get_size_inches() * fig.get_dpi()
-    image = pygame.image.fromstring(canvas.tostring_argb(), (int(width), int(height)), 'ARGB')
+    image = figure_to_surface(canvas)
 
-    plt.close()
+    plt.close(fig)
     return image
 
 #denis graph 2 (No comments available as IDK wth this code is)
+#the figure is kept in the pool and only gets new data; the returned surface is redrawn in place
+#on the next call with the same labels, so .copy() it to keep this one
 def SpiderChart_2T(ChartTitle, TeamNames, labels, t1Values, t2Values, value_range):
-    num_vars = len(labels)
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-
-    t1Values = t1Values + t1Values[:1]
-    t2Values = t2Values + t2Values[:1]
-    angles = angles + angles[:1]
-
     team1_color = "#4C4CBF"
     team2_color = "#BF4C4C"
 
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True), facecolor='none')
-    ax.set_facecolor('none')
-
-    ax.plot(angles, t1Values, color=team1_color, linewidth=2, label=TeamNames[0])
-    ax.fill(angles, t1Values, color=team1_color, alpha=0.25)
-
-    ax.plot(angles, t2Values, color=team2_color, linewidth=2, label=TeamNames[1])
-    ax.fill(angles, t2Values, color=team2_color, alpha=0.25)
-
-    ax.set_thetagrids(np.degrees(angles[:-1]), labels)
-    for label in ax.get_xticklabels():
-        label.set_color("black")
-    for label in ax.get_yticklabels():
-        label.set_color("black")
-    
-    ax.grid(color='black', linestyle='--', linewidth=0.5, alpha=0.7)
-    for spine in ax.spines.values():
-        spine.set_color('black')
-    
-    ax.set_ylim(value_range[0], value_range[1])
-    ax.set_title(ChartTitle, y=1.08, color='black')
-
-    leg = ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), frameon=False)
-    for text in leg.get_texts():
-        text.set_color("black")
-
-    return matplotlib_to_pygame_surface(fig)
+    chart = figure_pool.get(
+        ("spider_2t", tuple(labels), tuple(value_range)),
+        lambda: SpiderChart(labels, value_range, [team1_color, team2_color], "black")
+    )
+    chart.update(ChartTitle, TeamNames, [t1Values, t2Values])
+    return chart.render()
 
 #denis graph 1 (No comments available as IDK wth this code is)
+#pooled like SpiderChart_2T
 def SpiderChart_1T(ChartTitle, TeamName, labels, t1Values, value_range, teamColor):
-    num_vars = len(labels)
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-
-    t1Values = t1Values + t1Values[:1]
-    angles = angles + angles[:1]
-
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True), facecolor='none')
-    ax.set_facecolor('none')
-
-    ax.plot(angles, t1Values, color=teamColor, linewidth=2, label=TeamName)
-    ax.fill(angles, t1Values, color=teamColor, alpha=0.25)
-
-    ax.set_thetagrids(np.degrees(angles[:-1]), labels)
-    for label in ax.get_xticklabels():
-        label.set_color("white")
-    for label in ax.get_yticklabels():
-        label.set_color("white")
-    
-    ax.grid(color='white', linestyle='--', linewidth=0.5, alpha=0.7)
-    for spine in ax.spines.values():
-        spine.set_color('white')
-    
-    ax.set_ylim(value_range[0], value_range[1])
-    ax.set_title(ChartTitle, y=1.08, color='white')
-
-    leg = ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), frameon=False)
-    for text in leg.get_texts():
-        text.set_color("white")
-    
-    return matplotlib_to_pygame_surface(fig)
+    chart = figure_pool.get(
+        ("spider_1t", tuple(labels), tuple(value_range), teamColor),
+        lambda: SpiderChart(labels, value_range, [teamColor], "white")
+    )
+    chart.update(ChartTitle, [TeamName], [t1Values])
+    return chart.render()
 
 #IDK if this is the correct one, but I copied it from denis his file, for more info please talk to him :D
+#players are scattered per team in one call and the cells come from Python/pitch_control.py
 def voronoi_graph(tracking_data):
         # Define pitch dimensions and colors
     pitch = Pitch(pitch_color='grass', line_color='white', pitch_type='opta')
@@ -98,38 +50,34 @@ def voronoi_graph(tracking_data):
     
     # Extract timestamp and team names
     timestamp = tracking_data['timestamp'].iloc[0]
-    team_names = tracking_data['team_id'].unique()
+    is_ball = (tracking_data['player_name'] == 'Ball').to_numpy()
+    players = tracking_data[~is_ball]
+    team_names = players['team_id'].unique()
     colors = mpl.colors.TABLEAU_COLORS
     color_map = {team: color for team, color in zip(team_names, colors.values())}
-    
-    points = []
-    colors = []
-    
-    # Plot player positions
-    for _, row in tracking_data.iterrows():
-        x = row['x']
-        y = row['y']
-        player_name = row['player_name']
-        team_name = row['team_id']
-        jersey_no = row['jersey_number']
-        
-        # Plot the ball
-        if player_name == 'Ball':
-            pitch.scatter(x, y, s=90, color='yellow', ax=ax, label='Ball')
-        else:
-            # Plot players
-            pitch.scatter(x, y, s=100, color=color_map[team_name], ax=ax, label=team_name)
-            points.append([x, y])
-            colors.append(color_map[team_name])
-        
-        # Add player names (excluding the ball)
-        if player_name != 'Ball':
-            ax.text(x + 2, y + 2, f"{player_name} ({jersey_no})", fontsize=8)
-            
-    team1, team2 = pitch.voronoi(points, colors)
 
-    t1 = pitch.polygon(team1, ax=ax, fc='#c34c45', ec='white', lw=3, alpha=0.4)
-    t2 = pitch.polygon(team2, ax=ax, fc='#6f63c5', ec='white', lw=3, alpha=0.4)
+    # Plot the ball
+    ball = tracking_data[is_ball]
+    if not ball.empty:
+        pitch.scatter(ball['x'], ball['y'], s=90, color='yellow', ax=ax, label='Ball')
+
+    # Plot players
+    for team_name, team in players.groupby('team_id', sort=False):
+        pitch.scatter(team['x'], team['y'], s=100, color=color_map[team_name], ax=ax, label=team_name)
+
+    # Add player names (excluding the ball)
+    for x, y, player_name, jersey_no in zip(players['x'], players['y'], players['player_name'], players['jersey_number']):
+        ax.text(x + 2, y + 2, f"{player_name} ({jersey_no})", fontsize=8)
+
+    # First team listed is team 1
+    home_team_id = team_names[0] if len(team_names) > 0 else None
+    away_team_id = team_names[1] if len(team_names) > 1 else None
+    cells = voronoi_polygons(players[['x', 'y']].to_numpy(dtype=float), team_rows(players['team_id'], home_team_id, away_team_id))
+
+    for polygon in cells[HOME]:
+        pitch.polygon([polygon], ax=ax, fc='#c34c45', ec='white', lw=3, alpha=0.4)
+    for polygon in cells[AWAY]:
+        pitch.polygon([polygon], ax=ax, fc='#6f63c5', ec='white', lw=3, alpha=0.4)
     
     # Set title
     #ax.set_title(f'Player Positions and Voronoi Diagram at Event Timestamp: {timestamp}', fontsize=16)
@@ -174,26 +122,11 @@ def pitch_graph(tracking_data):
     plt.tight_layout()
     return matplotlib_to_pygame_surface(fig)
 
+#pooled like SpiderChart_2T
 def plot_team_transitions(team1_data, team2_data, team1, team2):
-
-    categories = ["Period 1", "Period 2"]
     values1 = [team1_data.count(1), team1_data.count(2)]  # Values for the first bar in each period
     values2 = [team2_data.count(1), team2_data.count(2)]   # Values for the second bar in each period
 
-    # Bar positions
-    x = np.arange(len(categories))
-    width = 0.4  # Width of the bars
-
-    # Create the plot
-    fig, ax = plt.subplots()
-    ax.set_facecolor('none')
-    ax.bar(x - width/2, values1, width, label=team1, color="#8974FB")
-    ax.bar(x + width/2, values2, width, label=team2, color="#FB7489")
-
-    # Labels and title
-    ax.set_xticks(x)
-    ax.set_xticklabels(categories)
-    ax.set_ylabel("No. Attack transitions / period")
-    ax.legend()
-    fig.patch.set_alpha(0)
-    return matplotlib_to_pygame_surface(fig)
\ No newline at end of file
+    chart = figure_pool.get("team_transitions", TransitionsChart)
+    chart.update([team1, team2], values1, values2)
+    return chart.render()
@@ -1,59 +1,173 @@
+import numpy as np
 import pandas as pd
 
-def add_frames(added_frames, dataframe):
-    added_time = 1 / (added_frames - 1)
-    subset_copy = dataframe.copy()
 
-    new_rows = []
-
-    for i in subset_copy['timestamp'].unique():
-
-        x1_list = subset_copy[subset_copy['timestamp'] == i][['x']].values
-        if i + 1 in subset_copy['timestamp'].values:
-            x2_list = subset_copy[subset_copy['timestamp'] == i + 1][['x']].values
+# Per-player columns, copied onto every generated row of that player
+PLAYER_COLUMNS = ['jersey_number', 'player_name', 'team_id']
+
+
+def _to_seconds(timestamps):
+    """Timestamps as float seconds, whether they arrive as numbers, text ('00:00:01') or timedeltas."""
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return timestamps.to_numpy(dtype=np.float64)
+    return pd.to_timedelta(timestamps).dt.total_seconds().to_numpy(dtype=np.float64)
+
+
+def _frame_key(dataframe):
+    # frame_id tells frames apart even when several share a whole-second timestamp
+    return 'frame_id' if 'frame_id' in dataframe.columns else 'timestamp'
+
+
+def _upsample(dataframe, added_frames, max_gap=None, skip_first=False):
+    """
+    Upsample one block of whole frames.
+
+    The rows are pivoted into a (frames, players, 2) array with NaN where a
+    player isn't tracked, every gap between two consecutive frames gets
+    ``added_frames - 1`` evenly spaced frames for all players at once, and the
+    result is melted back to rows. A player is only interpolated across a gap
+    they are tracked at on both ends, so substitutes simply appear and
+    disappear with their real rows.
+
+    Args:
+        dataframe (pd.DataFrame): Tracking rows, at least frame_id or timestamp, player_id, x and y.
+        added_frames (int): Each gap is split into this many steps.
+        max_gap (float, optional): Gaps longer than this many seconds are not bridged.
+        skip_first (bool): Leave out the first frame's real rows (already returned with the previous block).
+
+    Returns:
+        pd.DataFrame: Real and generated rows, ordered by time then player.
+    """
+    key = _frame_key(dataframe)
+    frame_rows, frame_values = pd.factorize(dataframe[key], sort=True)
+    player_cols, player_ids = pd.factorize(dataframe['player_id'])
+    n_frames, n_players = len(frame_values), len(player_ids)
+
+    # (time x player) positions; frames a player is missing from stay NaN
+    positions = np.full((n_frames, n_players, 2), np.nan)
+    positions[frame_rows, player_cols] = dataframe[['x', 'y']].to_numpy(dtype=np.float64)
+
+    # Frame-level values: the first row of every frame
+    _, first_rows = np.unique(frame_rows, return_index=True)
+    seconds = _to_seconds(dataframe['timestamp'].iloc[first_rows])
+    frame_columns = [col for col in dataframe.columns
+                     if col not in ['x', 'y', 'player_id', 'timestamp', key] + PLAYER_COLUMNS]
+
+    # Row r of the output is frame src[r] moved a fraction frac[r] towards the next frame
+    fractions = np.arange(added_frames) / added_frames
+    src = np.append(np.repeat(np.arange(n_frames - 1), added_frames), n_frames - 1)
+    frac = np.append(np.tile(fractions, n_frames - 1), 0.0)
+    nxt = np.minimum(src + 1, n_frames - 1)
+
+    bridged = np.ones(max(n_frames - 1, 0), dtype=bool)
+    if max_gap is not None:
+        bridged &= np.diff(seconds) <= max_gap
+    if 'period_id' in frame_columns:
+        # Never interpolate across half time
+        periods = dataframe['period_id'].to_numpy()[first_rows]
+        bridged &= periods[1:] == periods[:-1]
+    keep = (frac == 0) | np.append(bridged, False)[src]
+    if skip_first:
+        keep &= ~((src == 0) & (frac == 0))
+    src, nxt, frac = src[keep], nxt[keep], frac[keep]
+
+    # All players of all generated frames in one go; NaN at either end stays NaN
+    out_positions = positions[src] + frac[:, None, None] * (positions[nxt] - positions[src])
+    out_seconds = seconds[src] + frac * (seconds[nxt] - seconds[src])
+
+    # Back to one row per tracked player per frame
+    rows, cols = np.nonzero(~np.isnan(out_positions).any(axis=2))
+    result = {}
+    if key == 'frame_id':
+        frame_ids = np.asarray(frame_values)
+        if pd.api.types.is_numeric_dtype(frame_ids):
+            # Fractional frame_ids keep generated frames in order, as interpolate_tracking does
+            frame_ids = frame_ids.astype(np.float64)
+            result['frame_id'] = (frame_ids[src] + frac * (frame_ids[nxt] - frame_ids[src]))[rows]
         else:
+            result['frame_id'] = frame_ids[src][rows]
+    result['timestamp'] = out_seconds[rows]
+    result['player_id'] = np.asarray(player_ids)[cols]
+    result['x'] = out_positions[rows, cols, 0]
+    result['y'] = out_positions[rows, cols, 1]
+
+    _, player_first = np.unique(player_cols, return_index=True)
+    for col in PLAYER_COLUMNS + frame_columns:
+        if col not in dataframe.columns:
             continue
-
-        y1_list = subset_copy[subset_copy['timestamp'] == i][['y']].values
-        if i + 1 in subset_copy['timestamp'].values:
-            y2_list = subset_copy[subset_copy['timestamp'] == i + 1][['y']].values
+        values = dataframe[col].to_numpy()
+        if col in PLAYER_COLUMNS:
+            result[col] = values[player_first][cols]
         else:
+            result[col] = values[first_rows][src][rows]
+
+    columns = [col for col in dataframe.columns if col in result]
+    return pd.DataFrame(result, columns=columns)
+
+
+def add_frames(added_frames, dataframe, max_gap=None):
+    """
+    Insert ``added_frames - 1`` interpolated frames between every two consecutive frames.
+
+    Every player is interpolated at once on a (time x player) array, so this
+    scales with the number of rows. Frames may be any time apart and players
+    may come and go (substitutions): a player gets generated rows only between
+    two frames they are tracked in.
+
+    Args:
+        added_frames (int): Each gap between two frames is split into this many steps.
+        dataframe (pd.DataFrame): Tracking rows as ``fetch_tracking_data`` returns them.
+        max_gap (float, optional): Gaps longer than this many seconds are left alone.
+
+    Returns:
+        pd.DataFrame: Real and generated rows sorted by time. Timestamps are
+            float seconds, frame_ids of generated rows are fractional.
+    """
+    if added_frames < 1:
+        raise ValueError(f"added_frames must be at least 1, got {added_frames}.")
+    if dataframe.empty:
+        return dataframe.copy()
+    return _upsample(dataframe, added_frames, max_gap)
+
+
+def add_frames_streaming(added_frames, chunks, max_gap=None):
+    """
+    Upsample a stream of tracking chunks in bounded memory, e.g. from ``stream_tracking_data``.
+
+    Chunks must come in time order but may split a frame between them: the
+    last frame of every chunk is held back until the next chunk shows it is
+    complete, and the last frame returned is kept as the start of the next
+    gap, so the output is the same as ``add_frames`` on the whole match.
+
+    Args:
+        added_frames (int): Each gap between two frames is split into this many steps.
+        chunks (iterable): pd.DataFrame chunks of tracking rows.
+        max_gap (float, optional): Gaps longer than this many seconds are left alone.
+
+    Yields:
+        pd.DataFrame: Real and generated rows of each chunk, sorted by time.
+    """
+    if added_frames < 1:
+        raise ValueError(f"added_frames must be at least 1, got {added_frames}.")
+
+    anchor = None  # last frame already yielded, the start of the next gap
+    pending = None  # possibly incomplete last frame of the previous chunk
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        key = _frame_key(chunk)
+        is_last = (chunk[key] == chunk[key].iloc[-1]).to_numpy()
+        pending = chunk[is_last]
+        complete = chunk[~is_last]
+        if complete.empty:
             continue
 
-        if i != subset_copy['timestamp'].unique()[-1]:
-            for index in range(len(subset_copy['player_id'].unique())):
-                x1 = x1_list[index].item()
-                x2 = x2_list[index].item()
-
-                y1 = y1_list[index].item()
-                y2 = y2_list[index].item()
-
-                deltax = (x2 - x1) / added_frames
-                deltay = (y2 - y1) / added_frames
-
-                current_time = i
-
-                for j in range(added_frames - 1):
-
-                    current_time = current_time + added_time
-                    x1 = x1 + deltax
-                    y1 = y1 + deltay
-
-                    current_player_id = subset_copy['player_id'].unique()[index]
-                    current_player = subset_copy[subset_copy['player_id'] == current_player_id]
-
-                    current_frame = current_player['frame_id'].unique()[0]
-                    current_name = current_player['player_name'].unique()[0]
-                    current_num = current_player['jersey_number'].unique()[0]
-                    current_team = current_player['team_id'].unique()[0]
-
-                    new_rows.append([current_frame, current_time, current_player_id, x1, y1, current_num, current_name, current_team])
-                    subset_copy.index = subset_copy.index + 1
-
-
-    new_rows_df = pd.DataFrame(new_rows, columns=list(subset_copy.columns.values))
-    subset_copy = pd.concat([subset_copy, new_rows_df], ignore_index=True)
-
-    subset_copy.sort_values(by='timestamp', inplace=True)
+        block = complete if anchor is None else pd.concat([anchor, complete], ignore_index=True)
+        yield _upsample(block, added_frames, max_gap, skip_first=anchor is not None)
+        anchor = complete[(complete[key] == complete[key].iloc[-1]).to_numpy()]
 
-    return subset_copy
+    if pending is not None and not pending.empty:
+        block = pending if anchor is None else pd.concat([anchor, pending], ignore_index=True)
+        yield _upsample(block, added_frames, max_gap, skip_first=anchor is not None)
@@ -0,0 +1,221 @@
+import numpy as np
+import pygame
+
+from Python.match_context import TEAM_COLORS
+
+
+# Real pitch size in metres; tracking coordinates are opta (0-100 on both axes)
+PITCH_LENGTH = 105
+PITCH_WIDTH = 68
+# Grass around the lines, in metres
+PITCH_MARGIN = 4
+
+GRASS_COLORS = ((98, 155, 70), (88, 145, 62))
+LINE_COLOR = (255, 255, 255)
+BALL_COLOR = (255, 221, 0)
+LABEL_COLOR = (16, 16, 16)
+
+
+class PitchRenderer:
+    """
+    Draw tracking frames straight onto a pygame surface.
+
+    The pitch markings are rendered once per window size and cached; a frame
+    is one blit of that surface plus a circle, a jersey number and a name label
+    per object, placed with NumPy from a (n_objects, 2) opta coordinate array.
+    Text surfaces are rendered once per size as well, so nothing is allocated
+    per frame except the title.
+    """
+    def __init__(self, team_ids, player_names, jersey_numbers, team_colors=None):
+        """
+        Set up the objects the frames will contain, in the column order of the position arrays.
+
+        Args:
+            team_ids (array-like): Team of every object; the ball's is ignored.
+            player_names (array-like): Name of every object; the ball is called 'Ball'.
+            jersey_numbers (array-like): Jersey number of every object, None for the ball.
+            team_colors (dict, optional): RGB color per team_id, e.g. ``MatchContext.colors``.
+                By default teams get TEAM_COLORS in sorted order.
+        """
+        self.player_names = [str(name) for name in player_names]
+        self.jersey_numbers = ['' if number is None or number != number else str(int(number)) for number in jersey_numbers]
+        self.is_ball = np.array([name == 'Ball' for name in self.player_names], dtype=bool)
+
+        # Assign colors to teams based on sorted order, to stay consistent between frames
+        team_ids = np.asarray(team_ids, dtype=object)
+        teams = sorted({str(team) for team in team_ids[~self.is_ball]})
+        self.team_colors = {team: TEAM_COLORS[i % len(TEAM_COLORS)] for i, team in enumerate(teams)}
+        if team_colors is not None:
+            self.team_colors.update({str(team): color for team, color in team_colors.items()})
+        self.colors = [BALL_COLOR if ball else self.team_colors[str(team)]
+                       for team, ball in zip(team_ids, self.is_ball)]
+
+        self._layouts = {}
+
+    @classmethod
+    def from_store(cls, store, context=None):
+        """
+        Renderer for the objects of a TrackingStore.
+
+        With a ``MatchContext`` the names, jersey numbers and team colors come
+        from the match's roster (the store's own are kept for anyone not on it).
+        """
+        if context is None:
+            return cls(store.team_ids, store.player_names, store.jersey_numbers)
+        names = [context.name(player, name) for player, name in zip(store.player_ids, store.player_names)]
+        jerseys = [context.jersey(player, number) for player, number in zip(store.player_ids, store.jersey_numbers)]
+        return cls(store.team_ids, names, jerseys, team_colors=context.colors)
+
+    def layout(self, size):
+        """
+        Return the cached pitch surface, scale and text surfaces for a target size.
+
+        Args:
+            size (tuple): (width, height) of the area the pitch is drawn in.
+
+        Returns:
+            dict: ``pitch`` surface, ``scale`` (pixels per metre), ``origin`` of the
+                pitch's top-left corner, ``radius`` of the player circles and the
+                rendered ``numbers``, ``labels`` and title ``font``.
+        """
+        if size not in self._layouts:
+            width, height = size
+            scale = min(width / (PITCH_LENGTH + 2 * PITCH_MARGIN), height / (PITCH_WIDTH + 2 * PITCH_MARGIN))
+            pitch_size = (int(round((PITCH_LENGTH + 2 * PITCH_MARGIN) * scale)), int(round((PITCH_WIDTH + 2 * PITCH_MARGIN) * scale)))
+            radius = max(3, int(round(0.9 * scale)))
+
+            number_font = pygame.font.Font(None, max(10, int(radius * 1.5)))
+            label_font = pygame.font.Font(None, max(10, int(1.6 * scale)))
+            self._layouts[size] = {
+                'pitch': self._draw_pitch(pitch_size, scale),
+                'scale': scale,
+                'origin': (PITCH_MARGIN * scale, PITCH_MARGIN * scale),
+                'radius': radius,
+                'numbers': [number_font.render(number, True, (255, 255, 255)) if number else None
+                            for number in self.jersey_numbers],
+                'labels': [None if ball else label_font.render(f"{name} ({number})", True, LABEL_COLOR)
+                           for name, number, ball in zip(self.player_names, self.jersey_numbers, self.is_ball)],
+                'font': pygame.font.Font(None, max(16, int(2.2 * scale))),
+            }
+        return self._layouts[size]
+
+    def _draw_pitch(self, pitch_size, scale):
+        surface = pygame.Surface(pitch_size)
+
+        # Mowing stripes across the whole surface
+        stripes = 12
+        stripe_width = pitch_size[0] / stripes
+        for i in range(stripes):
+            pygame.draw.rect(surface, GRASS_COLORS[i % 2], (int(i * stripe_width), 0, int(stripe_width) + 1, pitch_size[1]))
+
+        def point(x, y):
+            # opta -> pixels, y up
+            return (int(round((PITCH_MARGIN + x / 100 * PITCH_LENGTH) * scale)),
+                    int(round((PITCH_MARGIN + (1 - y / 100) * PITCH_WIDTH) * scale)))
+
+        def box(x0, y0, x1, y1):
+            (left, top), (right, bottom) = point(x0, y1), point(x1, y0)
+            return pygame.Rect(left, top, right - left, bottom - top)
+
+        line = max(1, int(round(0.15 * scale)))
+
+        # Touchlines, halfway line and centre circle (radius 9.15 m)
+        pygame.draw.rect(surface, LINE_COLOR, box(0, 0, 100, 100), line)
+        pygame.draw.line(surface, LINE_COLOR, point(50, 0), point(50, 100), line)
+        circle_radius = int(round(9.15 * scale))
+        pygame.draw.circle(surface, LINE_COLOR, point(50, 50), circle_radius, line)
+        pygame.draw.circle(surface, LINE_COLOR, point(50, 50), max(2, line + 1))
+
+        # Penalty areas, six-yard boxes, penalty spots and arcs, goals (opta dimensions, as mplsoccer)
+        arc_angle = np.arccos((17 - 11.5) / 100 * PITCH_LENGTH / 9.15)
+        for side in (0, 1):
+            def mirrored(x):
+                return 100 - x if side else x
+            pygame.draw.rect(surface, LINE_COLOR, box(min(mirrored(0), mirrored(17)), 21.1, max(mirrored(0), mirrored(17)), 78.9), line)
+            pygame.draw.rect(surface, LINE_COLOR, box(min(mirrored(0), mirrored(5.8)), 36.8, max(mirrored(0), mirrored(5.8)), 63.2), line)
+
+            spot = point(mirrored(11.5), 50)
+            pygame.draw.circle(surface, LINE_COLOR, spot, max(2, line + 1))
+            arc_rect = pygame.Rect(spot[0] - circle_radius, spot[1] - circle_radius, 2 * circle_radius, 2 * circle_radius)
+            start = np.pi - arc_angle if side else -arc_angle
+            pygame.draw.arc(surface, LINE_COLOR, arc_rect, start, start + 2 * arc_angle, line)
+
+            goal_depth = 1.9 if side else -1.9
+            pygame.draw.rect(surface, LINE_COLOR, box(min(mirrored(0), mirrored(0) + goal_depth), 45.2,
+                                                      max(mirrored(0), mirrored(0) + goal_depth), 54.8), line)
+        return surface.convert() if pygame.display.get_init() and pygame.display.get_surface() else surface
+
+    def _draw_control(self, surface, pitch_rect, layout, control, control_colors):
+        # Blend the two team colors per cell, upscale the small grid to the field and lay it
+        # over the grass with surface alpha (far cheaper to blit than per-pixel alpha)
+        if np.isnan(control).all():
+            return
+        home_color, away_color = (np.array(color, dtype=np.float32) for color in control_colors)
+        share = np.nan_to_num(np.flipud(control), nan=0.5)[:, :, None]
+        pixels = np.ascontiguousarray(share * home_color + (1 - share) * away_color, dtype=np.uint8)
+
+        grid = pygame.image.frombuffer(pixels, (control.shape[1], control.shape[0]), 'RGB')
+        if pygame.display.get_init() and pygame.display.get_surface():
+            # In the display's pixel format, so the big blit below needs no conversion
+            grid = grid.convert()
+        scale, (origin_x, origin_y) = layout['scale'], layout['origin']
+        field = pygame.transform.smoothscale(grid, (int(round(PITCH_LENGTH * scale)), int(round(PITCH_WIDTH * scale))))
+        field.set_alpha(90)
+        surface.blit(field, (pitch_rect.x + int(round(origin_x)), pitch_rect.y + int(round(origin_y))))
+
+    def to_screen(self, positions, size, offset=(0, 0)):
+        """Map (n, 2) opta coordinates to pixel positions inside an area of ``size`` at ``offset``."""
+        layout = self.layout(size)
+        scale, (origin_x, origin_y) = layout['scale'], layout['origin']
+        left, top = layout['pitch'].get_rect(center=pygame.Rect(offset, size).center).topleft
+
+        screen = np.empty_like(positions, dtype=np.float64)
+        screen[:, 0] = left + origin_x + positions[:, 0] / 100 * PITCH_LENGTH * scale
+        screen[:, 1] = top + origin_y + (1 - positions[:, 1] / 100) * PITCH_WIDTH * scale
+        return screen
+
+    def draw(self, surface, rect, positions, title=None, control=None, control_colors=None):
+        """
+        Draw one frame centred in ``rect`` of ``surface``.
+
+        Args:
+            surface (pygame.Surface): Where to draw, e.g. the screen.
+            rect (pygame.Rect): Area the pitch is fitted into.
+            positions (np.ndarray): (n_objects, 2) opta coordinates; NaN rows aren't drawn.
+            title (str, optional): Text drawn above the pitch.
+            control (np.ndarray, optional): (ny, nx) home share of every pitch cell, bottom
+                row first, as ``pitch_control`` returns it; drawn under the players.
+            control_colors (tuple, optional): (home, away) RGB colors of the control overlay.
+        """
+        rect = pygame.Rect(rect)
+        layout = self.layout(rect.size)
+        pitch = layout['pitch']
+        pitch_rect = pitch.get_rect(center=rect.center)
+        surface.blit(pitch, pitch_rect)
+
+        if control is not None:
+            self._draw_control(surface, pitch_rect, layout, control, control_colors or TEAM_COLORS)
+
+        screen = self.to_screen(positions, rect.size, rect.topleft)
+        on_pitch = ~np.isnan(screen).any(axis=1)
+        radius = layout['radius']
+
+        # Players first, then the ball on top
+        order = np.flatnonzero(on_pitch & ~self.is_ball).tolist() + np.flatnonzero(on_pitch & self.is_ball).tolist()
+        for i, (x, y) in zip(order, screen[order].astype(int).tolist()):
+            if self.is_ball[i]:
+                pygame.draw.circle(surface, self.colors[i], (x, y), max(2, radius * 2 // 3))
+                pygame.draw.circle(surface, (0, 0, 0), (x, y), max(2, radius * 2 // 3), 1)
+                continue
+
+            pygame.draw.circle(surface, self.colors[i], (x, y), radius)
+            number = layout['numbers'][i]
+            if number is not None:
+                surface.blit(number, number.get_rect(center=(x, y)))
+            label = layout['labels'][i]
+            surface.blit(label, (x + radius + 2, y - radius - label.get_height()))
+
+        # Title in the grass margin above the touchline
+        if title:
+            text = layout['font'].render(title, True, LABEL_COLOR)
+            surface.blit(text, text.get_rect(midtop=(pitch_rect.centerx, pitch_rect.top + 2)))
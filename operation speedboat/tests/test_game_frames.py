@@ -0,0 +1,47 @@
+import os
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def local_window(monkeypatch, tmp_path):
+    """A windowed PygameWindow on the dummy video driver, reading the SQL dump in not_needed."""
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+    monkeypatch.setenv("SPEEDBOAT_LOCAL_DB", os.path.join(ROOT, "not_needed", "data.sql"))
+    monkeypatch.setenv("MATCH_CACHE_DIR", str(tmp_path))
+    pygame = pytest.importorskip("pygame")
+    from Python.db_pool import close_pools
+    from game import PygameWindow
+
+    window = PygameWindow(fullscreen=False)
+    yield window
+    window.prefetcher.shutdown()
+    close_pools()
+    pygame.quit()
+
+
+def test_rendering_frames_runs_no_queries(local_window):
+    from Python import queries
+    from Python.db_pool import borrow
+
+    with borrow() as conn:
+        matches = queries.MATCHES.read(conn)
+    # Read the row the way run() does, so the ids are the values the match list passes on
+    match = next(matches[matches['match_id'].astype(str) == "9001"].itertuples())
+    args = (match.match_id, match.home_team_id, match.away_team_id)
+
+    # Match data loads on the prefetcher's threads; wait for it like the loading screen does
+    deadline = time.monotonic() + 60
+    while local_window.fetch_data_once(*args) is None:
+        assert local_window.prefetcher.status(args[0]) != "failed", local_window.prefetcher.error(args[0])
+        assert time.monotonic() < deadline, "match data did not load"
+        time.sleep(0.05)
+
+    queries_before = queries.queries_run()
+    for _ in range(5):
+        local_window.display_match(*args, events=[])
+    assert local_window.playback is not None
+    assert queries.queries_run() == queries_before
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+from Python.helperfunctions import fetch_match_events, fetch_spadl_actions, fetch_tracking_data
+from Python.local_backend import LocalBackend
+from Python.match_context import MatchContext
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def conn(monkeypatch, tmp_path):
+    """A connection to the SQL dump in not_needed, with the match cache pointed at an empty folder."""
+    monkeypatch.setenv("MATCH_CACHE_DIR", str(tmp_path))
+    backend = LocalBackend.open(os.path.join(ROOT, "not_needed", "data.sql"))
+    with backend.connection() as conn:
+        yield conn
+    backend.closeall()
+
+
+def test_fetches_from_the_sql_dump(conn, tmp_path):
+    tracking = fetch_tracking_data(9001, conn, use_cache=False)
+    assert list(tracking.columns) == ['frame_id', 'timestamp', 'period_id', 'player_id', 'x', 'y',
+                                      'jersey_number', 'player_name', 'team_id']
+    assert len(tracking) == 8
+
+    events = fetch_match_events(9001, conn, use_cache=False)
+    assert {'match_id', 'event_id', 'eventtype_name', 'period_id', 'timestamp', 'ball_owning_team',
+            'team_id', 'player_id', 'x', 'y'} <= set(events.columns)
+    assert len(events) == 2
+
+    actions = fetch_spadl_actions(9001, conn, use_cache=False)
+    assert {'id', 'game_id', 'period_id', 'seconds', 'player_id', 'team_id', 'start_x', 'start_y',
+            'end_x', 'end_y', 'action_type', 'result'} <= set(actions.columns)
+    assert len(actions) == 2
+
+    # use_cache=False reads the database every time and writes nothing
+    assert not os.listdir(tmp_path)
+
+
+def test_match_context_from_the_sql_dump(conn):
+    context = MatchContext.load(9001, 1, 2, conn)
+    assert list(context.roster.columns) == ['player_id', 'player_name', 'jersey_number', 'team_id', 'team_name']
+    assert len(context.roster) == 5
+    assert context.home_players == ['101', '102', '5000']
+    assert context.away_players == ['103', '104']
+    assert context.team_names == {'1': 'The Flying Squirrels', '2': 'The Dancing Referees'}
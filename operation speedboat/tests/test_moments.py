@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from Python.moments import match_counter_attacks, period_starts
+from Python.tracking_store import build_tracking_store
+
+# Tracking runs on one clock for the whole match; the second half starts at 00:50:59
+SECOND_HALF = 3059.0
+
+
+def clock(seconds):
+    return pd.to_timedelta(seconds, unit='s').astype(str).str.replace("0 days ", "", regex=False).to_numpy()
+
+
+def tracking_frame(periods):
+    """Ball-only tracking at 1 Hz; ``periods`` maps period_id -> (first timestamp, ball x per second)."""
+    parts = []
+    for period_id, (start, ball_x) in periods.items():
+        seconds = start + np.arange(len(ball_x), dtype=float)
+        parts.append(pd.DataFrame({
+            'frame_id': (seconds * 25).astype(np.int64),
+            'timestamp': clock(seconds),
+            'period_id': period_id,
+            'player_id': 'ball',
+            'x': np.asarray(ball_x, dtype=float),
+            'y': 50.0,
+            'jersey_number': 0,
+            'player_name': 'Ball',
+            'team_id': 'ball',
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def spadl_actions(rows):
+    """SPADL actions from (period_id, seconds, team_id, action_type, result, start_x) tuples."""
+    actions = pd.DataFrame(rows, columns=['period_id', 'seconds', 'team_id', 'action_type', 'result', 'start_x'])
+    return actions.assign(id=np.arange(len(actions)), game_id='G1', player_id='p1', start_y=50.0,
+                          end_x=actions['start_x'], end_y=50.0)
+
+
+def test_second_half_counter_attack_is_searched_in_second_half_tracking():
+    # First half: the ball crosses midfield at 25 s and stays over it. Second
+    # half: it sits back until 42 s into the half, then crosses.
+    first_half = np.where(np.arange(60) < 25, 30.0, 70.0)
+    second_half = np.where(np.arange(60) < 42, 30.0, 70.0)
+    tracking = tracking_frame({1: (0.0, first_half), 2: (SECOND_HALF, second_half)})
+    # A ball lost 40 s into the second half; 40 s into the first half the ball was already over midfield
+    actions = spadl_actions([(2, 40.0, 'away', '0', '0', 30.0)])
+
+    moments = match_counter_attacks(actions, tracking, losing_team_id='away')
+
+    assert len(moments) == 1
+    moment = moments.iloc[0]
+    assert moment['period_id'] == 2
+    assert moment['seconds'] == 40.0
+    assert moment['match_seconds'] == SECOND_HALF + 40
+    assert moment['crossing_seconds'] == SECOND_HALF + 42
+    assert moment['clip_start'] == SECOND_HALF + 35
+    assert moment['clip_end'] == SECOND_HALF + 58
+
+
+def test_tracking_store_gives_the_same_moments(tmp_path):
+    rng = np.random.default_rng(1)
+    tracking = tracking_frame({1: (0.0, rng.uniform(20, 80, 120)), 2: (SECOND_HALF, rng.uniform(20, 80, 120))})
+    actions = spadl_actions([(period, float(s), 'away', '0', '0', 30.0) for period in (1, 2) for s in range(0, 110, 3)])
+    store = build_tracking_store(tracking, str(tmp_path / "G1"))
+
+    assert period_starts(store) == period_starts(tracking) == {1: 0.0, 2: SECOND_HALF}
+    from_frame = match_counter_attacks(actions, tracking, losing_team_id='away')
+    from_store = match_counter_attacks(actions, store, losing_team_id='away')
+    assert set(from_frame['period_id']) == {1, 2}
+    pd.testing.assert_frame_equal(from_frame, from_store, check_dtype=False)
+
+
+def per_candidate_loop(actions, tracking, losing_team_id):
+    """The loop visualise_important_moments used to run, one candidate at a time, per period on the tracking clock."""
+    ball = tracking[tracking['player_name'] == 'Ball']
+    ball = ball.assign(timestamp=pd.to_timedelta(ball['timestamp']).dt.total_seconds())
+    fail = actions[actions['action_type'].isin(["0", "1", "21", "11"]) & (actions['team_id'] == losing_team_id)
+                   & (actions['result'] == "0") & (actions['start_x'] < 45)]
+
+    found = {}
+    for period_id, period_ball in ball.groupby('period_id'):
+        start = period_ball['timestamp'].min()
+        for seconds in sorted(set(fail.loc[fail['period_id'] == period_id, 'seconds'])):
+            time = start + seconds
+            initial_ball_pos = period_ball[period_ball['timestamp'] == time]
+            if not initial_ball_pos.empty and initial_ball_pos.iloc[0]['x'] <= 50:
+                ball_movement = period_ball[(period_ball['timestamp'] > time) & (period_ball['timestamp'] <= time + 10)]
+                crossed = ball_movement[ball_movement['x'] > 50]
+                if not crossed.empty:
+                    found[(period_id, seconds)] = crossed['timestamp'].iloc[0]
+    return found
+
+
+def test_matches_the_per_candidate_loop():
+    rng = np.random.default_rng(7)
+
+    def ball_x(n):
+        # The ball wanders around midfield, so it crosses it every few seconds in both halves
+        x = np.full(n, 50.0)
+        for i in range(1, n):
+            x[i] = 50 + 0.9 * (x[i - 1] - 50) + rng.normal(0, 8)
+        return np.clip(x, 0, 100)
+
+    halves = {1: (0.0, ball_x(600)), 2: (SECOND_HALF, ball_x(600))}
+    tracking = tracking_frame(halves)
+    rows = [(period, float(rng.integers(0, 600)), rng.choice(['home', 'away']), rng.choice(["0", "1", "21", "11", "3"]),
+             rng.choice(["0", "1"]), float(rng.uniform(0, 100))) for period in (1, 2) for _ in range(400)]
+    actions = spadl_actions(rows)
+
+    expected = per_candidate_loop(actions, tracking, 'away')
+    moments = match_counter_attacks(actions, tracking, losing_team_id='away')
+
+    assert {period for period, _ in expected} == {1, 2}
+    assert dict(zip(zip(moments['period_id'], moments['seconds']), moments['crossing_seconds'])) == expected
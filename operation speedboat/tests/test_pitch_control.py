@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from Python.pitch_control import AWAY, HOME, NO_TEAM, team_rows, voronoi_control
+from Python.tracking_store import build_tracking_store
+
+
+def integer_id_tracking():
+    # Two frames of one player per team and the ball, with integer ids as the local backend returns them
+    return pd.DataFrame({
+        'match_id': [9001] * 6,
+        'frame_id': [1, 1, 1, 2, 2, 2],
+        'timestamp': ['00:00:00.00', '00:00:00.00', '00:00:00.00', '00:00:00.04', '00:00:00.04', '00:00:00.04'],
+        'player_id': [11, 21, 0, 11, 21, 0],
+        'team_id': [1, 2, 0, 1, 2, 0],
+        'player_name': ['Home', 'Away', 'Ball', 'Home', 'Away', 'Ball'],
+        'jersey_number': [7, 9, 0, 7, 9, 0],
+        'x': [25.0, 75.0, 50.0, 26.0, 74.0, 50.0],
+        'y': [50.0, 50.0, 50.0, 50.0, 50.0, 50.0],
+    })
+
+
+def test_team_rows_matches_integer_ids_against_the_store(tmp_path):
+    store = build_tracking_store(integer_id_tracking(), str(tmp_path / "9001"))
+
+    teams = team_rows(store.team_ids, 1, 2)
+
+    assert list(teams) == [AWAY if p == '21' else HOME if p == '11' else NO_TEAM for p in store.player_ids]
+    assert sorted(teams) == [NO_TEAM, HOME, AWAY]
+
+
+def test_control_splits_the_pitch_with_integer_ids(tmp_path):
+    store = build_tracking_store(integer_id_tracking(), str(tmp_path / "9001"))
+
+    _, areas = voronoi_control(store.frame(0), team_rows(store.team_ids, 1, 2))
+
+    # One player per half: each team owns about half of the pitch
+    assert np.allclose(areas[0] / areas[0].sum(), [0.5, 0.5], atol=0.02)